@@ -39,9 +39,9 @@ def kill_flow(ip):
     match = Match(eth_type="ipv4", ipv4_src=ip)
     action = Action(output=0)
     flow = Flow(priority=30000, match=match, actions=action, hard_timeout=30)
-    datapaths = api.get_datapaths()
-    for d in datapaths:
-        api.add_flows(d.dpid, flow)
+    results = api.add_flows_all(flow)
+    for dpid, error in results.failed.items():
+        print("Failed to add flow to {0}: {1}".format(dpid, error))
 
 if __name__ == "__main__":
     main()
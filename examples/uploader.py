@@ -37,7 +37,8 @@ def upload(filename, app):
     controller = os.getenv("SDNCTL")
     user = os.getenv("SDNUSER")
     password = os.getenv("SDNPASS")
-    auth = hp.XAuthToken(user=user, password=password, server=controller)
+    auth = hp.XAuthToken(user=user, password=password, server=controller,
+                         cache=hp.TokenCache())
     api = hp.Api(controller=controller, auth=auth)
 
     running = is_running(api, app)
@@ -16,5 +16,6 @@
 
 #flake8: noqa
 from hpsdnclient.api import Api
-from hpsdnclient.auth import XAuthToken
+from hpsdnclient.auth import TokenCache, XAuthToken
+from hpsdnclient.cache import TopologyCache
 from hpsdnclient.version import __version__
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" asyncio support for the HP SDN Controller Api (Python 3.7+) """
+
+import asyncio
+import functools
+import itertools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.core import CoreMixin
+from hpsdnclient.net import NetMixin
+from hpsdnclient.of import OfMixin
+from hpsdnclient.rest import POOL_MAXSIZE
+
+MAX_CONCURRENCY = 16
+# The number of items a stream decodes per trip to the executor
+STREAM_BATCH = 256
+
+
+def _for_loop(primitives, factory):
+    """ The asyncio primitive of the running event loop. Locks and
+    semaphores can only be used on the loop they were first used on, so
+    each loop gets its own """
+    loop = asyncio.get_running_loop()
+    primitive = primitives.get(loop)
+    if primitive is None:
+        primitive = primitives[loop] = factory()
+    return primitive
+
+
+class AsyncXAuthToken(XAuthToken):
+    """An XAuthToken that can be refreshed from a coroutine.
+
+    Coroutines that find the token missing or expired wait on a single
+    refresh, so only one login is sent to the controller no matter how
+    many requests are in flight on an event loop."""
+
+    def __init__(self, server, user, password, **kwargs):
+        super(AsyncXAuthToken, self).__init__(server, user, password,
+                                              **kwargs)
+        self._refresh_locks = weakref.WeakKeyDictionary()
+
+    async def refresh(self, executor=None):
+        """Log in if the token is missing or has expired.
+
+        :param executor: The executor used to run the login request
+
+        """
+        if not self._needs_refresh():
+            return
+        async with _for_loop(self._refresh_locks, asyncio.Lock):
+            if self._needs_refresh():
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(executor, self._refresh)
+
+
+class AsyncApi(object):
+    """ An awaitable version of hpsdnclient.Api
+
+    Every method of CoreMixin, OfMixin and NetMixin is available as a
+    coroutine that takes the same arguments. Calls are run on a thread
+    pool over the connection pool of a regular Api object, and at most
+    max_concurrency calls per event loop are sent to the controller at
+    once.
+
+    Methods called with stream=True return an asynchronous iterator,
+    the items are decoded on the thread pool::
+
+        async for flow in await api.get_flows(dpid, stream=True):
+            ...
+
+    :param str controller: The controller address
+    :param auth: The authenticator, preferably an AsyncXAuthToken
+    :param int max_concurrency: The maximum number of requests in flight
+    :param executor: The executor to run calls on (Optional)
+
+    Any extra keyword arguments are passed to
+    :class:`hpsdnclient.rest.RestClient`.
+
+    """
+    def __init__(self, controller, auth, max_concurrency=MAX_CONCURRENCY,
+                 executor=None, **kwargs):
+        kwargs.setdefault("pool_maxsize", max(max_concurrency, POOL_MAXSIZE))
+        self.api = Api(controller, auth, **kwargs)
+        self.auth = auth
+        self.max_concurrency = max_concurrency
+        self._own_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._executor = executor
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        return _for_loop(self._semaphores,
+                         lambda: asyncio.Semaphore(self.max_concurrency))
+
+    async def _call(self, name, *args, **kwargs):
+        async with self._semaphore():
+            if isinstance(self.auth, AsyncXAuthToken):
+                await self.auth.refresh(self._executor)
+            loop = asyncio.get_running_loop()
+            func = functools.partial(getattr(self.api, name), *args, **kwargs)
+            result = await loop.run_in_executor(self._executor, func)
+        if kwargs.get("stream"):
+            return self._stream(result)
+        return result
+
+    async def _stream(self, iterator):
+        """ Iterate over a stream without blocking the event loop """
+        loop = asyncio.get_running_loop()
+
+        def batch():
+            return list(itertools.islice(iterator, STREAM_BATCH))
+
+        try:
+            while True:
+                async with self._semaphore():
+                    items = await loop.run_in_executor(self._executor, batch)
+                if not items:
+                    return
+                for item in items:
+                    yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await loop.run_in_executor(self._executor, close)
+
+    async def close(self):
+        """ Shut down the executor and close pooled connections """
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+        self.api.restclient.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def _coroutine(name, method):
+    @functools.wraps(method)
+    async def call(self, *args, **kwargs):
+        return await self._call(name, *args, **kwargs)
+    return call
+
+
+for _mixin in (CoreMixin, OfMixin, NetMixin):
+    for _name, _method in vars(_mixin).items():
+        if not _name.startswith("_") and callable(_method):
+            setattr(AsyncApi, _name, _coroutine(_name, _method))
@@ -19,14 +19,33 @@ Controller API"""
 
 
 from hpsdnclient.apibase import ApiBase
+from hpsdnclient.bulk import BulkMixin
+from hpsdnclient.cache import TopologyCache
 from hpsdnclient.core import CoreMixin
+from hpsdnclient.fanout import FanoutMixin
 from hpsdnclient.net import NetMixin
 from hpsdnclient.of import OfMixin
 from hpsdnclient.rest import RestClient
 
 
-class Api(CoreMixin, OfMixin, NetMixin, ApiBase):
-    """ The container class for the HP SDN Controller Api """
-    def __init__(self, controller, auth):
-        self.restclient = RestClient(auth)
+class Api(CoreMixin, OfMixin, NetMixin, FanoutMixin, BulkMixin, ApiBase):
+    """ The container class for the HP SDN Controller Api
+
+    :param str controller: The controller address
+    :param auth: The authenticator, e.g. hpsdnclient.XAuthToken
+    :param topology_cache: Cache topology queries. True for the default
+        TTLs or a :class:`hpsdnclient.cache.TopologyCache` (Optional)
+
+    Any extra keyword arguments are passed to
+    :class:`hpsdnclient.rest.RestClient` to configure the connection
+    pool shared by all of the mixins.
+
+    """
+    def __init__(self, controller, auth, topology_cache=None, **kwargs):
+        self.restclient = RestClient(auth, **kwargs)
         super(Api, self).__init__(controller, self.restclient)
+        if topology_cache is True:
+            topology_cache = TopologyCache()
+        elif topology_cache is False:
+            topology_cache = None
+        self.topology_cache = topology_cache
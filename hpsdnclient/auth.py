@@ -14,51 +14,277 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import contextlib
 import json
 import datetime
+import logging
+import os
+import threading
+import time
+# fcntl is not available on Windows, the cache is not locked there
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 import requests
 
+LOG = logging.getLogger(__name__)
+
+
+def _replace_file(src, dst):
+    """ Move src over dst. os.rename does not replace an existing file
+    on Windows, so dst is removed first there """
+    try:
+        os.rename(src, dst)
+    except OSError:
+        if not os.path.exists(dst):
+            raise
+        os.remove(dst)
+        os.rename(src, dst)
+
+
+# Python3 compatibility
+_replace = getattr(os, 'replace', _replace_file)
+
+RENEWAL_RETRY = 5
+TOKEN_CACHE = os.path.join(os.path.expanduser('~'), '.hpsdnclient',
+                           'tokens.json')
+
+
+class TokenCache(object):
+    """An on-disk cache of X-Auth-Tokens keyed by server and user.
+
+    The cache file is only readable by its owner and is locked while in
+    use, so concurrent processes can share a token until it expires
+    instead of each one logging in."""
+
+    def __init__(self, path=TOKEN_CACHE):
+        self.path = path
+
+    def _makedirs(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Hold an exclusive lock on the cache file"""
+        self._makedirs()
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    @staticmethod
+    def _key(server, user):
+        return '{0}@{1}'.format(user, server)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        self._makedirs()
+        tmp = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entries, f)
+        _replace(tmp, self.path)
+
+    def load(self, server, user):
+        """Return the cached token and expiration time for the user, or
+        None if there is no token that is still valid."""
+        entry = self._read().get(self._key(server, user))
+        if entry is None or entry['expiration'] <= time.time():
+            return None
+        expiration = datetime.datetime.fromtimestamp(entry['expiration'])
+        return entry['token'], expiration
+
+    def store(self, server, user, token, expiration):
+        """Save a token, expiration is a POSIX timestamp in seconds.
+        Expired entries are dropped at the same time."""
+        now = time.time()
+        entries = dict((k, v) for k, v in self._read().items()
+                       if v['expiration'] > now)
+        entries[self._key(server, user)] = {'token': token,
+                                            'expiration': expiration}
+        self._write(entries)
+
+    def discard(self, server, user, token=None):
+        """Remove the user's token, but only if it is the given one"""
+        entries = self._read()
+        entry = entries.get(self._key(server, user))
+        if entry is not None and token in (None, entry['token']):
+            del entries[self._key(server, user)]
+            self._write(entries)
+
 
 class XAuthToken(requests.auth.AuthBase):
     """This class handles authentication against the HP SDN REST API and
     uses the Requests API. XAuthToken derives from
     requests.auth.AuthBase and hpsdnclient.ApiBase."""
 
-    def __init__(self, server, user, password):
+    def __init__(self, server, user, password, refresh_margin=0,
+                 background=False, cache=None, timeout=0.5):
         """Initializes the class. Set the server, user and password
         member variables. Sets the token and expiration values to
-        None"""
+        None.
+
+        The token is renewed refresh_margin seconds before it expires.
+        If background is True the renewal is done by a timer thread
+        instead of by the first request that finds the token stale.
+        If a TokenCache is given, tokens are shared with other
+        processes through it. timeout applies to the login and logout
+        requests."""
         super(XAuthToken, self).__init__()
         self.server = server
         self.user = user
         self.password = password
-        self.token = None
-        self.token_expiration = None
+        # The token and its expiration, replaced together so that
+        # threads never see one without the other
+        self._token = (None, None)
+        self.refresh_margin = datetime.timedelta(seconds=refresh_margin)
+        self.background = background
+        self.cache = cache
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def token(self):
+        return self._token[0]
+
+    @token.setter
+    def token(self, value):
+        self._token = (value, self._token[1])
+
+    @property
+    def token_expiration(self):
+        return self._token[1]
+
+    @token_expiration.setter
+    def token_expiration(self, value):
+        self._token = (self._token[0], value)
 
     def __call__(self, request):
         """This method is called when an authentication token is
         required. We first check that the token exists and has not
-        expired and then return the X-Auth-Token request header."""
-        if (self.token is None or
-                self.token_expiration <= datetime.datetime.now()):
-            self.get_auth()
+        expired and then return the X-Auth-Token request header.
+        Should the controller reject the token anyway, the request is
+        sent once more with a fresh token."""
+        if self._needs_refresh():
+            self._refresh()
         request.headers['X-Auth-Token'] = self.token
+        request.register_hook('response', self.handle_401)
         return request
 
+    def _needs_refresh(self):
+        token, expiration = self._token
+        return (token is None or expiration is None or
+                expiration - self.refresh_margin <= datetime.datetime.now())
+
+    def _refresh(self, stale_token=None):
+        """Log in, unless another thread already did. Only one thread
+        at a time sends the login request, the others wait for it and
+        then use the new token."""
+        with self._lock:
+            if stale_token is not None:
+                if self.token == stale_token:
+                    if self.cache is not None:
+                        with self.cache.locked():
+                            self.cache.discard(self.server, self.user,
+                                               stale_token)
+                    self.get_auth()
+            elif self._needs_refresh():
+                self.get_auth()
+
+    def handle_401(self, r, **kwargs):
+        """Response hook that retries a request once with a new token
+        when the controller answers 401 Unauthorized"""
+        if r.status_code != 401:
+            return r
+        self._refresh(stale_token=r.request.headers.get('X-Auth-Token'))
+
+        # Consume the content so the connection goes back to the pool
+        r.content
+        r.close()
+        prep = r.request.copy()
+        prep.deregister_hook('response', self.handle_401)
+        prep.headers['X-Auth-Token'] = self.token
+        _r = r.connection.send(prep, **kwargs)
+        _r.history.append(r)
+        _r.request = prep
+        return _r
+
+    def _schedule_renewal(self, delay=None):
+        expiration = self.token_expiration
+        if not self.background or (delay is None and expiration is None):
+            return
+        if delay is None:
+            renew_at = expiration - self.refresh_margin
+            delay = max((renew_at - datetime.datetime.now()).total_seconds(),
+                        1)
+        self.stop_renewal()
+        self._timer = threading.Timer(delay, self._renew)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _renew(self):
+        try:
+            with self._lock:
+                self.get_auth()
+        except Exception:
+            # Keep renewing, requests log in themselves meanwhile
+            LOG.exception("Renewing the token for %s failed, retrying in "
+                          "%s seconds", self.server, RENEWAL_RETRY)
+            self._schedule_renewal(RENEWAL_RETRY)
+
+    def stop_renewal(self):
+        """Cancel the background renewal timer, if any"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
     def get_auth(self):
         """This method requests an authentication token from the SDN
         controller and returns a dictionary with the token and
-        expiration time."""
+        expiration time. With a token cache, a valid cached token is
+        used instead and new tokens are saved to the cache."""
+        if self.cache is None:
+            self._login()
+        else:
+            with self.cache.locked():
+                cached = self.cache.load(self.server, self.user)
+                if (cached is not None and
+                        cached[1] - self.refresh_margin >
+                        datetime.datetime.now()):
+                    self._token = tuple(cached)
+                else:
+                    timestamp = self._login()
+                    self.cache.store(self.server, self.user,
+                                     self.token, timestamp)
+        self._schedule_renewal()
+
+    def _login(self):
         url = 'https://{0}:8443/sdn/v2.0/auth'.format(self.server)
         payload = {'login': {'user': self.user, 'password': self.password}}
         r = requests.post(url, data=json.dumps(payload),
-                          verify=False, timeout=0.5)
+                          verify=False, timeout=self.timeout)
         r.raise_for_status()
         data = r.json()
-        self.token = data[u'record'][u'token']
         timestamp = data[u'record'][u'expiration'] / 1000
-        self.token_expiration = datetime.datetime.fromtimestamp(timestamp)
+        self._token = (data[u'record'][u'token'],
+                       datetime.datetime.fromtimestamp(timestamp))
+        return timestamp
 
     def delete_auth(self):
         """Delete Authentication Token, AKA, Logout. This method logs
@@ -66,7 +292,10 @@ class XAuthToken(requests.auth.AuthBase):
         url = 'https://{0}:8443/sdn/v2.0/auth'.format(self.server)
         headers = {"X-Auth-Token": self.token}
         r = requests.delete(url, headers=headers,
-                            verify=False, timeout=0.5)
+                            verify=False, timeout=self.timeout)
         r.raise_for_status()
-        self.token = None
-        self.token_expiration = None
+        self.stop_renewal()
+        if self.cache is not None:
+            with self.cache.locked():
+                self.cache.discard(self.server, self.user, self.token)
+        self._token = (None, None)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+
+import requests
+
+from hpsdnclient.apibase import ApiBase
+from hpsdnclient.datatypes import DEFAULT_TABLE, canonical_value
+
+CHUNK_SIZE = 500
+RETRIES = 2
+RETRY_DELAY = 0.5
+# Gateway and availability errors, the controller did not process the flows
+TRANSIENT_STATUS_CODES = (502, 503, 504)
+
+# The fields that sync_flows compares, the rest are counters
+PROGRAMMED = ("cookie", "idle_timeout", "hard_timeout", "flow_mod_flags",
+              "instructions", "actions")
+
+
+def is_transient(error):
+    """ Whether a failed request is worth sending again as is """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return (response is not None and
+                response.status_code in TRANSIENT_STATUS_CODES)
+    return False
+
+
+def flow_key(flow):
+    """ The identity of a flow in a table: (table_id, priority, match).
+    Unlike Flow.key() the cookie is left out, it is compared as part of
+    what the flow does """
+    return flow.key()[:3]
+
+
+def same_program(current, desired):
+    """ Whether two flows with the same key do the same thing, ignoring
+    counters and durations. Fields that the desired flow leaves unset
+    are not compared """
+    for attr in PROGRAMMED:
+        wanted = getattr(desired, attr)
+        if wanted is None or wanted == []:
+            continue
+        value = getattr(current, attr)
+        if attr == "cookie":
+            wanted = canonical_value(attr, wanted)
+            value = canonical_value(attr, value)
+        if value != wanted:
+            return False
+    return True
+
+
+class FlowDiff(namedtuple("FlowDiff", "add modify delete")):
+    """ The changes that take a flow table to a desired state
+
+    :ivar list add: Desired flows that are not installed
+    :ivar list modify: Desired flows installed with other actions,
+        instructions, cookie or timeouts
+    :ivar list delete: Installed flows that are not desired
+
+    """
+    __slots__ = ()
+
+
+def diff_flows(current, desired):
+    """ Compare an installed flow table with the desired flows
+
+    Flows are matched on (table_id, priority, match) through a hash
+    index, so the cost is linear in the size of the tables.
+
+    :param list current: The installed flows, e.g. from get_flows
+    :param list desired: The flows that should be installed
+    :rtype: hpsdnclient.bulk.FlowDiff
+
+    """
+    installed = dict((flow_key(f), f) for f in current)
+    wanted = dict((flow_key(f), f) for f in desired)
+    add, modify = [], []
+    for key, flow in wanted.items():
+        existing = installed.get(key)
+        if existing is None:
+            add.append(flow)
+        elif not same_program(existing, flow):
+            modify.append(flow)
+    delete = [f for key, f in installed.items() if key not in wanted]
+    return FlowDiff(add, modify, delete)
+
+
+class SyncResult(namedtuple("SyncResult", "added modified deleted")):
+    """ The outcome of sync_flows, a BulkResult for each kind of change
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        """ True if every change was applied """
+        return self.added.ok and self.modified.ok and self.deleted.ok
+
+
+class BulkResult(object):
+    """ The outcome of a bulk flow operation
+
+    :ivar list succeeded: The flows that were applied
+    :ivar list failed: (flow, exception) for each flow that was not
+    :ivar int chunks: The number of chunks the flows were sent in
+    :ivar int retries: The number of chunk requests that were retried
+    :ivar float elapsed: The time taken in seconds
+
+    """
+    def __init__(self):
+        self.succeeded = []
+        self.failed = []
+        self.chunks = 0
+        self.retries = 0
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        """ True if every flow was applied """
+        return not self.failed
+
+    @property
+    def flows_per_sec(self):
+        """ The number of flows applied per second """
+        if not self.elapsed:
+            return 0.0
+        return len(self.succeeded) / self.elapsed
+
+
+class BulkMixin(ApiBase):
+    """Bulk flow programming
+
+    These methods split large flow lists into chunks that the controller
+    can handle within the request timeout and send the chunks in
+    parallel over the connection pool. Chunks that fail with a transient
+    error (connection errors, timeouts and 502, 503 and 504 responses)
+    are retried and fail as a whole once the retries run out. Chunks
+    that are rejected, including by an OpenflowProtocolError, are split
+    in half until the flows that cause the rejection are found, so every
+    other flow is still applied.
+
+    Chunks are sent concurrently, so flows are not applied in order.
+
+    """
+    def add_flows_bulk(self, dpid, flows, chunk_size=CHUNK_SIZE,
+                       max_workers=None, retries=RETRIES):
+        """ Add many flows to a datapath
+
+        :param str dpid: The datapath ID
+        :param list flows: The flows to add
+        :param int chunk_size: The number of flows per request (Optional)
+        :param int max_workers: The number of requests in flight.
+            Defaults to the size of the connection pool (Optional)
+        :param int retries: Retries per chunk for transient errors
+            (Optional)
+        :return: The flows that succeeded and failed, and the throughput
+        :rtype: hpsdnclient.bulk.BulkResult
+
+        """
+        return self._bulk(self.add_flows, dpid, flows, chunk_size,
+                          max_workers, retries)
+
+    def update_flows_bulk(self, dpid, flows, chunk_size=CHUNK_SIZE,
+                          max_workers=None, retries=RETRIES):
+        """ Update many flows at a datapath, see add_flows_bulk
+
+        :rtype: hpsdnclient.bulk.BulkResult
+
+        """
+        return self._bulk(self.update_flows, dpid, flows, chunk_size,
+                          max_workers, retries)
+
+    def delete_flows_bulk(self, dpid, flows, chunk_size=CHUNK_SIZE,
+                          max_workers=None, retries=RETRIES):
+        """ Delete many flows from a datapath, see add_flows_bulk
+
+        :rtype: hpsdnclient.bulk.BulkResult
+
+        """
+        return self._bulk(self.delete_flows, dpid, flows, chunk_size,
+                          max_workers, retries)
+
+    def sync_flows(self, dpid, desired_flows, table_id=None, prune=True,
+                   chunk_size=CHUNK_SIZE, max_workers=None,
+                   retries=RETRIES):
+        """ Make the flows at a datapath match the desired flows
+
+        The flow table is fetched once and only the difference is
+        written: flows that are missing are added, flows with other
+        actions, instructions, cookie or timeouts are modified and,
+        when prune is set, flows that are not desired are deleted.
+        Additions and modifications are applied before deletions.
+
+        :param str dpid: The datapath ID
+        :param list desired_flows: Every flow the datapath should have
+        :param table_id: Only sync this table (Optional)
+        :param bool prune: Delete installed flows that are not desired
+            (Optional)
+        :return: The result of the additions, modifications and deletions
+        :rtype: hpsdnclient.bulk.SyncResult
+
+        """
+        desired = list(desired_flows)
+        current = self.get_flows(dpid, table_id) or []
+        if table_id is not None:
+            # get_flows returns every table for table 0
+            def in_table(flow):
+                table = DEFAULT_TABLE if flow.table_id is None \
+                    else flow.table_id
+                return int(table) == int(table_id)
+            desired = [f for f in desired if in_table(f)]
+            current = [f for f in current if in_table(f)]
+        changes = diff_flows(current, desired)
+        options = (chunk_size, max_workers, retries)
+        added = self._bulk(self.add_flows, dpid, changes.add, *options)
+        modified = self._bulk(self.update_flows, dpid, changes.modify,
+                              *options)
+        deleted = self._bulk(self.delete_flows, dpid,
+                             changes.delete if prune else [], *options)
+        return SyncResult(added, modified, deleted)
+
+    def _bulk(self, method, dpid, flows, chunk_size, max_workers, retries):
+        flows = list(flows)
+        if max_workers is None:
+            max_workers = self.restclient.pool_maxsize
+        result = BulkResult()
+        chunks = [flows[i:i + chunk_size]
+                  for i in range(0, len(flows), chunk_size)]
+        result.chunks = len(chunks)
+        start = time.time()
+        if chunks:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(self._send_chunk, method, dpid,
+                                           chunk, retries)
+                           for chunk in chunks]
+                for future in as_completed(futures):
+                    succeeded, failed, retried = future.result()
+                    result.succeeded.extend(succeeded)
+                    result.failed.extend(failed)
+                    result.retries += retried
+        result.elapsed = time.time() - start
+        return result
+
+    def _send_chunk(self, method, dpid, chunk, retries):
+        """ Send one chunk, returning (succeeded, failed, retries) """
+        attempt = 0
+        while True:
+            try:
+                method(dpid, chunk)
+                return chunk, [], attempt
+            except Exception as e:
+                error = e
+            if attempt >= retries or not is_transient(error):
+                break
+            attempt += 1
+            time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+        if len(chunk) == 1 or is_transient(error):
+            # Splitting does not help when the controller is unreachable
+            return [], [(flow, error) for flow in chunk], attempt
+        # Split the chunk to find the flows that cause the failure
+        half = len(chunk) // 2
+        succeeded, failed, retried = [], [], attempt
+        for part in (chunk[:half], chunk[half:]):
+            s, f, r = self._send_chunk(method, dpid, part, retries)
+            succeeded.extend(s)
+            failed.extend(f)
+            retried += r
+        return succeeded, failed, retried
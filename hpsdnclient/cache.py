@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Read-through caching of controller queries """
+
+from collections import OrderedDict
+import threading
+import time
+
+# Seconds each topology query stays cached
+TOPOLOGY_TTLS = {"clusters": 60,
+                 "links": 30,
+                 "nodes": 30,
+                 "devices": 60,
+                 "forward_path": 300}
+CACHE_SIZE = 1024
+
+
+class TopologyCache(object):
+    """ A size bounded, thread-safe TTL cache for topology queries
+
+    Entries are keyed by endpoint name and query arguments. Each
+    endpoint has its own time to live, endpoints without one are not
+    cached. Once maxsize entries are held the least recently used entry
+    is evicted.
+
+    Cached values are returned as is, callers must not modify them.
+
+    :param dict ttls: Seconds to keep each endpoint's results, a TTL of
+        None keeps them until they are invalidated (Optional)
+    :param int maxsize: The maximum number of cached results (Optional)
+    :param clock: A function returning the current time in seconds
+        (Optional)
+
+    """
+    def __init__(self, ttls=None, maxsize=CACHE_SIZE, clock=time.time):
+        self.ttls = dict(TOPOLOGY_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+        self._links = {}
+        # Bumped on every invalidation, a result fetched across one may
+        # be stale and is not stored
+        self._generation = 0
+        self.evictions = 0
+
+    def lookup(self, endpoint, args, fetch):
+        """ Return the cached result for endpoint and args, calling
+        fetch() to get it on a miss
+
+        :param str endpoint: The endpoint name, e.g. "links"
+        :param tuple args: The hashable query arguments
+        :param fetch: A callable returning the result from the controller
+        :return: The result
+
+        """
+        if endpoint not in self.ttls:
+            return fetch()
+        key = (endpoint, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > self.clock():
+                    # Re-insert to mark the entry as most recently used
+                    self._entries[key] = self._entries.pop(key)
+                    self._count(self._hits, endpoint)
+                    return value
+                del self._entries[key]
+            self._count(self._misses, endpoint)
+            generation = self._generation
+        # Fetch without the lock held so other lookups are not blocked
+        # behind a controller round-trip
+        value = fetch()
+        with self._lock:
+            if self._generation == generation:
+                self._store(key, value)
+        return value
+
+    def store(self, endpoint, args, value):
+        """ Cache a result for endpoint and args """
+        with self._lock:
+            self._store((endpoint, args), value)
+
+    def _store(self, key, value):
+        ttl = self.ttls.get(key[0])
+        expires = None if ttl is None else self.clock() + ttl
+        self._entries.pop(key, None)
+        self._entries[key] = (expires, value)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def contains(self, endpoint, args):
+        """ Whether an unexpired result for endpoint and args is cached """
+        with self._lock:
+            entry = self._entries.get((endpoint, args))
+            return entry is not None and (entry[0] is None or
+                                          entry[0] > self.clock())
+
+    def observe_links(self, dpid, links):
+        """ Record the links the controller returned and invalidate
+        derived results if they differ from the last links seen
+
+        :param str dpid: The DPID the links were filtered by, or None
+        :param list links: The hpsdnclient.datatypes.Link objects
+        :return: True if the links changed
+        :rtype: bool
+
+        """
+        state = frozenset((link.src_dpid, link.src_port,
+                           link.dst_dpid, link.dst_port) for link in links)
+        with self._lock:
+            previous = self._links.get(dpid)
+            self._links[dpid] = state
+        if previous is not None and previous != state:
+            self.link_changed()
+            return True
+        return False
+
+    def link_changed(self):
+        """ Drop the cached links and forward paths, e.g. on receiving a
+        link change event """
+        self.invalidate("links")
+        self.invalidate("forward_path")
+
+    def invalidate(self, endpoint=None, args=None):
+        """ Drop cached results
+
+        :param str endpoint: Only drop results of this endpoint (Optional)
+        :param tuple args: Only drop the result for these arguments,
+            requires endpoint (Optional)
+
+        """
+        with self._lock:
+            self._generation += 1
+            if endpoint is None:
+                self._entries.clear()
+            elif args is not None:
+                self._entries.pop((endpoint, args), None)
+            else:
+                for key in [k for k in self._entries if k[0] == endpoint]:
+                    del self._entries[key]
+
+    def stats(self):
+        """ Hit and miss counters for each endpoint
+
+        :return: {endpoint: {"hits": int, "misses": int}}
+        :rtype: dict
+
+        """
+        with self._lock:
+            return dict((e, {"hits": self._hits.get(e, 0),
+                             "misses": self._misses.get(e, 0)})
+                        for e in set(self._hits).union(self._misses))
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _count(counters, endpoint):
+        counters[endpoint] = counters.get(endpoint, 0) + 1
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Offline classification of packets against fetched flow tables """
+
+from collections import deque, namedtuple
+
+from hpsdnclient.datatypes import DEFAULT_TABLE, canonical_value
+from hpsdnclient.overlap import PREREQUISITES, Rule, constraint
+from hpsdnclient.topology import Topology
+
+# The match fields read from each header of a Packet
+HEADERS = (("eth", ("eth_src", "eth_dst", "eth_type", "vlan_vid",
+                    "vlan_pcp")),
+           ("ip", ("ipv4_src", "ipv4_dst", "ip_proto", "ip_dscp",
+                   "ip_ecn")),
+           ("ipv6", ("ipv6_src", "ipv6_dst", "ip_proto")),
+           ("tcp", ("tcp_src", "tcp_dst")),
+           ("udp", ("udp_src", "udp_dst")))
+
+MAX_HOPS = 64
+
+
+def _header_value(header, field):
+    if isinstance(header, dict):
+        return header.get(field)
+    return getattr(header, field, None)
+
+
+def packet_fields(packet, in_port=None):
+    """ The match fields of a packet, as the values the classifier
+    compares
+
+    :param packet: A hpsdnclient.datatypes.Packet, or a dict of match
+        field names and values, e.g. {"ipv4_dst": "10.0.0.1"}
+    :param in_port: The port the packet arrives on (Optional)
+    :rtype: dict
+
+    """
+    if isinstance(packet, dict):
+        values = dict((k, v) for k, v in packet.items() if v is not None)
+    else:
+        values = {}
+        for name, fields in HEADERS:
+            header = getattr(packet, name, None)
+            if header is None:
+                continue
+            for field in fields:
+                value = _header_value(header, field)
+                if value is not None:
+                    values[field] = value
+    if in_port is not None:
+        values["in_port"] = in_port
+    fields = dict((f, constraint(f, canonical_value(f, v))[0])
+                  for f, v in values.items())
+    # A TCP packet is an IP packet, and so on
+    for implied, field, value in PREREQUISITES:
+        if field not in fields and any(f in fields for f in implied):
+            fields[field] = value
+    return fields
+
+
+class _Group(object):
+    """ The rules that match on the same fields with the same masks """
+
+    __slots__ = ("pattern", "rules", "priority")
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.rules = {}
+        self.priority = None
+
+
+class Classifier(object):
+    """ Finds the highest priority flow of a table that matches a packet
+
+    Flows are grouped by the fields and masks they match on and each
+    group is a hash table of the masked values, so a lookup is one
+    dictionary access per group. Groups are searched in order of their
+    highest priority and the search stops once no group can hold a
+    better match.
+
+    :param list flows: The flows of one table (Optional)
+
+    """
+    def __init__(self, flows=()):
+        self._groups = {}
+        self._order = []
+        self._count = 0
+        for flow in flows:
+            self.add(flow)
+
+    def add(self, flow):
+        """ Add a flow to the table """
+        self._count += 1
+        rule = Rule(self._count, flow)
+        pattern = tuple(sorted((f, m) for f, (v, m) in rule.fields.items()))
+        group = self._groups.get(pattern)
+        if group is None:
+            group = self._groups[pattern] = _Group(pattern)
+        key = tuple(rule.fields[f][0] for f, m in pattern)
+        current = group.rules.get(key)
+        # Of flows with the same match, only the highest priority applies
+        if current is None or rule.priority > current.priority:
+            group.rules[key] = rule
+        if group.priority is None or rule.priority > group.priority:
+            group.priority = rule.priority
+        self._order = None
+
+    def lookup(self, fields):
+        """ The flow that matches a packet
+
+        :param dict fields: The packet, see packet_fields()
+        :return: The flow, or None on a table miss
+        :rtype: hpsdnclient.datatypes.Flow
+
+        """
+        if self._order is None:
+            self._order = sorted(self._groups.values(),
+                                 key=lambda g: -g.priority)
+        best = None
+        for group in self._order:
+            if best is not None and group.priority <= best.priority:
+                break
+            try:
+                key = tuple([fields[f] & m for f, m in group.pattern])
+            except KeyError:
+                # The packet lacks a field this group matches on
+                continue
+            rule = group.rules.get(key)
+            if rule is not None and (best is None or
+                                     rule.priority > best.priority):
+                best = rule
+        return None if best is None else best.flow
+
+    def __len__(self):
+        return self._count
+
+
+def _port(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def output_ports(flow):
+    """ The ports a flow outputs to, from its actions and instructions
+
+    :rtype: list
+
+    """
+    ports = []
+    actions = flow.actions
+    for action in actions if isinstance(actions, list) else [actions]:
+        output = _header_value(action, "output") if action else None
+        if isinstance(output, list):
+            ports.extend(output)
+        elif output is not None:
+            ports.append(output)
+    for instruction in flow.instructions or ():
+        for name in ("apply_actions", "write_actions"):
+            for action in _header_value(instruction, name) or ():
+                output = _header_value(action, "output")
+                if output is not None:
+                    ports.append(output)
+    return [_port(p) for p in ports]
+
+
+class Hop(namedtuple("Hop", "dpid in_port flow out_ports next")):
+    """ What a datapath does with a packet
+
+    :ivar str dpid: The datapath
+    :ivar in_port: The port the packet arrived on
+    :ivar flow: The matching hpsdnclient.datatypes.Flow, None on a
+        table miss
+    :ivar list out_ports: The ports the packet is output to
+    :ivar list next: (dpid, port) where the packet arrives next, for
+        the output ports that have a link
+
+    """
+    __slots__ = ()
+
+
+class Simulator(object):
+    """ Predicts how the fabric forwards a packet, without sending it
+
+    Uses one table per datapath. Header rewrites by set_field actions
+    are not applied.
+
+    :param dict flows: The flows of each datapath, {dpid: [Flow]}, e.g.
+        the result of get_flows_all
+    :param hpsdnclient.topology.Topology topology: The links between the
+        datapaths (Optional)
+    :param int table_id: The table to classify against (Optional)
+
+    """
+    def __init__(self, flows, topology=None, table_id=DEFAULT_TABLE):
+        self.table_id = table_id
+        self.topology = topology
+        self._tables = {}
+        for dpid, dp_flows in flows.items():
+            if isinstance(dp_flows, Exception):
+                continue
+            self._tables[dpid] = Classifier(
+                f for f in dp_flows or ()
+                if f.key()[0] == table_id)
+        self._links = {}
+        if topology is not None:
+            for link in topology.links.values():
+                self._links[(link.src_dpid, _port(link.src_port))] = \
+                    (link.dst_dpid, _port(link.dst_port))
+
+    @classmethod
+    def from_api(cls, api, dpids=None, topology=None,
+                 table_id=DEFAULT_TABLE):
+        """ Fetch the flow tables and the topology
+
+        :param hpsdnclient.Api api: The Api to query
+        :param list dpids: The datapaths. Defaults to all (Optional)
+        :param hpsdnclient.topology.Topology topology: Use this topology
+            instead of fetching one (Optional)
+        :rtype: hpsdnclient.classifier.Simulator
+
+        """
+        if topology is None:
+            topology = Topology.from_api(api)
+        return cls(api.get_flows_all(dpids), topology, table_id)
+
+    def classify(self, dpid, packet, in_port=None):
+        """ The flow of a datapath that matches a packet
+
+        :param str dpid: The datapath
+        :param packet: A Packet, a dict of match fields, or the result
+            of packet_fields()
+        :param in_port: The port the packet arrives on (Optional)
+        :return: The flow, or None on a table miss
+        :rtype: hpsdnclient.datatypes.Flow
+
+        """
+        table = self._tables.get(dpid)
+        if table is None:
+            return None
+        return table.lookup(packet_fields(packet, in_port))
+
+    def next_hop(self, dpid, packet, in_port=None):
+        """ What a datapath does with a packet, and where it goes next
+
+        :rtype: hpsdnclient.classifier.Hop
+
+        """
+        return self._hop(dpid, in_port, packet_fields(packet, in_port))
+
+    def _hop(self, dpid, in_port, fields):
+        table = self._tables.get(dpid)
+        flow = table.lookup(fields) if table is not None else None
+        out_ports = output_ports(flow) if flow is not None else []
+        next = [self._links[(dpid, p)] for p in out_ports
+                if (dpid, p) in self._links]
+        return Hop(dpid, in_port, flow, out_ports, next)
+
+    def trace(self, dpid, packet, in_port=None, max_hops=MAX_HOPS):
+        """ Follow a packet through the fabric
+
+        Packets output to several ports are followed down every link.
+        A datapath and port is only visited once, so loops end.
+
+        :param str dpid: The datapath the packet enters at
+        :param packet: A Packet or a dict of match fields
+        :param in_port: The port it enters on (Optional)
+        :param int max_hops: Stop after this many hops (Optional)
+        :return: The hops, in the order visited
+        :rtype: list
+
+        """
+        fields = packet_fields(packet)
+        hops = []
+        queue = deque([(dpid, _port(in_port))])
+        seen = set(queue)
+        while queue and len(hops) < max_hops:
+            dpid, port = queue.popleft()
+            if port is None:
+                fields.pop("in_port", None)
+            else:
+                fields["in_port"] = constraint(
+                    "in_port", canonical_value("in_port", port))[0]
+            hop = self._hop(dpid, port, fields)
+            hops.append(hop)
+            for point in hop.next:
+                if point not in seen:
+                    seen.add(point)
+                    queue.append(point)
+        return hops
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" The JSON codec used for request bodies, responses and datatypes
+
+By default the fastest installed backend is used, in order of
+preference orjson, ujson and the standard library json module. Use
+set_backend() to choose one explicitly.
+
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JsonCodec(object):
+    """ Encodes and decodes JSON with one backend
+
+    dumps() emits compact JSON, with no indentation and unsorted keys,
+    for use on the wire. dumps_pretty() emits sorted and indented JSON
+    for people to read.
+
+    """
+    name = None
+
+    def dumps(self, obj):
+        raise NotImplementedError
+
+    def loads(self, data):
+        raise NotImplementedError
+
+    def dumps_pretty(self, obj):
+        return json.dumps(obj, sort_keys=True, indent=4,
+                          separators=(',', ': '))
+
+
+class StdlibCodec(JsonCodec):
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'))
+
+    def loads(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    name = "ujson"
+
+    def dumps(self, obj):
+        return ujson.dumps(obj, ensure_ascii=False)
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def dumps(self, obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+BACKENDS = [(OrjsonCodec, orjson), (UjsonCodec, ujson), (StdlibCodec, json)]
+
+
+def available_backends():
+    """ The names of the backends that can be used here
+
+    :return: Backend names, fastest first
+    :rtype: list
+
+    """
+    return [cls.name for cls, module in BACKENDS if module is not None]
+
+
+def get_backend(name=None):
+    """ Create a codec for a backend
+
+    :param str name: "orjson", "ujson" or "json". Defaults to the
+        fastest one installed (Optional)
+    :return: The codec
+    :rtype: hpsdnclient.codec.JsonCodec
+    :raises: ValueError if the backend is unknown or not installed
+
+    """
+    for cls, module in BACKENDS:
+        if module is None:
+            continue
+        if name is None or name == cls.name:
+            return cls()
+    raise ValueError("JSON backend {0} is not available, use one of "
+                     "{1}".format(name, ", ".join(available_backends())))
+
+
+_codec = get_backend()
+
+
+def set_backend(name=None):
+    """ Select the backend used by hpsdnclient
+
+    :param str name: "orjson", "ujson" or "json". Defaults to the
+        fastest one installed (Optional)
+    :raises: ValueError if the backend is unknown or not installed
+
+    """
+    global _codec
+    _codec = get_backend(name)
+
+
+def backend():
+    """ The name of the backend in use """
+    return _codec.name
+
+
+def dumps(obj):
+    """ Encode obj as compact JSON text """
+    return _codec.dumps(obj)
+
+
+def loads(data):
+    """ Decode JSON from text or UTF-8 encoded bytes """
+    return _codec.loads(data)
+
+
+def dumps_pretty(obj):
+    """ Encode obj as sorted, indented JSON text """
+    return _codec.dumps_pretty(obj)
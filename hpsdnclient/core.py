@@ -22,12 +22,10 @@
 # TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-import json
 import time
 
-import requests
-
 from hpsdnclient.api import ApiBase
+import hpsdnclient.codec as codec
 from hpsdnclient.error import raise_errors
 
 
@@ -118,7 +116,7 @@ class CoreMixin(ApiBase):
         :param str serial_no: The serial number of the license to deactivate
 
         """
-        action = json.dumps({"action": "deactivate"})
+        action = codec.dumps({"action": "deactivate"})
         url = self._core_base_url + 'licenses/{}'.format(serial_no)
         r = self.restclient.post(url, action)
         raise_errors(r)
@@ -229,10 +227,11 @@ class CoreMixin(ApiBase):
         """
         url = 'https://{0}:8443/sdn/v2.0/auth'.format(self.controller)
         data = {'login': {'user': user, 'password': password}}
-        r = requests.post(url, data=json.dumps(data), verify=False, timeout=1)
+        r = self.restclient.request('post', url, data=codec.dumps(data),
+                                    verify=False, timeout=1)
         t = {}
         r.raise_for_status()
-        data = r.json()
+        data = codec.loads(r.content)
         t['token'] = data[u'record'][u'token']
         exptime = data[u'record'][u'expiration']/1000
         t['token_expiration'] = time.gmtime(exptime)
@@ -247,5 +246,6 @@ class CoreMixin(ApiBase):
         """
         url = 'https://{0}:8443/sdn/v2.0/auth'.format(self.controller)
         headers = {"X-Auth-Token": token}
-        r = requests.delete(url, headers=headers, verify=False, timeout=1)
+        r = self.restclient.request('delete', url, headers=headers,
+                                    verify=False, timeout=1)
         r.raise_for_status()
@@ -19,7 +19,21 @@
 
 """ Python Data Types used for the REST objects """
 
-import json
+from operator import attrgetter
+import re
+
+try:
+    import ipaddress
+except ImportError:
+    ipaddress = None
+
+import hpsdnclient.codec as codec
+
+# Python3 compatibility
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
 
 ETHERNET = ['ipv4', 'arp', 'rarp', 'snmp', 'ipv6',
             'mpls_u', 'mpls_m', 'lldp', 'pbb', 'bddp']
@@ -169,8 +183,36 @@ ENUMS = [ETHERNET,
          OPERATION
          ]
 
+# The canonical values of named match fields, see Match.key()
+ETH_TYPES = {'ipv4': 0x0800,
+             'arp': 0x0806,
+             'rarp': 0x8035,
+             'snmp': 0x814c,
+             'ipv6': 0x86dd,
+             'mpls_u': 0x8847,
+             'mpls_m': 0x8848,
+             'lldp': 0x88cc,
+             'pbb': 0x88e7,
+             'bddp': 0x8999}
+IP_PROTOCOLS = {'icmp': 1,
+                'tcp': 6,
+                'udp': 17,
+                'ipv6-icmp': 58,
+                'sctp': 132}
+MAC_FIELDS = ('eth_src', 'eth_dst', 'ipv6_nd_sll', 'ipv6_nd_tll')
+IP_FIELDS = ('ipv4_src', 'ipv4_dst', 'arp_spa', 'arp_tpa',
+             'ipv6_src', 'ipv6_dst', 'ipv6_nd_target')
+
+_OCTET = r'(25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])'
+_IPV4 = re.compile(r'^{0}(\.{0}){{3}}$'.format(_OCTET))
+
+# What a flow is installed with when no table or priority is given
+DEFAULT_TABLE = 0
+DEFAULT_PRIORITY = 32768
+
 METHODS = ["factory", "to_json_string", "to_dict"]
 KEYWORDS = ["self"]
+LAZY_PREFIX = "_lazy_"
 
 
 #bhg38 - added macgroups, metrics, devices
@@ -243,7 +285,12 @@ CLASS_MAP = {'ControllerStats': {'lost': 'Counter',
 
 
 class JsonObjectFactory(object):
+    """ Creates datatypes by class name
+
+    Every public datatype registers itself in factories when its class
+    is created, add_factory() may be used to register others.
 
+    """
     factories = {}
 
     @staticmethod
@@ -251,81 +298,248 @@ class JsonObjectFactory(object):
         JsonObjectFactory.factories[id] = factory
 
     @staticmethod
-    def create(id, data):
-        for key in data:
-            if key in KEYWORDS:
-                new_key = key + "_"
-                data[new_key] = data.pop(key)
-        if id not in JsonObjectFactory.factories:
-            JsonObjectFactory.add_factory(id, eval(id))
-        return JsonObjectFactory.factories[id].factory(data)
+    def create(id, data, lazy=False):
+        """ Create a datatype from its JSON data. With lazy=True the
+        nested datatypes listed in CLASS_MAP are only created when the
+        attribute holding them is first read """
+        # JSON keys that are reserved words in Python are passed with a
+        # trailing underscore, e.g. "self" becomes self_
+        for key in KEYWORDS:
+            if key in data:
+                data[key + "_"] = data.pop(key)
+        return JsonObjectFactory.factories[id].factory(data, lazy)
+
+
+class _FieldProbe(object):
+    """ Stand-in instance used to discover the fields of a datatype """
+
+
+class _Deferred(object):
+    """ Raw JSON data waiting to be converted into datatypes """
+
+    __slots__ = ("convert", "key", "data")
 
+    def __init__(self, convert, key, data):
+        self.convert = convert
+        self.key = key
+        self.data = data
 
-class JsonObject(object):
+
+class _LazyField(object):
+    """ Descriptor for a nested field that may hold deferred data
+
+    The value is stored in a hidden slot and converted the first time
+    it is read.
+
+    """
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        value = self.slot.__get__(obj, cls)
+        if type(value) is _Deferred:
+            value = value.convert(value.key, value.data)
+            self.slot.__set__(obj, value)
+        return value
+
+    def __set__(self, obj, value):
+        self.slot.__set__(obj, value)
+
+
+class JsonObjectMeta(type):
+    """ Metaclass for the HP SDN Client data types
+
+    Builds the field table of each class once, when the class is
+    created, by running its constructor against a probe object. The
+    table becomes the __slots__ of the class, so instances carry no
+    per-object __dict__, and drives serialization and comparison so
+    that no per-object reflection is needed.
+
+    """
+    def __new__(mcs, name, bases, attrs):
+        if "__init__" in attrs and "__slots__" not in attrs:
+            probe = _FieldProbe()
+            attrs["__init__"](probe)
+            inherited = set()
+            for base in bases:
+                inherited.update(getattr(base, "_fields", None) or ())
+            fields = tuple(sorted(vars(probe)))
+            lazy = tuple(f for f in fields if f in CLASS_MAP.get(name, ()))
+            attrs["__slots__"] = tuple(LAZY_PREFIX + f if f in lazy else f
+                                       for f in fields if f not in inherited)
+            attrs["__slots__"] += attrs.get("_private_slots", ())
+            attrs["_fields"] = tuple(sorted(inherited.union(fields)))
+            attrs["_lazy_fields"] = lazy
+        return super(JsonObjectMeta, mcs).__new__(mcs, name, bases, attrs)
+
+    def __init__(cls, name, bases, attrs):
+        super(JsonObjectMeta, cls).__init__(name, bases, attrs)
+        if not hasattr(cls, "_fields"):
+            cls._fields = None
+        for field in attrs.get("_lazy_fields", ()):
+            slot = cls.__dict__[LAZY_PREFIX + field]
+            setattr(cls, field, _LazyField(slot))
+        if not name.startswith("_"):
+            JsonObjectFactory.add_factory(name, cls)
+
+
+# Python 2 and 3 compatible way to use a metaclass
+_JsonObjectBase = JsonObjectMeta("_JsonObjectBase", (object,),
+                                 {"__slots__": ()})
+
+
+class JsonObject(_JsonObjectBase):
 
     """ This is the base class for all HP SDN Client data types."""
 
+    __slots__ = ()
+    _lazy_fields = ()
+    # Slots for internal state, e.g. cached keys, that are not fields
+    _private_slots = ()
+
+    def __new__(cls, *args, **kwargs):
+        if cls is JsonObject:
+            # A bare JsonObject can hold arbitrary attributes
+            cls = _FreeformJsonObject
+        return super(JsonObject, cls).__new__(cls)
+
     def __str__(self):
         return self.to_json_string()
 
+    def _attributes(self):
+        if self._fields is None:
+            # A bare JsonObject has no field table, use what was set on it
+            return sorted(attr for attr in vars(self)
+                          if not attr.startswith("__"))
+        return self._fields
+
     def to_json_string(self):
         tmp = self.to_dict()
-        return json.dumps(tmp, sort_keys=True,
-                          indent=4, separators=(',', ': '))
+        return codec.dumps_pretty(tmp)
 
     def to_dict(self):
         data = {}
-        attributes = [attr for attr in dir(self)
-                      if not callable(getattr(self, attr)) and
-                      not attr.startswith("__")]
-        for attr in attributes:
-            if getattr(self, attr) is not None:
-                value = getattr(self, attr)
-                if isinstance(value, list):
-                    tmp = []
-                    for list_item in value:
-                        if isinstance(list_item, JsonObject):
-                            tmp.append(list_item.to_dict())
-                        else:
-                            tmp.append(list_item)
-                    data[attr.__str__()] = tmp
-                elif isinstance(value, JsonObject):
-                    data[attr.__str__()] = value.to_dict()
-                elif type(value):
-                    data[attr.__str__()] = value
+        for attr in self._attributes():
+            value = getattr(self, attr)
+            if value is None:
+                continue
+            if isinstance(value, list):
+                tmp = []
+                for list_item in value:
+                    if isinstance(list_item, JsonObject):
+                        tmp.append(list_item.to_dict())
+                    else:
+                        tmp.append(list_item)
+                data[attr] = tmp
+            elif isinstance(value, JsonObject):
+                data[attr] = value.to_dict()
+            else:
+                data[attr] = value
         return data
 
     @classmethod
-    def factory(cls, data):
-        try:
-            cm = CLASS_MAP[cls.__name__]
-            for key in data:
-                if key in cm and isinstance(data[key], list):
-                    l = []
-                    for d in data[key]:
-                        l.append(JsonObjectFactory.create(cm[key], d))
-                    data[key] = l
-                elif key in cm:
-                    data[key] = JsonObjectFactory.create(cm[key], data[key])
-        except KeyError:
-            pass
-
+    def factory(cls, data, lazy=False):
+        for key in cls._lazy_fields:
+            if data.get(key) is None:
+                continue
+            if lazy:
+                data[key] = _Deferred(cls._convert, key, data[key])
+            else:
+                data[key] = cls._convert(key, data[key])
         return cls(**data)
 
+    @classmethod
+    def _convert(cls, key, value):
+        """ Create the nested datatype(s) for the CLASS_MAP field key """
+        datatype = CLASS_MAP[cls.__name__][key]
+        if isinstance(value, list):
+            return [JsonObjectFactory.create(datatype, d) for d in value]
+        return JsonObjectFactory.create(datatype, value)
+
     def __eq__(self, other):
-        attributes = [attr for attr in dir(self)
-                      if not callable(getattr(self, attr)) and
-                      not attr.startswith("__")]
-        for attr in attributes:
+        for attr in self._attributes():
             try:
-                if self.__getattribute__(attr) == other.__getattribute__(attr):
-                    continue
-                else:
+                if not getattr(self, attr) == getattr(other, attr):
                     return False
             except AttributeError:
                 return False
-        else:
-            return True
+        return True
+
+    def __ne__(self, other):
+        # Python 2 does not derive != from __eq__
+        return not self == other
+
+
+class _FreeformJsonObject(JsonObject):
+    """ What JsonObject() creates: a JsonObject with an instance dict """
+
+
+def _canonical_mac(value):
+    if len(value) == 17 and value[2] == ':' and value == value.lower():
+        return value
+    digits = value.replace(':', '').replace('-', '').replace('.', '').lower()
+    if len(digits) != 12:
+        return value.lower()
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def _canonical_ip(value):
+    if _IPV4.match(value):
+        # The common case, already in its shortest form
+        return value
+    if ipaddress is None:
+        return value.lower()
+    try:
+        if '/' not in value:
+            return str(ipaddress.ip_address(u'' + value))
+        network = ipaddress.ip_network(u'' + value, strict=False)
+    except ValueError:
+        return value.lower()
+    if network.prefixlen == network.max_prefixlen:
+        return str(network.network_address)
+    return str(network)
+
+
+def _canonical_int(value):
+    if isinstance(value, string_types):
+        try:
+            return int(value, 0)
+        except ValueError:
+            return value.lower()
+    return value
+
+
+def canonical_value(field, value):
+    """ The normalized value of a match or set_field field
+
+    MAC addresses are lower case and colon separated, IP addresses and
+    prefixes are in their shortest form, names of Ethernet types and IP
+    protocols become their numbers and numeric strings become ints, so
+    that different spellings of the same match compare equal.
+
+    """
+    if isinstance(value, list):
+        return tuple(sorted((canonical_value(field, v) for v in value),
+                            key=repr))
+    if isinstance(value, dict):
+        return tuple(sorted((k, canonical_value(k, v))
+                            for k, v in value.items()))
+    if not isinstance(value, string_types):
+        return value
+    if field in MAC_FIELDS:
+        return '/'.join(_canonical_mac(v) for v in value.split('/'))
+    if field in IP_FIELDS:
+        return _canonical_ip(value)
+    if field == 'eth_type':
+        number = ETH_TYPES.get(value.lower())
+    elif field == 'ip_proto':
+        number = IP_PROTOCOLS.get(value.lower())
+    else:
+        number = None
+    return _canonical_int(value) if number is None else number
+
 
 # OpenFlow #
 
@@ -506,54 +720,58 @@ class Flow(JsonObject):
         self.instructions = kwargs.get('instructions', [])
         self.actions = kwargs.get('actions', [])
 
+    def key(self):
+        """ The identity of the flow: its table, priority, match and
+        cookie, normalized so that equivalent flows have the same key.
+        Unset tables and priorities take the OpenFlow defaults
+
+        A flow should not be modified while it is in a set or a dict.
+
+        :rtype: tuple
+
+        """
+        table_id = DEFAULT_TABLE if self.table_id is None else self.table_id
+        priority = DEFAULT_PRIORITY if self.priority is None \
+            else self.priority
+        match = () if self.match is None else self.match.key()
+        cookie = 0 if self.cookie is None else _canonical_int(self.cookie)
+        return (int(table_id), int(priority), match, cookie)
+
+    def __hash__(self):
+        return hash(self.key())
+
     @classmethod
-    def factory(cls, data):
-        """ Override factory in the base class to create a single instance of
-        the Match class for the 'match' key. We do this as each match field
-        may only exist once. Actions are trickier as keys here are not unique.
-        When multiple values are present, """
-        try:
-            cm = CLASS_MAP[cls.__name__]
-            for key in data:
-                if key == 'match':
-                    new_match = {}
-                    for d in data[key]:
-                        for k in d:
-                            new_match[k] = d[k]
-                    data[key] = JsonObjectFactory.create('Match', new_match)
-                elif key == 'actions':
-                    new_action = {}
-                    keys = []
-                    for d in data[key]:
-                        keys.extend([(k, v) for k, v in d.items()])
-                    num_keys = range(len(keys))
-
-                    duplicates = {}
-
-                    for i in num_keys:
-                        key_name = keys[i][0]
-                        if key_name in duplicates:
-                            duplicates[key_name].append(i)
-                        else:
-                            duplicates[key_name] = [i]
-
-                    for k, v in duplicates.items():
-                        if len(v) > 1:
-                            new_action[k] = [keys[i][1] for i in v]
-                        else:
-                            new_action[k] = keys[i][1]
-
-                    data[key] = JsonObjectFactory.create('Action', new_action)
-                elif key in cm and isinstance(data[key], list):
-                    l = []
-                    for d in data[key]:
-                        l.append(JsonObjectFactory.create(cm[key], d))
-                    data[key] = l
-                elif key in cm:
-                    data[key] = JsonObjectFactory.create(cm[key], data[key])
-        except KeyError:
-            pass
-        return cls(**data)
+    def _convert(cls, key, value):
+        """ Override _convert in the base class to create a single instance
+        of the Match class for the 'match' key. We do this as each match
+        field may only exist once. Actions are trickier as keys here are
+        not unique. When multiple values are present for an action, they
+        are collected in a list """
+        if key == 'match':
+            new_match = {}
+            for d in value:
+                for k in d:
+                    new_match[k] = d[k]
+            return JsonObjectFactory.create('Match', new_match)
+        elif key == 'actions':
+            new_action = {}
+            for d in value:
+                for k, v in d.items():
+                    if k not in new_action:
+                        new_action[k] = v
+                    elif isinstance(new_action[k], _ActionValues):
+                        new_action[k].append(v)
+                    else:
+                        new_action[k] = _ActionValues([new_action[k], v])
+            for k, v in new_action.items():
+                if isinstance(v, _ActionValues):
+                    new_action[k] = list(v)
+            return JsonObjectFactory.create('Action', new_action)
+        return super(Flow, cls)._convert(key, value)
+
+
+class _ActionValues(list):
+    """ The values of an action that appears more than once in a flow """
 
 
 class Match(JsonObject):
@@ -603,6 +821,42 @@ class Match(JsonObject):
         self.icmpv4_type = kwargs.get('icmpv4_type', None)
         self.ipv6_exthdr = kwargs.get('ipv6_exthdr', None)
 
+    _private_slots = ("_key",)
+
+    def key(self):
+        """ The canonical form of the match, a tuple of (field, value)
+        for every field that is set, see canonical_value(). Matches that
+        only differ in how values are written have the same key
+
+        The key is cached along with the values it was computed from and
+        recomputed when a field is set. Lists changed in place are not
+        noticed, assign a new list instead.
+
+        :rtype: tuple
+
+        """
+        values = _match_values(self)
+        cached = getattr(self, "_key", None)
+        if cached is not None and cached[0] == values:
+            return cached[1]
+        key = []
+        for attr, value in zip(self._fields, values):
+            # Zero is a real value for fields like vlan_vid and ip_dscp
+            if value is not None:
+                key.append((attr, canonical_value(attr, value)))
+        key = tuple(key)
+        self._key = (values, key)
+        return key
+
+    def __eq__(self, other):
+        return isinstance(other, Match) and self.key() == other.key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key())
+
     def to_dict(self):
         """ to_dict (self)
 
@@ -612,17 +866,18 @@ class Match(JsonObject):
 
         """
         data = []
-        attributes = [attr for attr in dir(self)
-                      if not callable(getattr(self, attr)) and
-                      not attr.startswith("__")]
-        for attr in attributes:
-            if getattr(self, attr):
-                tmp = {}
-                tmp[attr.__str__()] = getattr(self, attr)
-                data.append(tmp)
+        for attr in self._fields:
+            value = getattr(self, attr)
+            # Send zeros, e.g. vlan_vid=0 matches untagged packets
+            if value is not None:
+                data.append({attr: value})
         return data
 
 
+# Every field of a Match, read at once to validate its cached key
+_match_values = attrgetter(*Match._fields)
+
+
 class Action(JsonObject):
     """ Action (JsonObject)
 
@@ -649,6 +904,48 @@ class Action(JsonObject):
         self.experimenter = kwargs.get('experimenter', None)
         self.data = kwargs.get('data', None)
 
+    _private_slots = ("_key",)
+
+    def key(self):
+        """ The canonical form of the actions, a tuple of (action, value).
+        The order of the output ports is kept, set_field values are
+        normalized as match fields are
+
+        The key is cached as Match.key() is.
+
+        :rtype: tuple
+
+        """
+        values = _action_values(self)
+        cached = getattr(self, "_key", None)
+        if cached is not None and cached[0] == values:
+            return cached[1]
+        key = []
+        for attr, value in zip(self._fields, values):
+            if not value:
+                continue
+            if attr == "output" and isinstance(value, list):
+                value = tuple(_canonical_int(v) for v in value)
+            elif isinstance(value, dict):
+                value = canonical_value(attr, value)
+            elif isinstance(value, list):
+                value = tuple(canonical_value(attr, v) for v in value)
+            else:
+                value = _canonical_int(value)
+            key.append((attr, value))
+        key = tuple(key)
+        self._key = (values, key)
+        return key
+
+    def __eq__(self, other):
+        return isinstance(other, Action) and self.key() == other.key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key())
+
     def to_dict(self):
         """ to_dict (self)
 
@@ -658,29 +955,23 @@ class Action(JsonObject):
 
         """
         data = []
-        attributes = [attr for attr in dir(self)
-                      if not callable(getattr(self, attr)) and
-                      not attr.startswith("__")]
-        for attr in attributes:
+        for attr in self._fields:
+            value = getattr(self, attr)
             if attr == "output":
-                output = getattr(self, attr)
-                if type(output) == list:
-                    for port in output:
-                        tmp = {}
-                        tmp[attr.__str__()] = port
-                        data.append(tmp)
-                elif output:
-                    tmp = {}
-                    tmp[attr.__str__()] = getattr(self, attr)
-                    data.append(tmp)
-            else:
-                if getattr(self, attr):
-                    tmp = {}
-                    tmp[attr.__str__()] = getattr(self, attr)
-                    data.insert(0, tmp)
+                if type(value) == list:
+                    for port in value:
+                        data.append({attr: port})
+                elif value:
+                    data.append({attr: value})
+            elif value:
+                data.insert(0, {attr: value})
         return data
 
 
+# Every field of an Action, read at once to validate its cached key
+_action_values = attrgetter(*Action._fields)
+
+
 class Instruction(JsonObject,):
     """ Instruction (JsonObject)
 
@@ -115,3 +115,11 @@ class DatatypeError(HpsdnclientError):
         self.expected = expected
         message = "Received: {0} Expected: {1}".format(received, expected)
         super(DatatypeError, self).__init__(message)
+
+
+class NotRecorded(HpsdnclientError):
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+        message = "No recorded response for {0} {1}".format(method, url)
+        super(NotRecorded, self).__init__(message)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from hpsdnclient.apibase import ApiBase
+
+
+class DatapathResults(OrderedDict):
+    """ The outcome of a fan-out call, keyed by DPID
+
+    Keys are in the order the DPIDs were supplied. Each value is either
+    what the call returned for that DPID or the exception it raised.
+
+    """
+    @property
+    def succeeded(self):
+        """ The results of the calls that succeeded """
+        return OrderedDict((k, v) for k, v in self.items()
+                           if not isinstance(v, Exception))
+
+    @property
+    def failed(self):
+        """ The exceptions raised by the calls that failed """
+        return OrderedDict((k, v) for k, v in self.items()
+                           if isinstance(v, Exception))
+
+
+class FanoutMixin(ApiBase):
+    """Per-datapath fan-out helpers
+
+    These methods run a call for many datapaths at once on a thread
+    pool. All threads share the connection pool and the authentication
+    token of the Api object.
+
+    """
+    def map_datapaths(self, fn, dpids=None, max_workers=None):
+        """ Call fn(dpid) for every datapath in parallel
+
+        :param fn: A callable taking a DPID
+        :param list dpids: The DPIDs to call fn for. Defaults to every
+            datapath returned by get_datapaths (Optional)
+        :param int max_workers: The number of threads. Defaults to the
+            size of the connection pool (Optional)
+        :return: The result or exception for each DPID
+        :rtype: hpsdnclient.fanout.DatapathResults
+
+        """
+        if dpids is None:
+            dpids = [d.dpid for d in self.get_datapaths()]
+        if max_workers is None:
+            max_workers = self.restclient.pool_maxsize
+        results = DatapathResults((dpid, None) for dpid in dpids)
+        if not results:
+            return results
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = dict((executor.submit(fn, dpid), dpid)
+                           for dpid in results)
+            for future in as_completed(futures):
+                dpid = futures[future]
+                try:
+                    results[dpid] = future.result()
+                except Exception as e:
+                    results[dpid] = e
+        return results
+
+    def get_flows_all(self, dpids=None, table_id=None, max_workers=None):
+        """ Gets the flows of many datapaths
+
+        :param list dpids: The datapath IDs (Optional)
+        :param str table_id: optional table_id
+        :param int max_workers: The number of threads (Optional)
+        :return: A list of flows or an exception for each DPID
+        :rtype: hpsdnclient.fanout.DatapathResults
+
+        """
+        return self.map_datapaths(
+            lambda dpid: self.get_flows(dpid, table_id), dpids, max_workers)
+
+    def get_ports_all(self, dpids=None, max_workers=None):
+        """ Gets the ports of many datapaths
+
+        :param list dpids: The datapath IDs (Optional)
+        :param int max_workers: The number of threads (Optional)
+        :return: A list of ports or an exception for each DPID
+        :rtype: hpsdnclient.fanout.DatapathResults
+
+        """
+        return self.map_datapaths(self.get_ports, dpids, max_workers)
+
+    def get_port_stats_all(self, dpids=None, max_workers=None):
+        """ Gets the port statistics of many datapaths
+
+        :param list dpids: The datapath IDs (Optional)
+        :param int max_workers: The number of threads (Optional)
+        :return: The port statistics or an exception for each DPID
+        :rtype: hpsdnclient.fanout.DatapathResults
+
+        """
+        return self.map_datapaths(self.get_port_stats, dpids, max_workers)
+
+    def add_flows_all(self, flows, dpids=None, max_workers=None):
+        """ Add a flow, or flows to many datapaths
+
+        :param list, hpsdnclient.datatypes.Flow flows: The flow or flows
+            to add
+        :param list dpids: The datapath IDs (Optional)
+        :param int max_workers: The number of threads (Optional)
+        :return: None or an exception for each DPID
+        :rtype: hpsdnclient.fanout.DatapathResults
+
+        """
+        return self.map_datapaths(
+            lambda dpid: self.add_flows(dpid, flows), dpids, max_workers)
+
+    def get_forward_paths(self, pairs, max_workers=None):
+        """ Gets the forward paths between many pairs of datapaths
+
+        Paths held in the topology_cache are returned straight away, the
+        others are requested from the controller in parallel.
+
+        :param list pairs: (src_dpid, dst_dpid) tuples
+        :param int max_workers: The number of threads (Optional)
+        :return: The path or an exception for each pair
+        :rtype: hpsdnclient.fanout.DatapathResults
+
+        """
+        results = DatapathResults((tuple(p), None) for p in pairs)
+        cache = self.topology_cache
+        misses = []
+        for pair in results:
+            if cache is not None and cache.contains('forward_path', pair):
+                try:
+                    results[pair] = self.get_forward_path(*pair)
+                except Exception as e:
+                    results[pair] = e
+            else:
+                misses.append(pair)
+        results.update(self.map_datapaths(
+            lambda pair: self.get_forward_path(*pair), misses, max_workers))
+        return results
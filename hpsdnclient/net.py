@@ -18,12 +18,18 @@
 #   modified by Bruno Hareng -2016 with version 2.7 of the HP SDN controller
 #   did not implemented the keys APIs
 
-import json
-import urllib
+# Python3 compatibility
+try:
+    import urllib.parse as urllib
+except ImportError:
+    import urllib
 
 from hpsdnclient.api import ApiBase
+import hpsdnclient.codec as codec
 from hpsdnclient.error import raise_errors
 from hpsdnclient.datatypes import LldpProperties
+from hpsdnclient.nodeindex import NodeIndex
+from hpsdnclient.topology import Topology
 
 
 class NetMixin(ApiBase):
@@ -38,14 +44,26 @@ class NetMixin(ApiBase):
     - Path Planner
     - Path Diagnostics Service
 
+    When topology_cache is set to a
+    :class:`hpsdnclient.cache.TopologyCache`, results of get_clusters,
+    get_links, get_nodes, get_devices and get_forward_path are served
+    from it until they expire.
+
     """
     def __init__(self, controller, auth):
         super(NetMixin, self).__init__(controller, auth)
+        self.topology_cache = None
         self._net_base_url = ("https://{0}:8443".format(self.controller) +
                               "/sdn/v2.0/net/")
         self._diag_base_url = ("https://{0}:8443".format(self.controller) +
                                "/sdn/v2.0/diag/")
 
+    def _cached(self, endpoint, args, url):
+        if self.topology_cache is None:
+            return self.restclient.get(url)
+        return self.topology_cache.lookup(endpoint, args,
+                                          lambda: self.restclient.get(url))
+
     def get_clusters(self):
         """ Gets a list of clusters
 
@@ -54,7 +72,7 @@ class NetMixin(ApiBase):
 
         """
         url = self._net_base_url + 'clusters'
-        return self.restclient.get(url)
+        return self._cached('clusters', (), url)
 
     def get_cluster_broadcast_tree(self, cluster_id):
         """ Gets the broadcast tree for a specific cluster
@@ -67,10 +85,12 @@ class NetMixin(ApiBase):
         url = self._net_base_url + 'clusters/{0}/tree'.format(cluster_id)
         return self.restclient.get(url)
 
-    def get_links(self, dpid=None):
+    def get_links(self, dpid=None, stream=False):
         """ Returns a list of all links discovered by the SDN controller
 
         :param str dpid: Return only the links for the specified DPID
+        :param bool stream: Return an iterator that decodes the links one
+            at a time instead of a list (Optional)
         :return: A list of Links
         :rtype: list
 
@@ -78,7 +98,16 @@ class NetMixin(ApiBase):
         url = self._net_base_url + 'links'
         if dpid:
             url = url + '?dpid={0}'.format(urllib.quote(dpid))
-        return self.restclient.get(url)
+        if stream or self.topology_cache is None:
+            return self.restclient.get(url, stream=stream)
+
+        def fetch():
+            links = self.restclient.get(url)
+            # Forward paths are only valid for the links they were
+            # computed over, drop them if the links have changed
+            self.topology_cache.observe_links(dpid, links)
+            return links
+        return self.topology_cache.lookup('links', (dpid,), fetch)
 
     def get_forward_path(self, src_dpid, dst_dpid):
         """ Gets the shortest computed path between src_dpid and dst_dpid
@@ -93,10 +122,38 @@ class NetMixin(ApiBase):
                'paths/forward' +
                '?src_dpid={0}&dst_dpid={1}'.format(urllib.quote(src_dpid),
                                                    urllib.quote(dst_dpid)))
-        return self.restclient.get(url)
+        return self._cached('forward_path', (src_dpid, dst_dpid), url)
+
+    def get_topology(self):
+        """ Build a local model of the network from the links, nodes and
+        datapaths known to the controller
+
+        :return: The topology
+        :rtype: hpsdnclient.topology.Topology
+
+        """
+        return Topology.from_api(self)
+
+    def get_node_index(self):
+        """ Build a local index of every node known to the controller
+
+        :return: The nodes, indexed by IP, MAC, location and VLAN
+        :rtype: hpsdnclient.nodeindex.NodeIndex
+
+        """
+        return NodeIndex.from_api(self)
+
+    def notify_link_change(self):
+        """ Drop cached links and forward paths after a link change, e.g.
+        on receiving a link event. Does nothing without a topology_cache
+
+        """
+        if self.topology_cache is not None:
+            self.topology_cache.link_changed()
 
     #Updated according to the 2.7 controller spec - add mac
-    def get_nodes(self, ip=None, vid=None, dpid=None, port=None, mac=None):
+    def get_nodes(self, ip=None, vid=None, dpid=None, port=None, mac=None,
+                  stream=False):
         """ Get all Nodes discovered by the controller
 
         input parameters are (vid) OR (vid and ip) OR (vid and mac) OR (dpid) OR (dpid and port) OR (ip)
@@ -106,6 +163,8 @@ class NetMixin(ApiBase):
         :param str dpid: Datapath ID
         :param str port: Port
         :param str mac: Mac address
+        :param bool stream: Return an iterator that decodes the nodes one
+            at a time instead of a list (Optional)
 
         """
         url = self._net_base_url + 'nodes'
@@ -123,7 +182,9 @@ class NetMixin(ApiBase):
         elif dpid and port:
             url += "?dpid={0}&port={1}".format(urllib.quote(dpid), port)
 
-        return self.restclient.get(url)
+        if stream:
+            return self.restclient.get(url, stream=True)
+        return self._cached('nodes', (ip, vid, dpid, port, mac), url)
 
     def get_diag_observation_posts(self, packet_uid=None, packet_type=None):
         """ Gets a list of diagnostic observation posts
@@ -150,7 +211,7 @@ class NetMixin(ApiBase):
         """
         data = {"observation": observation.to_dict()}
         url = self._diag_base_url + 'observations'
-        r = self.restclient.post(url, json.dumps(data))
+        r = self.restclient.post(url, codec.dumps(data))
         raise_errors(r)
 
     def delete_diag_observation_post(self, observation):
@@ -161,7 +222,7 @@ class NetMixin(ApiBase):
         """
         data = {"observation": observation.to_dict()}
         url = self._diag_base_url + 'observations'
-        r = self.restclient.delete(url, json.dumps(data))
+        r = self.restclient.delete(url, codec.dumps(data))
         raise_errors(r)
 
     def get_diag_packets(self, packet_type=None):
@@ -185,7 +246,7 @@ class NetMixin(ApiBase):
         """
         data = {"packet": packet.to_dict()}
         url = self._diag_base_url + 'packets'
-        r = self.restclient.post(url, json.dumps(data))
+        r = self.restclient.post(url, codec.dumps(data))
         raise_errors(r)
 
     def delete_diag_packet(self, packet_uid):
@@ -242,7 +303,7 @@ class NetMixin(ApiBase):
         """
         data = {"simulation": action}
         url = self._diag_base_url + 'packets/{}/action'.format(packet_uid)
-        r = self.restclient.post(url, json.dumps(data))
+        r = self.restclient.post(url, codec.dumps(data))
         raise_errors(r)
 
     #bhg38 - added as defined in spec 2.7 of the controller
@@ -254,7 +315,7 @@ class NetMixin(ApiBase):
 
         """
         url = self._net_base_url + 'devices'
-        return self.restclient.get(url)
+        return self._cached('devices', (), url)
 
 
     #bhg38 - added as defined in spec 2.7 of the controller
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Client-side lookup of the nodes (hosts) known to the controller """
+
+try:
+    from sys import intern
+except ImportError:
+    pass
+
+from hpsdnclient.sync import ADD, CHANGE, DELETE, MOVE, NODE, diff, node_key
+
+
+def _index_add(index, value, key):
+    # Most values map to a single node, so the key is stored on its own
+    # and only turned into a list when a second node shares the value
+    current = index.get(value)
+    if current is None:
+        index[value] = key
+    elif type(current) is list:
+        current.append(key)
+    else:
+        index[value] = [current, key]
+
+
+def _index_remove(index, value, key):
+    current = index.get(value)
+    if type(current) is list:
+        current.remove(key)
+        if len(current) == 1:
+            index[value] = current[0]
+    elif current == key:
+        del index[value]
+
+
+def _location(node):
+    dpid = node.dpid
+    if dpid is not None:
+        # Many nodes share a datapath, keep one copy of its DPID
+        dpid = intern(str(dpid))
+    return (dpid, node.port)
+
+
+def _index_get(index, value):
+    current = index.get(value)
+    if current is None:
+        return []
+    if type(current) is list:
+        return list(current)
+    return [current]
+
+
+class NodeIndex(object):
+    """ Nodes indexed by IP, MAC, attachment point and VLAN
+
+    Build it from one get_nodes() dump and look hosts up without a
+    request to the controller. Each lookup is a dictionary access.
+
+    :param list nodes: hpsdnclient.datatypes.Node objects (Optional)
+
+    """
+    def __init__(self, nodes=()):
+        self._nodes = {}
+        self._by_ip = {}
+        self._by_mac = {}
+        self._by_location = {}
+        self._by_vid = {}
+        self.update(nodes)
+
+    @classmethod
+    def from_api(cls, api):
+        """ Build an index of every node known to the controller
+
+        :param hpsdnclient.Api api: The Api to query
+        :rtype: hpsdnclient.nodeindex.NodeIndex
+
+        """
+        return cls(api.get_nodes())
+
+    def refresh(self, api):
+        """ Bring the index up to date with the controller
+
+        :param hpsdnclient.Api api: The Api to query
+        :return: What changed
+        :rtype: list of hpsdnclient.sync.Delta
+
+        """
+        return self.update(api.get_nodes())
+
+    def update(self, nodes):
+        """ Replace the indexed nodes, re-indexing only the nodes that
+        were added, changed, deleted or moved
+
+        :param list nodes: Every current node
+        :return: What changed
+        :rtype: list of hpsdnclient.sync.Delta
+
+        """
+        current = dict((node_key(n), n) for n in nodes)
+        deltas = diff(self._nodes, current, NODE)
+        for delta in deltas:
+            if delta.operation in (CHANGE, DELETE, MOVE):
+                self._remove(delta.key, delta.old)
+            if delta.operation in (ADD, CHANGE, MOVE):
+                self._add(delta.key, delta.new)
+        return deltas
+
+    def _add(self, key, node):
+        self._nodes[key] = node
+        if node.ip is not None:
+            _index_add(self._by_ip, node.ip, key)
+        if node.mac is not None:
+            _index_add(self._by_mac, node.mac, key)
+        _index_add(self._by_location, _location(node), key)
+        _index_add(self._by_vid, node.vid, key)
+
+    def _remove(self, key, node):
+        del self._nodes[key]
+        if node.ip is not None:
+            _index_remove(self._by_ip, node.ip, key)
+        if node.mac is not None:
+            _index_remove(self._by_mac, node.mac, key)
+        _index_remove(self._by_location, _location(node), key)
+        _index_remove(self._by_vid, node.vid, key)
+
+    def _lookup(self, index, value):
+        return [self._nodes[k] for k in _index_get(index, value)]
+
+    def by_ip(self, ip):
+        """ The nodes with an IP address, one per VLAN it is seen on
+
+        :rtype: list
+
+        """
+        return self._lookup(self._by_ip, ip)
+
+    def by_mac(self, mac):
+        """ The nodes with a MAC address, one per VLAN it is seen on
+
+        :rtype: list
+
+        """
+        return self._lookup(self._by_mac, mac)
+
+    def at(self, dpid, port):
+        """ The nodes attached to a port of a datapath
+
+        :rtype: list
+
+        """
+        return self._lookup(self._by_location, (dpid, port))
+
+    def in_vlan(self, vid):
+        """ The nodes on a VLAN
+
+        :rtype: list
+
+        """
+        return self._lookup(self._by_vid, vid)
+
+    def locate(self, ip=None, mac=None, vid=None):
+        """ Find a single node by IP or MAC address
+
+        :param str ip: The IP address (Optional)
+        :param str mac: The MAC address (Optional)
+        :param vid: Only match nodes on this VLAN (Optional)
+        :return: The node, or None if there is no match
+        :rtype: hpsdnclient.datatypes.Node
+
+        """
+        if mac is not None:
+            nodes = self.by_mac(mac)
+        else:
+            nodes = self.by_ip(ip)
+        for node in nodes:
+            if vid is None or node.vid == vid:
+                return node
+        return None
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(list(self._nodes.values()))
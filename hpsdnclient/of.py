@@ -18,7 +18,6 @@
 #   modified by Bruno Hareng -2016 with version 2.7 of the HP SDN controller
 #   controller stats APIs not implemented, nor the classe put and del APIs
 
-import json
 # Python3 compatibility
 try:
     import urllib.parse as urllib
@@ -26,6 +25,7 @@ except ImportError:
     import urllib
 
 from hpsdnclient.api import ApiBase
+import hpsdnclient.codec as codec
 import hpsdnclient.datatypes as datatypes
 from hpsdnclient.error import raise_errors, DatatypeError
 
@@ -123,12 +123,14 @@ class OfMixin(ApiBase):
 
 
     # bhg38: added support for optional table id
-    def get_flows(self, dpid, table_id=None):
+    def get_flows(self, dpid, table_id=None, stream=False):
         """Gets a list of flows on the supplied DPID
 
 
         :param str dpid: The datapath ID
         :param str table_id: optional table_id
+        :param bool stream: Return an iterator that decodes the flows one
+            at a time instead of a list (Optional)
         :return: List of flows
         :rtype: list
 
@@ -137,7 +139,7 @@ class OfMixin(ApiBase):
                'datapaths/{0}/flows'.format(urllib.quote(dpid)))
         if table_id:
             url = url + '?table_id={0}'.format(table_id)
-        return self.restclient.get(url)
+        return self.restclient.get(url, stream=stream)
 
     def _assemble_flows(self, flows):
         if isinstance(flows, list):
@@ -164,7 +166,7 @@ class OfMixin(ApiBase):
         url = (self._of_base_url +
                'datapaths/{0}/flows'.format(urllib.quote(dpid)))
         data = self._assemble_flows(flows)
-        r = self.restclient.post(url, json.dumps(data))
+        r = self.restclient.post(url, codec.dumps(data))
         raise_errors(r)
 
     def update_flows(self, dpid, flows):
@@ -178,7 +180,7 @@ class OfMixin(ApiBase):
         url = (self._of_base_url +
                'datapaths/{0}/flows'.format(urllib.quote(dpid)))
         data = self._assemble_flows(flows)
-        r = self.restclient.put(url, json.dumps(data))
+        r = self.restclient.put(url, codec.dumps(data))
         raise_errors(r)
 
     def delete_flows(self, dpid, flows):
@@ -192,7 +194,7 @@ class OfMixin(ApiBase):
         url = (self._of_base_url +
                'datapaths/{0}/flows'.format(urllib.quote(dpid)))
         data = self._assemble_flows(flows)
-        r = self.restclient.delete(url, json.dumps(data))
+        r = self.restclient.delete(url, codec.dumps(data))
         raise_errors(r)
 
    #Groups section
@@ -222,7 +224,7 @@ class OfMixin(ApiBase):
             data = {"version": "1.3.0","group": group.to_dict()}
         else:
             data = {"version": "1.3.0","group": group}
-        r = self.restclient.post(url, json.dumps(data))
+        r = self.restclient.post(url, codec.dumps(data))
         raise_errors(r)
 
     def get_group_details(self, dpid, group_id):
@@ -252,7 +254,7 @@ class OfMixin(ApiBase):
             data = {"version": "1.3.0","group": group.to_dict()}
         else:
             data = {"version": "1.3.0","group": group}        
-        r = self.restclient.put(url, json.dumps(data))
+        r = self.restclient.put(url, codec.dumps(data))
         raise_errors(r)
 
     def delete_groups(self, dpid, group_id):
@@ -295,7 +297,7 @@ class OfMixin(ApiBase):
         else:
             data = {"version": "1.3.0","meter": meter}
 
-        r = self.restclient.post(url, json.dumps(data))
+        r = self.restclient.post(url, codec.dumps(data))
         raise_errors(r)
 
     def get_meter_details(self, dpid, meter_id):
@@ -326,7 +328,7 @@ class OfMixin(ApiBase):
         else:
             data = {"version": "1.3.0","meter": meter}
 
-        r = self.restclient.put(url, json.dumps(data))
+        r = self.restclient.put(url, codec.dumps(data))
         raise_errors(r)
 
     def delete_meter(self, dpid, meter_id):
@@ -411,14 +413,15 @@ class OfMixin(ApiBase):
         :param str port_id: Filter by Port ID
         :returns: Statistics for Port
         :rtype: hpsdnclient.datatypes.Stats
+        :raises: DatatypeError if port_id is not a port number
 
         """
         url = (self._of_base_url +
                'stats/ports?dpid={0}'.format(urllib.quote(dpid)))
-        if port_id.isdigit():
-           url = url + '&port_id={0}'.format(port_id)
-        else: 
-           return
+        if port_id is not None:
+            if not str(port_id).isdigit():
+                raise DatatypeError(port_id, "a port number")
+            url = url + '&port_id={0}'.format(port_id)
         return self.restclient.get(url)
 
     def get_group_stats(self, dpid, group_id=None):
@@ -508,7 +511,7 @@ class OfMixin(ApiBase):
         url = (self._of_base_url +
                'datapaths/{0}/dstmacgrps/{1}/macs'.format(urllib.quote(dpid), grp_id))
         data = {"macs": macs}
-        r = self.restclient.post(url, json.dumps(data))
+        r = self.restclient.post(url, codec.dumps(data))
         raise_errors(r)
 
 
@@ -586,7 +589,7 @@ class OfMixin(ApiBase):
         url = (self._of_base_url +
                'datapaths/{0}/srcmacgrps/{1}/macs'.format(urllib.quote(dpid), grp_id))
         data = {"macs": macs}
-        r = self.restclient.post(url, json.dumps(data))
+        r = self.restclient.post(url, codec.dumps(data))
         raise_errors(r)
  
 
@@ -604,5 +607,5 @@ class OfMixin(ApiBase):
         url = (self._of_base_url +
                'datapaths/{0}/srcmacgrps/{1}/macs'.format(urllib.quote(dpid), grp_id))
         data = {"macs": macs}
-        r = self.restclient.delete(url, json.dumps(data))
+        r = self.restclient.delete(url, codec.dumps(data))
         raise_errors(r)
\ No newline at end of file
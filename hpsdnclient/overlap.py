@@ -0,0 +1,408 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Detection of overlapping and shadowed flows """
+
+from collections import namedtuple
+
+try:
+    import ipaddress
+except ImportError:
+    ipaddress = None
+
+from hpsdnclient.datatypes import IP_FIELDS, MAC_FIELDS, string_types
+
+SHADOWED = "shadowed"
+REDUNDANT = "redundant"
+OVERLAP = "overlap"
+AMBIGUOUS = "ambiguous"
+
+# Fields indexed by value and by prefix
+EXACT_FIELDS = ("eth_type", "ip_proto", "vlan_vid", "in_port")
+PREFIX_FIELDS = {"ipv4_src": 32, "ipv4_dst": 32,
+                 "ipv6_src": 128, "ipv6_dst": 128}
+
+# The fields that imply a value for another, as OpenFlow prerequisites
+PREREQUISITES = ((("ipv4_src", "ipv4_dst"), "eth_type", 0x0800),
+                 (("ipv6_src", "ipv6_dst", "ipv6_flabel", "ipv6_nd_target",
+                   "ipv6_nd_sll", "ipv6_nd_tll", "ipv6_exthdr"),
+                  "eth_type", 0x86dd),
+                 (("arp_op", "arp_spa", "arp_tpa"), "eth_type", 0x0806),
+                 (("tcp_src", "tcp_dst"), "ip_proto", 6),
+                 (("udp_src", "udp_dst"), "ip_proto", 17),
+                 (("sctp_src", "sctp_dst"), "ip_proto", 132),
+                 (("icmpv4_type", "icmpv4_code"), "ip_proto", 1),
+                 (("icmpv6_type", "icmpv6_code"), "ip_proto", 58))
+
+# A mask with every bit set
+FULL = -1
+
+# Values that are not numbers are numbered from here, above any address
+_SYMBOL_BASE = 1 << 160
+_symbols = {}
+
+# Below this many candidates the prefix tries are not consulted
+_SELECTIVE = 32
+
+
+def _symbol(value):
+    key = repr(value)
+    number = _symbols.get(key)
+    if number is None:
+        number = _symbols[key] = _SYMBOL_BASE + len(_symbols)
+    return number
+
+
+def _prefix_mask(length, bits):
+    return ((1 << length) - 1) << (bits - length)
+
+
+def constraint(field, value):
+    """ A canonical match value as (value, mask), see Match.key()
+
+    Prefixes and masked MAC addresses have a partial mask, everything
+    else must match exactly.
+
+    :rtype: tuple
+
+    """
+    if isinstance(value, string_types):
+        if field in IP_FIELDS and ipaddress is not None:
+            if '/' not in value and ':' not in value:
+                # An IPv4 address, canonical values need no validation
+                try:
+                    a, b, c, d = [int(p) for p in value.split('.')]
+                    return a << 24 | b << 16 | c << 8 | d, FULL
+                except ValueError:
+                    return _symbol(value), FULL
+            try:
+                network = ipaddress.ip_network(u'' + value, strict=False)
+            except ValueError:
+                return _symbol(value), FULL
+            if network.prefixlen == network.max_prefixlen:
+                return int(network.network_address), FULL
+            return (int(network.network_address),
+                    _prefix_mask(network.prefixlen, network.max_prefixlen))
+        if field in MAC_FIELDS:
+            parts = [p.replace(':', '') for p in value.split('/')]
+            try:
+                number = int(parts[0], 16)
+                mask = int(parts[1], 16) if len(parts) > 1 else FULL
+            except ValueError:
+                return _symbol(value), FULL
+            return number & mask, mask
+    elif isinstance(value, int) and not isinstance(value, bool):
+        return value, FULL
+    return _symbol(value), FULL
+
+
+class Rule(object):
+    """ A flow compiled to a (value, mask) constraint per match field,
+    including the fields implied by OpenFlow prerequisites
+
+    :param int id: A number to tell rules apart
+    :param hpsdnclient.datatypes.Flow flow: The flow
+
+    """
+    __slots__ = ("id", "flow", "table", "priority", "fields")
+
+    def __init__(self, id, flow):
+        self.id = id
+        self.flow = flow
+        table, priority = flow.key()[:2]
+        self.table = table
+        self.priority = priority
+        fields = {}
+        if flow.match is not None:
+            for field, value in flow.match.key():
+                fields[field] = constraint(field, value)
+        for implied, field, value in PREREQUISITES:
+            if field not in fields and any(f in fields for f in implied):
+                fields[field] = (value, FULL)
+        self.fields = fields
+
+
+def overlaps(a, b):
+    """ Whether some packet matches both rules """
+    fa, fb = a.fields, b.fields
+    if len(fa) > len(fb):
+        fa, fb = fb, fa
+    for field, (value, mask) in fa.items():
+        other = fb.get(field)
+        if other is not None and (value ^ other[0]) & mask & other[1]:
+            return False
+    return True
+
+
+def covers(a, b):
+    """ Whether every packet that matches rule b also matches rule a """
+    fb = b.fields
+    for field, (value, mask) in a.fields.items():
+        other = fb.get(field)
+        if other is None:
+            return False
+        if other[1] & mask != mask or (value ^ other[0]) & mask:
+            return False
+    return True
+
+
+def _same_treatment(a, b):
+    return (a.flow.actions == b.flow.actions and
+            a.flow.instructions == b.flow.instructions)
+
+
+def _classify(low, high):
+    """ How the higher priority rule affects the lower one, or None """
+    if not overlaps(low, high):
+        return None
+    if high.priority == low.priority:
+        return None if _same_treatment(low, high) else AMBIGUOUS
+    if covers(high, low):
+        return REDUNDANT if _same_treatment(low, high) else SHADOWED
+    return None if _same_treatment(low, high) else OVERLAP
+
+
+class _Node(object):
+    __slots__ = ("children", "rules", "count")
+
+    def __init__(self):
+        self.children = [None, None]
+        self.rules = []
+        self.count = 0
+
+
+class PrefixTrie(object):
+    """ A binary trie of prefixes, one level per bit
+
+    :param int bits: The length of an address
+
+    """
+    def __init__(self, bits):
+        self.bits = bits
+        self.root = _Node()
+
+    def insert(self, value, length, item):
+        node = self.root
+        node.count += 1
+        shift = self.bits - 1
+        for i in range(length):
+            bit = value >> (shift - i) & 1
+            child = node.children[bit]
+            if child is None:
+                child = node.children[bit] = _Node()
+            node = child
+            node.count += 1
+        node.rules.append(item)
+
+    def walk(self, value, length):
+        """ The nodes of the prefixes that contain value/length, and the
+        node of value/length itself if there is one """
+        path = [self.root]
+        node = self.root
+        shift = self.bits - 1
+        for i in range(length):
+            node = node.children[value >> (shift - i) & 1]
+            if node is None:
+                return path, None
+            path.append(node)
+        return path[:-1], node
+
+    @staticmethod
+    def estimate(path, node):
+        """ The number of items overlapping a walked prefix """
+        count = sum(len(n.rules) for n in path)
+        return count + (node.count if node is not None else 0)
+
+    @staticmethod
+    def collect(path, node):
+        """ The items overlapping a walked prefix: those of the prefixes
+        that contain it and those it contains """
+        items = []
+        for n in path:
+            items.extend(n.rules)
+        stack = [node] if node is not None else []
+        while stack:
+            n = stack.pop()
+            items.extend(n.rules)
+            stack.extend(c for c in n.children if c is not None)
+        return items
+
+
+class _Table(object):
+    """ The rules of one flow table and their indexes """
+
+    def __init__(self):
+        self.rules = []
+        self.exact = dict((f, {}) for f in EXACT_FIELDS)
+        self.tries = dict((f, PrefixTrie(b)) for f, b in PREFIX_FIELDS.items())
+        self.wild = dict((f, []) for f in EXACT_FIELDS + tuple(PREFIX_FIELDS))
+
+    def add(self, rule):
+        self.rules.append(rule)
+        for field in EXACT_FIELDS:
+            value = rule.fields.get(field)
+            if value is None or value[1] != FULL:
+                self.wild[field].append(rule)
+            else:
+                self.exact[field].setdefault(value[0], []).append(rule)
+        for field, bits in PREFIX_FIELDS.items():
+            value = self._prefix(rule, field, bits)
+            if value is None:
+                self.wild[field].append(rule)
+            else:
+                self.tries[field].insert(value[0], value[1], rule)
+
+    @staticmethod
+    def _prefix(rule, field, bits):
+        value = rule.fields.get(field)
+        if value is None or value[0] >> bits:
+            return None
+        if value[1] == FULL:
+            return value[0], bits
+        return value[0], bin(value[1]).count("1")
+
+    def candidates(self, rule):
+        """ The rules that may overlap rule, from the most selective
+        index. Each rule is returned at most once """
+        best, size = None, len(self.rules)
+        for field in EXACT_FIELDS:
+            value = rule.fields.get(field)
+            if value is None or value[1] != FULL:
+                continue
+            bucket = self.exact[field].get(value[0], ())
+            estimate = len(bucket) + len(self.wild[field])
+            if estimate < size:
+                best, size = (bucket, self.wild[field]), estimate
+        if size > _SELECTIVE:
+            for field, bits in PREFIX_FIELDS.items():
+                value = self._prefix(rule, field, bits)
+                if value is None:
+                    continue
+                path, node = self.tries[field].walk(*value)
+                estimate = PrefixTrie.estimate(path, node) + \
+                    len(self.wild[field])
+                if estimate < size:
+                    best = (PrefixTrie.collect(path, node), self.wild[field])
+                    size = estimate
+        if best is None:
+            return self.rules
+        return best[0] + best[1]
+
+
+class Conflict(namedtuple("Conflict", "kind flow other")):
+    """ A flow that is affected by another
+
+    :ivar str kind: SHADOWED if other has a higher priority, matches
+        every packet that flow does and treats them differently, so flow
+        never applies. REDUNDANT if it treats them the same. OVERLAP if
+        other has a higher priority and treats some of the packets of
+        flow differently. AMBIGUOUS if both have the same priority and
+        treat some packets differently, so which applies is undefined
+    :ivar flow: The affected hpsdnclient.datatypes.Flow
+    :ivar other: The Flow with the same or a higher priority
+
+    """
+    __slots__ = ()
+
+
+class FlowAnalyzer(object):
+    """ Finds flows that overlap or are shadowed by other flows
+
+    Flows are indexed per table by the values of eth_type, ip_proto,
+    vlan_vid and in_port and by prefix tries of the IPv4 and IPv6
+    source and destination. Each flow is only compared with the flows
+    from its most selective index, so large tables are analysed without
+    comparing every pair.
+
+    A flow is only reported as shadowed when a single flow covers it,
+    not when several flows cover it between them.
+
+    :param list flows: hpsdnclient.datatypes.Flow objects (Optional)
+
+    """
+    def __init__(self, flows=()):
+        self._tables = {}
+        self._count = 0
+        for flow in flows:
+            self.add(flow)
+
+    @classmethod
+    def from_api(cls, api, dpid, table_id=None):
+        """ Index the flows installed at a datapath
+
+        :param hpsdnclient.Api api: The Api to query
+        :param str dpid: The datapath ID
+        :param table_id: Only index this table (Optional)
+        :rtype: hpsdnclient.overlap.FlowAnalyzer
+
+        """
+        return cls(api.get_flows(dpid, table_id) or [])
+
+    def add(self, flow):
+        """ Index a flow """
+        self._count += 1
+        rule = Rule(self._count, flow)
+        table = self._tables.get(rule.table)
+        if table is None:
+            table = self._tables[rule.table] = _Table()
+        table.add(rule)
+
+    def conflicts(self, kinds=None):
+        """ The conflicts between the indexed flows
+
+        :param kinds: Only report these kinds, e.g. (SHADOWED,)
+            (Optional)
+        :rtype: list of hpsdnclient.overlap.Conflict
+
+        """
+        result = []
+        for table in self._tables.values():
+            for rule in table.rules:
+                for other in table.candidates(rule):
+                    if other.priority < rule.priority or (
+                            other.priority == rule.priority and
+                            other.id <= rule.id):
+                        continue
+                    kind = _classify(rule, other)
+                    if kind is not None and (kinds is None or kind in kinds):
+                        result.append(Conflict(kind, rule.flow, other.flow))
+        return result
+
+    def check(self, flow):
+        """ The conflicts a flow would have with the indexed flows if it
+        was added, whether it is affected by them or affects them
+
+        :param hpsdnclient.datatypes.Flow flow: The flow to check
+        :rtype: list of hpsdnclient.overlap.Conflict
+
+        """
+        rule = Rule(0, flow)
+        table = self._tables.get(rule.table)
+        if table is None:
+            return []
+        result = []
+        for other in table.candidates(rule):
+            if other.priority >= rule.priority:
+                low, high = rule, other
+            else:
+                low, high = other, rule
+            kind = _classify(low, high)
+            if kind is not None:
+                result.append(Conflict(kind, low.flow, high.flow))
+        return result
+
+    def __len__(self):
+        return sum(len(t.rules) for t in self._tables.values())
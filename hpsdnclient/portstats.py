@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Port rates computed from successive port statistics samples """
+
+from array import array
+import heapq
+import logging
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from hpsdnclient.datatypes import PortStats, Stats
+
+LOG = logging.getLogger(__name__)
+
+COUNTERS = ("rx_bytes", "tx_bytes", "rx_packets", "tx_packets",
+            "rx_errors", "tx_errors", "rx_dropped", "tx_dropped")
+
+# rate name, counter, multiplier
+RATES = (("rx_bps", "rx_bytes", 8),
+         ("tx_bps", "tx_bytes", 8),
+         ("rx_pps", "rx_packets", 1),
+         ("tx_pps", "tx_packets", 1),
+         ("rx_errors_ps", "rx_errors", 1),
+         ("tx_errors_ps", "tx_errors", 1),
+         ("rx_dropped_ps", "rx_dropped", 1),
+         ("tx_dropped_ps", "tx_dropped", 1))
+
+# The array typecode of unsigned 64-bit counters. "Q" is new in Python
+# 3.3, "L" is as wide on 64-bit Unix builds of older versions
+try:
+    array('Q')
+    UINT64 = 'Q'
+except ValueError:
+    UINT64 = 'L'
+
+# The duration reported by switches that do not support it
+DURATION_UNSUPPORTED = 4294967295
+
+NAN = float("nan")
+
+
+def iter_port_stats(result):
+    """ The PortStats in a get_port_stats result, which may be a list of
+    Stats, a list of PortStats or a single PortStats """
+    if isinstance(result, PortStats):
+        yield result
+        return
+    for item in result or ():
+        if isinstance(item, Stats):
+            for port_stats in item.port_stats or ():
+                yield port_stats
+        elif isinstance(item, PortStats):
+            yield item
+
+
+class PortStatsPoller(object):
+    """ Samples the port statistics of many datapaths and computes the
+    rate of change of each counter
+
+    The last sample of every port is kept in flat arrays indexed by
+    port, so memory does not grow with the number of samples. Rates are
+    computed with NumPy when it is installed.
+
+    Counters that go backwards are treated as having wrapped at
+    counter_bits. If the port duration goes backwards as well, the
+    switch has reset its counters and the new value is used as is.
+
+    :param hpsdnclient.Api api: The Api to poll
+    :param list dpids: The datapaths to poll. Defaults to all (Optional)
+    :param int counter_bits: The width of the switch counters (Optional)
+    :param int max_workers: The number of threads to poll with (Optional)
+    :param clock: A function returning the current time in seconds
+        (Optional)
+
+    """
+    def __init__(self, api, dpids=None, counter_bits=64, max_workers=None,
+                 clock=time.time):
+        self.api = api
+        self.dpids = dpids
+        self.mask = (1 << counter_bits) - 1
+        self.max_workers = max_workers
+        self.clock = clock
+        self.samples = 0
+        self._slots = {}
+        self._keys = []
+        self._counters = dict((c, array(UINT64)) for c in COUNTERS)
+        self._rates = dict((c, array('d')) for c in COUNTERS)
+        self._seen = array('d')
+        self._duration = array('d')
+        self._lock = threading.Lock()
+        self._stop = None
+
+    def poll(self):
+        """ Sample every port once
+
+        :return: The exceptions raised for datapaths that failed
+        :rtype: dict
+
+        """
+        results = self.api.get_port_stats_all(self.dpids, self.max_workers)
+        self.update(results)
+        return results.failed
+
+    def start(self, interval):
+        """ Poll every interval seconds on a background thread """
+        self.stop()
+        self._stop = threading.Event()
+        thread = threading.Thread(target=self._run,
+                                  args=(interval, self._stop))
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        """ Stop polling in the background """
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+    def _run(self, interval, stop):
+        while not stop.is_set():
+            # Keep polling after failures, a later cycle may succeed
+            try:
+                failed = self.poll()
+            except Exception:
+                LOG.exception("port stats poll failed")
+            else:
+                for dpid, error in failed.items():
+                    LOG.warning("port stats poll failed for %s: %s",
+                                dpid, error)
+            stop.wait(interval)
+
+    def update(self, stats, now=None):
+        """ Add a sample
+
+        :param dict stats: The get_port_stats result, or the exception
+            raised, for each DPID
+        :param float now: The time of the sample (Optional)
+
+        """
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            slots = []
+            durations = []
+            values = dict((c, []) for c in COUNTERS)
+            for dpid, result in stats.items():
+                if isinstance(result, Exception):
+                    continue
+                for port_stats in iter_port_stats(result):
+                    slots.append(self._slot((dpid, port_stats.port_id)))
+                    durations.append(self._port_duration(port_stats))
+                    for counter in COUNTERS:
+                        values[counter].append(
+                            getattr(port_stats, counter) or 0)
+            if slots:
+                if numpy is not None:
+                    self._update_vectorized(slots, durations, values, now)
+                else:
+                    self._update(slots, durations, values, now)
+            self.samples += 1
+
+    @staticmethod
+    def _port_duration(port_stats):
+        if (port_stats.duration_sec is None or
+                port_stats.duration_sec == DURATION_UNSUPPORTED):
+            return -1.0
+        return port_stats.duration_sec + (port_stats.duration_nsec or 0) / 1e9
+
+    def _slot(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self._keys)
+            self._slots[key] = slot
+            self._keys.append(key)
+            for counter in COUNTERS:
+                self._counters[counter].append(0)
+                self._rates[counter].append(NAN)
+            self._seen.append(0.0)
+            self._duration.append(-1.0)
+        return slot
+
+    def _update(self, slots, durations, values, now):
+        for i, slot in enumerate(slots):
+            elapsed = now - self._seen[slot]
+            first = self._seen[slot] == 0.0 or elapsed <= 0
+            reset = durations[i] < self._duration[slot]
+            for counter in COUNTERS:
+                value = values[counter][i] & self.mask
+                if first:
+                    rate = NAN
+                elif reset:
+                    rate = value / elapsed
+                else:
+                    delta = (value - self._counters[counter][slot]) & self.mask
+                    rate = delta / elapsed
+                self._counters[counter][slot] = value
+                self._rates[counter][slot] = rate
+            self._seen[slot] = now
+            self._duration[slot] = durations[i]
+
+    def _update_vectorized(self, slots, durations, values, now):
+        idx = numpy.array(slots, dtype=numpy.intp)
+        seen = numpy.frombuffer(self._seen, dtype=numpy.float64)
+        duration = numpy.frombuffer(self._duration, dtype=numpy.float64)
+        new_duration = numpy.array(durations, dtype=numpy.float64)
+        elapsed = now - seen[idx]
+        first = (seen[idx] == 0.0) | (elapsed <= 0)
+        elapsed[first] = 1.0
+        reset = new_duration < duration[idx]
+        mask = numpy.uint64(self.mask)
+        for counter in COUNTERS:
+            counters = numpy.frombuffer(self._counters[counter],
+                                        dtype=numpy.uint64)
+            rates = numpy.frombuffer(self._rates[counter],
+                                     dtype=numpy.float64)
+            cur = numpy.array(values[counter], dtype=numpy.uint64) & mask
+            # Unsigned subtraction wraps, the mask then gives the
+            # distance travelled by a counter of counter_bits
+            delta = (cur - counters[idx]) & mask
+            delta = numpy.where(reset, cur, delta).astype(numpy.float64)
+            rate = delta / elapsed
+            rate[first] = numpy.nan
+            rates[idx] = rate
+            counters[idx] = cur
+        seen[idx] = now
+        duration[idx] = new_duration
+
+    def ports(self):
+        """ The (dpid, port_id) of every port sampled so far """
+        return list(self._keys)
+
+    def rates(self, dpid, port_id):
+        """ The rates of a port, per second, as of the last sample
+
+        Rates are NaN until a port has been sampled twice.
+
+        :return: {"rx_bps": float, "tx_bps": float, "rx_pps": float, ...}
+        :rtype: dict
+
+        """
+        slot = self._slots[(dpid, port_id)]
+        with self._lock:
+            return dict((name, self._rates[counter][slot] * multiplier)
+                        for name, counter, multiplier in RATES)
+
+    def top(self, n=10, rate="tx_bps"):
+        """ The busiest ports
+
+        :param int n: The number of ports
+        :param str rate: The rate to rank by, e.g. "rx_bps", or "bps"
+            for rx_bps + tx_bps and "pps" for rx_pps + tx_pps
+        :return: ((dpid, port_id), rate) tuples, busiest first
+        :rtype: list
+
+        """
+        if rate in ("bps", "pps"):
+            names = ("rx_" + rate, "tx_" + rate)
+        else:
+            names = (rate,)
+        lookup = dict((name, (counter, multiplier))
+                      for name, counter, multiplier in RATES)
+        with self._lock:
+            if not self._keys:
+                return []
+            if numpy is not None:
+                total = numpy.zeros(len(self._keys))
+                for name in names:
+                    counter, multiplier = lookup[name]
+                    total += numpy.frombuffer(self._rates[counter],
+                                              dtype=numpy.float64) * multiplier
+                total[numpy.isnan(total)] = -1.0
+                count = min(n, len(total))
+                best = numpy.argpartition(-total, count - 1)[:count]
+                best = best[numpy.argsort(-total[best])]
+                return [(self._keys[i], float(total[i]))
+                        for i in best if total[i] >= 0]
+            totals = []
+            for slot, key in enumerate(self._keys):
+                value = 0.0
+                for name in names:
+                    counter, multiplier = lookup[name]
+                    value += self._rates[counter][slot] * multiplier
+                if value == value:
+                    totals.append((value, slot))
+            return [(self._keys[slot], value)
+                    for value, slot in heapq.nlargest(n, totals)]
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+
+""" Record controller responses to a file and serve them back offline """
+
+import base64
+from collections import defaultdict
+import datetime
+import json
+import os
+import threading
+import time
+# Python3 compatibility
+try:
+    from urllib.parse import unquote, urlsplit
+except ImportError:
+    from urllib import unquote
+    from urlparse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from hpsdnclient.datatypes import string_types
+from hpsdnclient.error import NotRecorded
+
+# Pass as the latency to wait as long as the controller took to answer
+RECORDED = "recorded"
+
+# The recorded body is already decoded, and tokens are never recorded
+SKIPPED_HEADERS = ("content-encoding", "transfer-encoding", "content-length",
+                   "x-auth-token")
+
+# Logins carry the credentials and return a token
+AUTH_PATH = "/sdn/v2.0/auth"
+REDACTED = "REDACTED"
+
+
+def request_key(method, url, data=None):
+    """ What a request is matched on: the method, the path and query of
+    the URL and the body. The controller address is left out so that a
+    recording can be replayed against any address, and the path is
+    unquoted. File uploads are matched on the method and URL only, as
+    are logins, so that credentials are not recorded
+
+    :rtype: tuple
+
+    """
+    parts = urlsplit(url)
+    path = unquote(parts.path) + ("?" + parts.query if parts.query else "")
+    if path == AUTH_PATH:
+        data = None
+    elif isinstance(data, bytes):
+        data = data.decode("utf-8", "replace")
+    elif not isinstance(data, string_types):
+        data = None
+    return (method.upper(), path, data)
+
+
+def load(path):
+    """ The interactions of a recording, in the order they were recorded
+
+    :param str path: The file written by a Recorder
+    :rtype: list of dict
+
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _redact(content):
+    """ The body of a login response, with the token replaced """
+    try:
+        data = json.loads(content.decode("utf-8"))
+        data["record"]["token"] = REDACTED
+    except (ValueError, KeyError, TypeError):
+        return b""
+    return json.dumps(data).encode("utf-8")
+
+
+class Recorder(object):
+    """ Writes each request and its response to a file, one JSON object
+    per line. Request headers and login credentials are not recorded
+    and tokens in login responses are replaced by REDACTED. The file is
+    only readable by its owner.
+
+    :param str path: The file to write, replaced if it exists
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        self._file = os.fdopen(fd, "w")
+
+    def record(self, method, url, data, response):
+        """ Record a response. Streamed responses are read in full """
+        method, path, body = request_key(method, url, data)
+        content = response.content or b""
+        if path == AUTH_PATH:
+            content = _redact(content)
+        entry = {"method": method,
+                 "path": path,
+                 "body": body,
+                 "status": response.status_code,
+                 "reason": response.reason,
+                 "headers": dict((k, v) for k, v in response.headers.items()
+                                 if k.lower() not in SKIPPED_HEADERS),
+                 "elapsed": response.elapsed.total_seconds()}
+        try:
+            entry["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["base64"] = base64.b64encode(content).decode("ascii")
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Player(object):
+    """ Serves recorded responses in place of the controller
+
+    A request gets the response recorded for the same method, URL and
+    body. When the same request was recorded several times, e.g. while
+    polling statistics, the responses are served in the recorded order
+    and the last one is repeated once they run out.
+
+    :param str path: The file written by a Recorder
+    :param latency: Seconds to wait before each response, or RECORDED to
+        wait as long as the controller took. Defaults to no wait
+        (Optional)
+
+    """
+    def __init__(self, path, latency=None):
+        self.path = path
+        self.latency = latency
+        self._responses = defaultdict(list)
+        self._served = defaultdict(int)
+        self._lock = threading.Lock()
+        for entry in load(path):
+            key = (entry["method"], entry["path"], entry["body"])
+            self._responses[key].append(entry)
+
+    def play(self, method, url, data=None):
+        """ The recorded response to a request
+
+        :rtype: requests.Response
+        :raises: hpsdnclient.error.NotRecorded
+
+        """
+        key = request_key(method, url, data)
+        with self._lock:
+            entries = self._responses.get(key)
+            if not entries:
+                raise NotRecorded(key[0], url)
+            i = self._served[key]
+            self._served[key] = i + 1
+        entry = entries[min(i, len(entries) - 1)]
+        delay = entry["elapsed"] if self.latency == RECORDED \
+            else self.latency
+        if delay:
+            time.sleep(delay)
+        return _response(entry, key[0], url, key[2], delay or 0)
+
+    def rewind(self):
+        """ Serve every response from the start again """
+        with self._lock:
+            self._served.clear()
+
+    def __len__(self):
+        return sum(len(e) for e in self._responses.values())
+
+
+def _response(entry, method, url, body, delay):
+    if "base64" in entry:
+        content = base64.b64decode(entry["base64"])
+    else:
+        content = entry["text"].encode("utf-8")
+    request = requests.Request(method, url).prepare()
+    request.body = body
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.reason = entry["reason"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.encoding = requests.utils.get_encoding_from_headers(
+        response.headers)
+    response.url = url
+    response.request = request
+    response.elapsed = datetime.timedelta(seconds=delay)
+    response._content = content
+    response._content_consumed = True
+    return response
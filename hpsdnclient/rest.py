@@ -14,13 +14,18 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-import copy
+import threading
+import time
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from hpsdnclient.version import __version__
+import hpsdnclient.codec as codec
 from hpsdnclient.datatypes import JsonObjectFactory, JSON_MAP, PLURALS
 from hpsdnclient.error import raise_errors, NotFound
+from hpsdnclient.replay import Player, Recorder
+from hpsdnclient.stream import iter_items
 
 UA = {
     'content-type': 'application/json',
@@ -28,66 +33,203 @@ UA = {
                   'python-requests/{0}'.format(requests.__version__)
 }
 
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+STREAM_CHUNK_SIZE = 65536
+
 
 class RestClient(object):
-    def __init__(self, auth):
+    """ The HTTP transport shared by every mixin of the Api object.
+
+    All requests go through a single :class:`requests.Session` so that
+    connections (and their TLS sessions) to the controller are kept
+    alive and reused instead of being opened for every call.
+
+    :param auth: The authenticator to use, e.g. hpsdnclient.XAuthToken
+    :param int pool_connections: The number of per-host connection
+        pools to cache
+    :param int pool_maxsize: The maximum number of keep-alive
+        connections kept open to each host
+    :param bool pool_block: Block when no free connection is available
+        instead of opening a throw-away connection
+    :param float idle_timeout: Drop all pooled connections once the
+        client has been idle for this many seconds (Optional)
+    :param bool lazy: Only convert nested datatypes, such as the match
+        and actions of a flow, when they are first accessed
+    :param str record: Record every response to this file (Optional)
+    :param str replay: Serve the responses recorded in this file instead
+        of contacting the controller. No authentication takes place
+        (Optional)
+    :param latency: When replaying, seconds to wait before each
+        response, or hpsdnclient.replay.RECORDED to wait as long as the
+        controller took (Optional)
+
+    """
+    def __init__(self, auth, pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE, pool_block=False,
+                 idle_timeout=None, lazy=False, record=None, replay=None,
+                 latency=None):
         self.auth = auth
         self.args = {"auth": self.auth,
                      "verify": False,
                      "headers": UA,
                      "timeout": 30
                      }
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.idle_timeout = idle_timeout
+        self.lazy = lazy
+        self._lock = threading.Lock()
+        self._last_used = time.time()
+        self._retired = {"requests": 0, "connections": 0}
+        self.session = self._new_session()
+        self.recorder = Recorder(record) if record is not None else None
+        self.player = Player(replay, latency) if replay is not None \
+            else None
+
+    def _new_session(self):
+        session = requests.Session()
+        for prefix in ('https://', 'http://'):
+            adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                                  pool_maxsize=self.pool_maxsize,
+                                  pool_block=self.pool_block)
+            session.mount(prefix, adapter)
+        return session
+
+    def _pools(self):
+        for adapter in self.session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    yield pool
+
+    def _evict_idle(self):
+        """ Close the pooled connections if they have been idle for
+        longer than idle_timeout. Must be called with the lock held """
+        now = time.time()
+        if (self.idle_timeout is not None and
+                now - self._last_used > self.idle_timeout):
+            for pool in self._pools():
+                self._retired["requests"] += pool.num_requests
+                self._retired["connections"] += pool.num_connections
+            self.session.close()
+            self.session = self._new_session()
+        self._last_used = now
+
+    def request(self, method, url, **kwargs):
+        """ Send a request over the pooled session
+
+        No default arguments are applied and no errors are raised, this
+        is the raw transport used by the other methods.
+
+        :param str method: The HTTP method
+        :param str url: The URL
+        :return: The response
+        :rtype: requests.Response
+
+        """
+        if self.player is not None:
+            return self.player.play(method, url, kwargs.get("data"))
+        with self._lock:
+            self._evict_idle()
+            session = self.session
+        response = session.request(method, url, **kwargs)
+        if self.recorder is not None:
+            self.recorder.record(method, url, kwargs.get("data"), response)
+        return response
+
+    def pool_stats(self):
+        """ Connection reuse counters for the pooled session
+
+        :return: The number of requests sent, the number of new
+            connections opened and the number of requests that reused
+            a kept-alive connection
+        :rtype: dict
+
+        """
+        with self._lock:
+            sent = self._retired["requests"]
+            opened = self._retired["connections"]
+            for pool in self._pools():
+                sent += pool.num_requests
+                opened += pool.num_connections
+        return {"requests": sent,
+                "new_connections": opened,
+                "reused_connections": max(sent - opened, 0)}
+
+    def close(self):
+        """ Close all pooled connections and the recording """
+        if self.recorder is not None:
+            self.recorder.close()
+        with self._lock:
+            for pool in self._pools():
+                self._retired["requests"] += pool.num_requests
+                self._retired["connections"] += pool.num_connections
+            self.session.close()
+            self.session = self._new_session()
+
+    def _copy_args(self):
+        # The auth object is shared, only the headers may be changed
+        args = dict(self.args)
+        args["headers"] = dict(self.args["headers"])
+        return args
 
     def _download_args(self):
-        args = copy.deepcopy(self.args)
+        args = self._copy_args()
         args["headers"]["content-type"] = 'application/zip'
         args["timeout"] = 60
         args["stream"] = True
         return args
 
     def _upload_args(self, filename):
-        args = copy.deepcopy(self.args)
+        args = self._copy_args()
         args["headers"]["content-type"] = 'application/zip'
         args["headers"]["Filename"] = filename
         args["timeout"] = 60
         return args
 
-    def _get(self, url, is_file=False):
+    def _get(self, url, is_file=False, stream=False):
         if is_file:
             args = self._download_args()
+        elif stream:
+            args = dict(self.args, stream=True)
         else:
             args = self.args
-        r = requests.get(url, **args)
+        r = self.request('get', url, **args)
         return r
 
     def _put(self, url, data):
-        r = requests.put(url, data=data, **self.args)
+        r = self.request('put', url, data=data, **self.args)
         return r
 
     def _post(self, url, data, is_file=False):
         if is_file:
             args = self._upload_args(data)
             with open(data) as f:
-                r = requests.post(url, data=f, **args)
+                r = self.request('post', url, data=f, **args)
         else:
             args = self.args
-            r = requests.post(url, data=data, **args)
+            r = self.request('post', url, data=data, **args)
         return r
 
     def _delete(self, url, data=None):
         if data is None:
-            r = requests.delete(url, **self.args)
+            r = self.request('delete', url, **self.args)
         else:
-            r = requests.delete(url, data=data, **self.args)
+            r = self.request('delete', url, data=data, **self.args)
         return r
 
     def _head(self, url):
-        r = requests.head(url, **self.args)
+        r = self.request('head', url, **self.args)
         return r
 
 #bhg38 changed the function to be able to handle answers without keyword (sic) like get/netdevices
 
-    def get(self, url, is_file=False):
+    def get(self, url, is_file=False, stream=False):
+        if stream:
+            return self._get_stream(url)
         result = []
         if is_file:
             r = self._get(url, is_file=True)
@@ -99,7 +241,7 @@ class RestClient(object):
         content = r.headers['Content-Type']
 
         if content == 'application/json':
-            data = r.json()
+            data = codec.loads(r.content)
 
             for k in list(data):
                 if not k == 'version':
@@ -114,11 +256,13 @@ class RestClient(object):
                 if datatype is None:
                     result = data[key]
                 else:
-                    result = JsonObjectFactory.create(datatype, data[key])
+                    result = JsonObjectFactory.create(datatype, data[key],
+                                                      self.lazy)
             else:
                 datatype = PLURALS[key]
                 for d in data[key]:
-                    result.append(JsonObjectFactory.create(datatype, d))
+                    result.append(JsonObjectFactory.create(datatype, d,
+                                                           self.lazy))
 
         elif content == 'text/plain':
             result = r.text
@@ -141,6 +285,26 @@ class RestClient(object):
             result = None
         return result
 
+    def _get_stream(self, url):
+        """ Send the request now, but decode the items of a plural
+        response one at a time as the returned iterator is consumed """
+        r = self._get(url, stream=True)
+        try:
+            raise_errors(r)
+        except Exception:
+            r.close()
+            raise
+        return self._iter_objects(r)
+
+    def _iter_objects(self, r):
+        try:
+            chunks = r.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+            for key, data in iter_items(chunks, PLURALS):
+                yield JsonObjectFactory.create(PLURALS[key], data,
+                                               self.lazy)
+        finally:
+            r.close()
+
     def post(self, url, data, is_file=False):
         r = self._post(url, data, is_file)
         raise_errors(r)
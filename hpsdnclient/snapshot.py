@@ -0,0 +1,504 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Compact columnar snapshots of the controller state
+
+A snapshot file holds one table per kind of object. Each field is a
+column: numbers are stored as fixed width arrays, strings, e.g. DPIDs
+and MAC addresses, are stored once in a shared string table and
+referenced by index, and nested datatypes are split into columns of
+their own. Values that fit none of these are stored as interned JSON.
+
+The file is laid out as::
+
+    MAGIC | column blocks | header JSON | header offset | header size | MAGIC
+
+and is read through a memory map, so opening a snapshot only reads the
+header and datatypes are built when a table is loaded.
+
+"""
+
+from array import array
+import mmap
+import struct
+import time
+
+import hpsdnclient.codec as codec
+from hpsdnclient.datatypes import JsonObject, JsonObjectFactory, string_types
+
+# Python 2 compatibility: 64-bit integers use the C long typecodes, as
+# wide on 64-bit Unix builds, and columns are read into arrays because
+# memoryview.cast() is missing
+try:
+    array("q")
+    INT64_TYPECODE, UINT64_TYPECODE = "q", "Q"
+except ValueError:
+    INT64_TYPECODE, UINT64_TYPECODE = "l", "L"
+try:
+    integer_types = (int, long)
+except NameError:
+    integer_types = (int,)
+
+MAGIC = b"HPSDNSN1"
+VERSION = 1
+TRAILER = struct.Struct("<QQ")
+
+DPID_COLUMN = "_dpid"
+
+# kind: array typecode
+TYPECODES = {"int": INT64_TYPECODE,
+             "uint": UINT64_TYPECODE,
+             "float": "d",
+             "bool": "b",
+             "object": "b",
+             "str": "I",
+             "json": "I"}
+NO_STRING = 0xFFFFFFFF
+INT64 = 1 << 63
+
+
+def capture(api, dpids=None, max_workers=None):
+    """ Fetch the state of the fabric
+
+    Datapaths whose ports, flows, groups or meters could not be fetched
+    are left out of those tables.
+
+    :param hpsdnclient.Api api: The Api to query
+    :param list dpids: The datapaths. Defaults to all (Optional)
+    :param int max_workers: The number of threads (Optional)
+    :return: {table: list} and {table: {dpid: list}} for the tables
+        kept per datapath
+    :rtype: dict
+
+    """
+    datapaths = api.get_datapaths()
+    if dpids is None:
+        dpids = [d.dpid for d in datapaths]
+    return {
+        "datapaths": datapaths,
+        "links": api.get_links(),
+        "nodes": api.get_nodes(),
+        "ports": api.get_ports_all(dpids, max_workers).succeeded,
+        "flows": api.get_flows_all(dpids,
+                                   max_workers=max_workers).succeeded,
+        "groups": api.map_datapaths(api.get_groups, dpids,
+                                    max_workers).succeeded,
+        "meters": api.map_datapaths(api.get_meters, dpids,
+                                    max_workers).succeeded,
+    }
+
+
+def _encode(value):
+    """ A JSON-able value, datatypes keep their class name """
+    if isinstance(value, JsonObject):
+        data = dict((f, _encode(getattr(value, f)))
+                    for f in value._attributes()
+                    if getattr(value, f) is not None)
+        data["__type__"] = type(value).__name__
+        return data
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, _encode(v)) for k, v in value.items())
+    return value
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        name = value.pop("__type__", None)
+        data = dict((k, _decode(v)) for k, v in value.items())
+        if name is None:
+            return data
+        return JsonObjectFactory.factories[name](**data)
+    return value
+
+
+def _tobytes(values):
+    try:
+        return values.tobytes()
+    except AttributeError:
+        # Python 2
+        return values.tostring()
+
+
+def _kind(values):
+    kinds = set()
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            kinds.add("bool")
+        elif isinstance(value, integer_types):
+            kinds.add("int" if -INT64 <= value < INT64 else
+                      "uint" if 0 <= value < 2 * INT64 else "json")
+        elif isinstance(value, float):
+            kinds.add("float")
+        elif isinstance(value, string_types):
+            kinds.add("str")
+        elif isinstance(value, JsonObject):
+            kinds.add(type(value))
+        else:
+            kinds.add("json")
+    if not kinds:
+        return "null"
+    if kinds == set(["int", "uint"]):
+        return "uint" if all(v is None or v >= 0 for v in values) \
+            else "json"
+    if len(kinds) > 1:
+        return "json"
+    return kinds.pop()
+
+
+class _Writer(object):
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.offset = 0
+        self.strings = {}
+        self._write(MAGIC)
+
+    def _write(self, data):
+        self.fileobj.write(data)
+        self.offset += len(data)
+
+    def block(self, data):
+        """ Write an 8 byte aligned block, returning its offset """
+        if self.offset % 8:
+            self._write(b"\0" * (8 - self.offset % 8))
+        offset = self.offset
+        self._write(data)
+        return offset
+
+    def intern(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def columns(self, prefix, objects, schema):
+        """ Write a column per field of objects, a list of datatypes or
+        None, nested datatypes are split into columns of their own """
+        present = [o for o in objects if o is not None]
+        if not present:
+            return
+        fields = present[0]._attributes()
+        for field in fields:
+            values = [None if o is None else getattr(o, field, None)
+                      for o in objects]
+            kind = _kind(values)
+            name = prefix + field
+            if isinstance(kind, type):
+                schema.append(self.column(name, "object", values,
+                                          cls=kind.__name__))
+                self.columns(name + ".", values, schema)
+            else:
+                schema.append(self.column(name, kind, values))
+
+    def column(self, name, kind, values, cls=None):
+        if kind == "null":
+            # Nothing to store when no row has a value
+            return {"name": name, "kind": kind, "size": len(values)}
+        if kind == "object":
+            data = array("b", [v is not None for v in values])
+        elif kind == "str":
+            data = array("I", [NO_STRING if v is None else self.intern(v)
+                               for v in values])
+        elif kind == "json":
+            data = array("I", [NO_STRING if v is None else
+                               self.intern(codec.dumps(_encode(v)))
+                               for v in values])
+        else:
+            data = array(TYPECODES[kind], [0 if v is None else v
+                                           for v in values])
+        column = {"name": name, "kind": kind,
+                  "offset": self.block(_tobytes(data)), "size": len(data)}
+        if cls is not None:
+            column["class"] = cls
+        if kind not in ("object", "str", "json") and None in values:
+            nulls = bytearray((len(values) + 7) // 8)
+            for i, value in enumerate(values):
+                if value is None:
+                    nulls[i >> 3] |= 1 << (i & 7)
+            column["nulls"] = self.block(bytes(nulls))
+        return column
+
+    def finish(self, tables, created):
+        strings = [None] * len(self.strings)
+        for value, index in self.strings.items():
+            strings[index] = value.encode("utf-8")
+        offsets = array(UINT64_TYPECODE, [0])
+        for value in strings:
+            offsets.append(offsets[-1] + len(value))
+        header = {"version": VERSION,
+                  "created": created,
+                  "tables": tables,
+                  "strings": {"count": len(strings),
+                              "offsets": self.block(_tobytes(offsets)),
+                              "data": self.block(b"".join(strings))}}
+        data = codec.dumps(header).encode("utf-8")
+        offset = self.block(data)
+        self._write(TRAILER.pack(offset, len(data)))
+        self._write(MAGIC)
+
+
+def write(path, state, created=None):
+    """ Write a snapshot file
+
+    :param str path: The file to write
+    :param dict state: {table: list of datatypes} or, for tables kept
+        per datapath, {table: {dpid: list of datatypes}}, see capture()
+    :param float created: When the state was captured (Optional)
+
+    """
+    if created is None:
+        created = time.time()
+    with open(path, "wb") as fileobj:
+        writer = _Writer(fileobj)
+        tables = {}
+        for name, items in state.items():
+            per_datapath = isinstance(items, dict)
+            if per_datapath:
+                dpids, objects = [], []
+                for dpid, dp_items in items.items():
+                    dp_items = dp_items if isinstance(dp_items, list) \
+                        else [dp_items]
+                    dpids.extend([dpid] * len(dp_items))
+                    objects.extend(dp_items)
+            else:
+                objects = list(items or ())
+            columns = []
+            if per_datapath:
+                columns.append(writer.column(DPID_COLUMN, "str", dpids))
+            writer.columns("", objects, columns)
+            tables[name] = {"class": type(objects[0]).__name__
+                            if objects else None,
+                            "rows": len(objects),
+                            "per_datapath": per_datapath,
+                            "columns": columns}
+        writer.finish(tables, created)
+
+
+def save(api, path, dpids=None, max_workers=None):
+    """ Capture the state of the fabric and write it to a snapshot file
+
+    :rtype: dict
+    :return: The captured state
+
+    """
+    created = time.time()
+    state = capture(api, dpids, max_workers)
+    write(path, state, created)
+    return state
+
+
+class Snapshot(object):
+    """ A snapshot file, read through a memory map
+
+    Opening a snapshot only reads its header. Tables are turned into
+    datatypes by load() and columns can be read without building any
+    datatype at all.
+
+    :param str path: The snapshot file
+
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can not be mapped
+            self._file.close()
+            raise ValueError("Not a snapshot file: {0}".format(path))
+        self._view = memoryview(self._mmap) \
+            if hasattr(memoryview, "cast") else None
+        end = len(self._mmap) - len(MAGIC)
+        if (self._mmap[:len(MAGIC)] != MAGIC or
+                self._mmap[end:] != MAGIC):
+            self.close()
+            raise ValueError("Not a snapshot file: {0}".format(path))
+        offset, size = TRAILER.unpack_from(self._mmap, end - TRAILER.size)
+        header = codec.loads(bytes(self._mmap[offset:offset + size]))
+        self.version = header["version"]
+        self.created = header["created"]
+        self.tables = header["tables"]
+        strings = header["strings"]
+        self._string_count = strings["count"]
+        self._string_offsets = self._array(strings["offsets"],
+                                           UINT64_TYPECODE,
+                                           strings["count"] + 1)
+        self._string_data = strings["data"]
+        self._strings = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """ Unmap the file. Columns returned by column() must have been
+        released first """
+        if self._mmap is None:
+            return
+        self._string_offsets = None
+        if self._view is not None:
+            self._view.release()
+        self._mmap.close()
+        self._file.close()
+        self._mmap = None
+
+    def _array(self, offset, typecode, size):
+        width = array(typecode).itemsize
+        if self._view is not None:
+            return self._view[offset:offset + width * size].cast(typecode)
+        values = array(typecode)
+        values.fromstring(self._mmap[offset:offset + width * size])
+        return values
+
+    def _string(self, index):
+        if index == NO_STRING:
+            return None
+        value = self._strings.get(index)
+        if value is None:
+            start = self._string_data + self._string_offsets[index]
+            end = self._string_data + self._string_offsets[index + 1]
+            value = bytes(self._mmap[start:end]).decode("utf-8")
+            self._strings[index] = value
+        return value
+
+    def _column(self, table, name):
+        for column in self.tables[table]["columns"]:
+            if column["name"] == name:
+                return column
+        raise KeyError(name)
+
+    def column(self, table, name):
+        """ The raw values of a column, without copying them
+
+        Nested fields are named with dots, e.g. "match.ipv4_dst". For
+        string and JSON columns the values are indexes into the string
+        table, see values() for the decoded values.
+
+        :param str table: The table, e.g. "flows"
+        :param str name: The column
+        :return: A view of the file, on Python 2 a copy in an array
+        :rtype: memoryview
+
+        """
+        column = self._column(table, name)
+        if column["kind"] == "null":
+            values = array("I", [NO_STRING] * column["size"])
+            return memoryview(values) if self._view is not None else values
+        return self._array(column["offset"], TYPECODES[column["kind"]],
+                           column["size"])
+
+    def values(self, table, name):
+        """ The values of a column, None where a value is not set
+
+        :rtype: list
+
+        """
+        return self._values(self._column(table, name))
+
+    def _values(self, column):
+        if column["kind"] == "null":
+            return [None] * column["size"]
+        raw = self._array(column["offset"], TYPECODES[column["kind"]],
+                          column["size"])
+        kind = column["kind"]
+        try:
+            if kind == "str":
+                return [self._string(i) for i in raw]
+            if kind == "json":
+                return [None if i == NO_STRING else
+                        _decode(codec.loads(self._string(i)))
+                        for i in raw]
+            if kind in ("bool", "object"):
+                values = [bool(v) for v in raw]
+            else:
+                values = raw.tolist()
+        finally:
+            if self._view is not None:
+                raw.release()
+        nulls = column.get("nulls")
+        if nulls is not None:
+            bits = bytearray(self._mmap[nulls:nulls + (len(values) + 7) // 8])
+            for i in range(len(values)):
+                if bits[i >> 3] >> (i & 7) & 1:
+                    values[i] = None
+        return values
+
+    def load(self, table):
+        """ The datatypes of a table
+
+        :param str table: The table, e.g. "flows"
+        :return: A list, or {dpid: list} for the tables kept per
+            datapath
+        :rtype: list or dict
+
+        """
+        info = self.tables[table]
+        # prefix -> (class name, [(field, values, nested prefix, keep)])
+        plan = {"": (info["class"], [])}
+        defaults = {}
+        dpids = None
+        for column in info["columns"]:
+            name = column["name"]
+            if name == DPID_COLUMN:
+                dpids = self._values(column)
+                continue
+            prefix, _, field = name.rpartition(".")
+            prefix = prefix + "." if prefix else ""
+            cls = plan[prefix][0]
+            if cls not in defaults:
+                defaults[cls] = JsonObjectFactory.factories[cls]()
+            # None only needs passing where the constructor defaults to
+            # something else, e.g. an empty list
+            keep = getattr(defaults[cls], field, None) is not None
+            if column["kind"] == "null" and not keep:
+                continue
+            nested = None
+            if column["kind"] == "object":
+                nested = name + "."
+                plan[nested] = (column["class"], [])
+            plan[prefix][1].append((field, self._values(column), nested,
+                                    keep))
+        objects = [self._build(plan, "", i) for i in range(info["rows"])]
+        if not info["per_datapath"]:
+            return objects
+        result = {}
+        for dpid, obj in zip(dpids, objects):
+            result.setdefault(dpid, []).append(obj)
+        return result
+
+    def _build(self, plan, prefix, row):
+        name, fields = plan[prefix]
+        data = {}
+        for field, values, nested, keep in fields:
+            value = values[row]
+            if nested is not None:
+                if value:
+                    data[field] = self._build(plan, nested, row)
+                elif keep:
+                    data[field] = None
+            elif value is not None or keep:
+                data[field] = value
+        return JsonObjectFactory.factories[name](**data)
+
+    def __len__(self):
+        return len(self.tables)
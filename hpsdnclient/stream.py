@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Incremental decoding of large JSON responses """
+
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+
+
+class _Reader(object):
+    """ A text buffer over an iterator of byte chunks """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """ Read one more chunk, return False at the end of the data """
+        if self.eof:
+            return False
+        # Drop what has been consumed so the buffer stays small
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            self.buf += self.decoder.decode(b'', final=True)
+            return True
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode('utf-8')
+        self.buf += self.decoder.decode(chunk)
+        return True
+
+    def peek(self):
+        """ Skip whitespace and return the next character """
+        while True:
+            while (self.pos < len(self.buf) and
+                   self.buf[self.pos] in WHITESPACE):
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON data")
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError("Expected one of {0!r} at {1!r}".format(
+                chars, self.buf[self.pos:self.pos + 20]))
+        self.pos += 1
+        return char
+
+    def value(self, decoder):
+        """ Decode the next complete JSON value """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                value, end = None, None
+            # A value that runs to the end of the buffer (a number, say)
+            # may continue in the next chunk
+            if end is not None and (end < len(self.buf) or self.eof):
+                self.pos = end
+                return value
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON data")
+
+
+def iter_items(chunks, keys):
+    """ Decode a JSON object from an iterator of byte chunks, yielding
+    the items of its top-level arrays one at a time
+
+    Only the arrays whose key is in keys are decoded item by item, other
+    members are decoded and discarded. At most one item and one chunk
+    are held in memory at once.
+
+    :param chunks: An iterator of bytes, e.g. Response.iter_content()
+    :param keys: The keys of the arrays to stream
+    :return: An iterator of (key, item) tuples
+
+    """
+    reader = _Reader(chunks)
+    decoder = json.JSONDecoder()
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value(decoder)
+        reader.expect(':')
+        if key in keys and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value(decoder)
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            reader.value(decoder)
+        if reader.expect(',}') == '}':
+            return
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Incremental synchronization of the controller topology """
+
+from collections import namedtuple
+
+from hpsdnclient.datatypes import ClusterSync, LinkSync, NodeSync, OPERATION
+from hpsdnclient.topology import link_key
+
+ADD, CHANGE, DELETE, MOVE = OPERATION
+
+LINK = "link"
+NODE = "node"
+CLUSTER = "cluster"
+
+
+def node_key(node):
+    """ The identity of a node, which stays the same when it moves """
+    if node.mac is not None:
+        return (node.mac, node.vid)
+    return (node.ip, node.vid)
+
+
+def _endpoint(link, name):
+    if isinstance(link, dict):
+        return link.get(name)
+    return getattr(link, name)
+
+
+def cluster_dpids(cluster):
+    """ The DPIDs of the datapaths in a cluster """
+    dpids = set()
+    for link in cluster.links or ():
+        dpids.add(_endpoint(link, "src_dpid"))
+        dpids.add(_endpoint(link, "dst_dpid"))
+    dpids.discard(None)
+    return dpids
+
+
+class Delta(namedtuple("Delta", "operation kind key old new")):
+    """ One change between two topology snapshots
+
+    :ivar str operation: One of datatypes.OPERATION, ADD, CHANGE, DELETE
+        or MOVE
+    :ivar str kind: "link", "node" or "cluster"
+    :ivar key: The identity of the item, see link_key and node_key
+    :ivar old: The item before the change, None for ADD
+    :ivar new: The item after the change, None for DELETE
+
+    """
+    __slots__ = ()
+
+    def to_sync(self):
+        """ The change as a LinkSync, NodeSync or ClusterSync datatype
+
+        Node deltas are returned as a NodeSync of the datapath the node
+        is, or was, attached to.
+
+        """
+        item = self.new if self.new is not None else self.old
+        if self.kind == LINK:
+            return LinkSync(s_dpid=item.src_dpid, s_port=item.src_port,
+                            d_dpid=item.dst_dpid, d_port=item.dst_port,
+                            info=item.info)
+        if self.kind == CLUSTER:
+            return ClusterSync(id=item.uid,
+                               nodes=sorted(cluster_dpids(item)))
+        return NodeSync(dpid=item.dpid)
+
+
+def diff(old, new, kind):
+    """ Compare two snapshots, {key: item}, of the same kind
+
+    :return: The ADD, CHANGE and DELETE deltas. For nodes, a node found
+        at a different datapath or port is a MOVE
+    :rtype: list
+
+    """
+    deltas = []
+    for key, item in old.items():
+        if key not in new:
+            deltas.append(Delta(DELETE, kind, key, item, None))
+    for key, item in new.items():
+        previous = old.get(key)
+        if previous is None:
+            deltas.append(Delta(ADD, kind, key, None, item))
+        elif previous != item:
+            if kind == NODE and (previous.dpid, previous.port) != \
+                    (item.dpid, item.port):
+                deltas.append(Delta(MOVE, kind, key, previous, item))
+            else:
+                deltas.append(Delta(CHANGE, kind, key, previous, item))
+    return deltas
+
+
+class TopologySync(object):
+    """ Turns successive polls of the controller into deltas
+
+    Each poll fetches the links, nodes and clusters, diffs them against
+    the previous poll and returns only what was added, changed, deleted
+    or moved. The first poll returns an ADD for everything. When a
+    Topology is given, link deltas are applied to it and its nodes are
+    kept up to date, so consumers never rebuild it.
+
+    :param hpsdnclient.Api api: The Api to poll
+    :param hpsdnclient.topology.Topology topology: A topology to keep up
+        to date (Optional)
+    :param bool clusters: Also sync clusters (Optional)
+
+    """
+    def __init__(self, api, topology=None, clusters=True):
+        self.api = api
+        self.topology = topology
+        self.clusters = clusters
+        self.snapshot = {LINK: {}, NODE: {}, CLUSTER: {}}
+
+    def poll(self):
+        """ Fetch the topology and return what changed since the last
+        poll
+
+        :return: The deltas
+        :rtype: list
+
+        """
+        clusters = self.api.get_clusters() if self.clusters else None
+        return self.update(self.api.get_links(), self.api.get_nodes(),
+                           clusters)
+
+    def update(self, links=None, nodes=None, clusters=None):
+        """ Diff the given lists against the last snapshot. Lists that
+        are None are left unchanged
+
+        :return: The deltas
+        :rtype: list
+
+        """
+        deltas = []
+        for kind, items, key in ((LINK, links, link_key),
+                                 (NODE, nodes, node_key),
+                                 (CLUSTER, clusters, lambda c: c.uid)):
+            if items is None:
+                continue
+            current = dict((key(item), item) for item in items)
+            deltas.extend(diff(self.snapshot[kind], current, kind))
+            self.snapshot[kind] = current
+        if self.topology is not None:
+            self.apply(deltas)
+        return deltas
+
+    def apply(self, deltas):
+        """ Apply deltas to the topology """
+        for delta in deltas:
+            if delta.kind != LINK:
+                continue
+            if (delta.operation in (DELETE, CHANGE) and
+                    delta.key in self.topology.links):
+                self.topology.remove_link(delta.key)
+            if delta.operation in (ADD, CHANGE):
+                self.topology.add_link(delta.new)
+        if any(d.kind == NODE for d in deltas):
+            self.topology.nodes = list(self.snapshot[NODE].values())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Benchmarks for the packet classifier. Run with tox -e benchmark """
+
+import os
+import random
+import unittest
+
+from hpsdnclient.classifier import Classifier, packet_fields
+from hpsdnclient.tests.benchmark.test_datatypes import time_over
+from hpsdnclient.tests.benchmark.test_overlap import acl
+
+RULES = 100000
+PACKETS = int(os.getenv("BENCHMARK_PACKETS", 1000000))
+
+
+def synthetic_packets(count, seed=0):
+    """ Packets to the hosts of acl(), already converted to fields """
+    rand = random.Random(seed)
+    template = packet_fields({"eth_type": "ipv4", "ip_proto": "tcp",
+                              "ipv4_dst": "10.0.0.0", "in_port": 0,
+                              "tcp_dst": 80})
+    packets = []
+    for i in range(count):
+        host = rand.randrange(RULES * 2)
+        fields = dict(template)
+        fields["ipv4_dst"] = 0x0a000000 | host
+        fields["in_port"] = host % 48
+        fields["tcp_dst"] = 80 + host % 5
+        packets.append(fields)
+    return packets
+
+
+class ClassifierBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.table = Classifier(acl(RULES))
+
+    def test_lookup(self):
+        lookup = self.table.lookup
+
+        def run(packets):
+            for fields in packets:
+                lookup(fields)
+        elapsed = time_over(lambda: synthetic_packets(PACKETS), run, 1)
+
+        print("\nclassify {0} packets against {1} rules: {2:.2f}s, "
+              "{3:.0f} packets/s".format(PACKETS, len(self.table), elapsed,
+                                         PACKETS / elapsed))
+        hit = self.table.lookup(synthetic_packets(1)[0])
+        self.assertTrue(hit is None or hit.priority >= 500)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Benchmarks for the JSON codec backends. Run with tox -e benchmark """
+
+import json
+import unittest
+
+import hpsdnclient.codec as codec
+from hpsdnclient.tests.benchmark.test_datatypes import raw_flow, time_over
+
+FLOWS = 20000
+
+
+class CodecBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.batch = {"flows": [raw_flow(i) for i in range(FLOWS)]}
+        cls.text = json.dumps(cls.batch)
+
+    def test_encode_decode(self):
+        pretty = time_over(lambda: self.batch,
+                           lambda data: json.dumps(data, sort_keys=True,
+                                                   indent=4))
+        print("\n{0} flows, pretty stdlib encode {1:.3f}s".format(FLOWS,
+                                                                 pretty))
+        for name in codec.available_backends():
+            c = codec.get_backend(name)
+            encode = time_over(lambda: self.batch, c.dumps)
+            decode = time_over(lambda: self.text, c.loads)
+            size = len(c.dumps(self.batch))
+            print("{0:>8}: encode {1:.3f}s, decode {2:.3f}s, "
+                  "{3:.0f}KB on the wire (pretty {4:.0f}KB)".format(
+                      name, encode, decode, size / 1024.0,
+                      len(json.dumps(self.batch, sort_keys=True,
+                                     indent=4)) / 1024.0))
+            self.assertEqual(c.loads(c.dumps(self.batch)), self.batch)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Benchmarks for the datatypes. Run with tox -e benchmark """
+
+import copy
+import gc
+import os
+import timeit
+import tracemalloc
+import unittest
+
+import hpsdnclient.datatypes as datatypes
+import hpsdnclient.tests.data as test_data
+
+FLOWS = 10000
+# The memory benchmark defaults to 100k flows, set to 1000000 for a full
+# fabric dump
+MEMORY_FLOWS = int(os.getenv("BENCHMARK_FLOWS", 100000))
+
+
+def reflective_to_dict(obj):
+    """ The dir() based serialization the field tables replaced """
+    if isinstance(obj, (datatypes.Match, datatypes.Action)):
+        data = []
+        for attr in dir(obj):
+            if (not callable(getattr(obj, attr)) and
+                    not attr.startswith("_") and getattr(obj, attr)):
+                data.append({attr: getattr(obj, attr)})
+        return data
+    data = {}
+    for attr in dir(obj):
+        if callable(getattr(obj, attr)) or attr.startswith("_"):
+            continue
+        value = getattr(obj, attr)
+        if isinstance(value, datatypes.JsonObject):
+            data[attr] = reflective_to_dict(value)
+        elif value is not None:
+            data[attr] = value
+    return data
+
+
+def dict_based(cls):
+    """ A copy of a datatype that keeps its attributes in a __dict__ """
+    return type(cls.__name__, (object,), {"__init__": cls.__init__})
+
+
+def synthetic_flow(i, flow_cls, match_cls, action_cls):
+    return flow_cls(table_id=i % 3,
+                    priority=i,
+                    cookie=hex(i),
+                    packet_count=i * 3,
+                    byte_count=i * 300,
+                    duration_sec=i * 2,
+                    match=match_cls(in_port=i % 48,
+                                    eth_type="ipv4",
+                                    ipv4_src="10.{0}.{1}.{2}".format(
+                                        i >> 16 & 255, i >> 8 & 255, i & 255)),
+                    actions=action_cls(output=i % 48))
+
+
+def bytes_per_flow(flow_cls, match_cls, action_cls, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    flows = [synthetic_flow(i, flow_cls, match_cls, action_cls)
+             for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del flows
+    return (after - before) / float(count)
+
+
+_legacy_factories = {}
+
+
+def time_over(make_input, fn, repeat=3):
+    """ Time fn(input), excluding the time taken to build the input. As
+    with timeit, the garbage collector is disabled while timing """
+    times = []
+    for i in range(repeat):
+        data = make_input()
+        gc.disable()
+        try:
+            start = timeit.default_timer()
+            fn(data)
+            times.append(timeit.default_timer() - start)
+        finally:
+            gc.enable()
+    return min(times)
+
+
+def legacy_create(id, data):
+    """ The eval() based JsonObjectFactory.create the registry replaced """
+    for key in list(data):
+        if key in datatypes.KEYWORDS:
+            data[key + "_"] = data.pop(key)
+    if id not in _legacy_factories:
+        _legacy_factories[id] = eval("datatypes." + id)
+    return _legacy_factories[id].factory(data)
+
+
+def raw_flow(i):
+    """ The JSON of a flow as the controller sends it """
+    return {"table_id": 0,
+            "priority": i,
+            "cookie": hex(i),
+            "packet_count": i * 3,
+            "byte_count": i * 300,
+            "match": [{"in_port": i % 48},
+                      {"eth_type": "ipv4"},
+                      {"ip_proto": "tcp"},
+                      {"ipv4_src": "10.0.{0}.{1}".format(i >> 8 & 255,
+                                                         i & 255)},
+                      {"ipv4_dst": "10.1.0.1"},
+                      {"tcp_dst": 80}],
+            "actions": [{"set_queue": 1},
+                        {"set_field": {"eth_dst": "00:00:00:00:00:01"}},
+                        {"output": i % 48},
+                        {"output": 48}]}
+
+
+def make_flows(count=FLOWS):
+    return [datatypes.JsonObjectFactory.create('Flow',
+                                               copy.deepcopy(test_data.FLOW))
+            for i in range(count)]
+
+
+class DatatypesBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.flows = make_flows()
+
+    def _time(self, fn):
+        return min(timeit.repeat(fn, number=1, repeat=3))
+
+    def test_to_dict(self):
+        reflective = self._time(
+            lambda: [reflective_to_dict(f) for f in self.flows])
+        tables = self._time(lambda: [f.to_dict() for f in self.flows])
+
+        print("\nto_dict of {0} flows: reflective {1:.3f}s, "
+              "field tables {2:.3f}s ({3:.1f}x)".format(
+                  FLOWS, reflective, tables, reflective / tables))
+        self.assertTrue(tables < reflective)
+
+    def test_eq(self):
+        other = make_flows(len(self.flows))
+        tables = self._time(
+            lambda: [a == b for a, b in zip(self.flows, other)])
+
+        print("\n__eq__ of {0} flow pairs: {1:.3f}s".format(FLOWS, tables))
+        self.assertTrue(all(a == b for a, b in zip(self.flows, other)))
+
+    def test_key_diff(self):
+        # Fresh flows each round, keys are cached once computed
+        keyed = time_over(
+            lambda: (make_flows(), make_flows()),
+            lambda tables: set(f.key() for f in tables[0]) -
+            set(f.key() for f in tables[1]))
+
+        print("\nset difference of two {0} flow tables by key: "
+              "{1:.3f}s".format(FLOWS, keyed))
+        self.assertEqual(set(f.key() for f in self.flows) -
+                         set(f.key() for f in make_flows(FLOWS)), set())
+
+    def test_memory(self):
+        slotted = bytes_per_flow(datatypes.Flow, datatypes.Match,
+                                 datatypes.Action, MEMORY_FLOWS)
+        with_dict = bytes_per_flow(dict_based(datatypes.Flow),
+                                   dict_based(datatypes.Match),
+                                   dict_based(datatypes.Action),
+                                   MEMORY_FLOWS)
+
+        print("\nmemory for {0} flows (Flow, Match, Action): "
+              "__dict__ {1:.0f} bytes/flow, __slots__ {2:.0f} bytes/flow, "
+              "{3:.0f}MB saved per 1M flows".format(
+                  MEMORY_FLOWS, with_dict, slotted,
+                  (with_dict - slotted) * 1000000 / 2 ** 20))
+        self.assertTrue(slotted < with_dict)
+
+    def _time_create(self, lazy):
+        def create(data):
+            flows = [datatypes.JsonObjectFactory.create('Flow', d, lazy)
+                     for d in data]
+            [f.priority for f in flows]
+        return time_over(lambda: [raw_flow(i) for i in range(FLOWS)],
+                         create)
+
+    def test_lazy_create(self):
+        eager = self._time_create(False)
+        lazy = self._time_create(True)
+
+        print("\ncreate {0} flows, reading only the priority: "
+              "eager {1:.3f}s, lazy {2:.3f}s ({3:.1f}x)".format(
+                  FLOWS, eager, lazy, eager / lazy))
+        self.assertTrue(lazy < eager)
+
+    def test_create(self):
+        def run(create):
+            return time_over(
+                lambda: [copy.deepcopy(test_data.DATAPATH)
+                         for i in range(FLOWS)],
+                lambda data: [create('Datapath', d) for d in data], 5)
+
+        legacy = run(legacy_create)
+        registry = run(datatypes.JsonObjectFactory.create)
+
+        print("\ncreate {0} datapaths: eval {1:.0f}/s, "
+              "registry {2:.0f}/s ({3:.2f}x)".format(
+                  FLOWS, FLOWS / legacy, FLOWS / registry,
+                  legacy / registry))
+        self.assertEqual(
+            legacy_create('System', copy.deepcopy(test_data.SYSTEM)),
+            datatypes.JsonObjectFactory.create(
+                'System', copy.deepcopy(test_data.SYSTEM)))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Benchmarks for the flow overlap analyzer. Run with tox -e benchmark """
+
+import os
+import timeit
+import unittest
+
+from hpsdnclient.datatypes import Action, Flow, Match
+from hpsdnclient.overlap import SHADOWED, FlowAnalyzer, _classify
+
+RULES = int(os.getenv("BENCHMARK_RULES", 100000))
+
+
+def acl(count):
+    """ Host routes, with a /24 route at a lower priority for every 256
+    hosts and a few broad rules that shadow some of them """
+    flows = []
+    for i in range(count):
+        flows.append(Flow(priority=1000 + i % 100,
+                          match=Match(eth_type="ipv4", ip_proto="tcp",
+                                      in_port=i % 48, tcp_dst=80 + i % 5,
+                                      ipv4_dst="10.{0}.{1}.{2}".format(
+                                          i >> 16 & 255, i >> 8 & 255,
+                                          i & 255)),
+                          actions=Action(output=i % 47 + 1)))
+        if i % 256 == 0:
+            flows.append(Flow(priority=500,
+                              match=Match(eth_type="ipv4",
+                                          ipv4_dst="10.{0}.{1}.0/24".format(
+                                              i >> 16 & 255, i >> 8 & 255)),
+                              actions=Action(output=48)))
+    for i in range(10):
+        flows.append(Flow(priority=5000,
+                          match=Match(eth_type="ipv4",
+                                      ipv4_dst="10.0.{0}.0/24".format(i)),
+                          actions=Action(output=0)))
+    return flows
+
+
+class OverlapBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.flows = acl(RULES)
+
+    def test_conflicts(self):
+        def run():
+            return FlowAnalyzer(self.flows).conflicts()
+        elapsed = min(timeit.repeat(run, number=1, repeat=3))
+        conflicts = run()
+
+        print("\nindex and analyse {0} rules: {1:.2f}s, {2} "
+              "conflicts".format(len(self.flows), elapsed, len(conflicts)))
+        self.assertTrue(any(c.kind == SHADOWED for c in conflicts))
+
+    def test_pairwise(self):
+        # The quadratic check the indexes avoid, timed on a sample
+        sample = 2000
+        rules = FlowAnalyzer(self.flows[:sample])._tables[0].rules
+
+        def run():
+            for low in rules:
+                for high in rules:
+                    if high.priority > low.priority:
+                        _classify(low, high)
+        elapsed = min(timeit.repeat(run, number=1, repeat=1))
+        print("\npairwise check of {0} rules: {1:.2f}s, {2:.0f}s "
+              "projected for {3}".format(
+                  sample, elapsed,
+                  elapsed * (len(self.flows) / float(sample)) ** 2,
+                  len(self.flows)))
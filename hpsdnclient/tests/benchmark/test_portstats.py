@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Benchmarks for the port rate engine. Run with tox -e benchmark """
+
+import timeit
+import unittest
+
+from hpsdnclient.datatypes import PortStats
+import hpsdnclient.portstats as portstats
+from hpsdnclient.portstats import PortStatsPoller
+
+DATAPATHS = 200
+PORTS = 50
+
+
+def cycle(i):
+    return dict(("00:00:00:00:00:00:{0:02x}:{1:02x}".format(d >> 8, d & 255),
+                 [PortStats(port_id=p, rx_bytes=i * p * 1000,
+                            tx_bytes=i * p * 500, rx_packets=i * p,
+                            tx_packets=i * p, duration_sec=i)
+                  for p in range(1, PORTS + 1)])
+                for d in range(DATAPATHS))
+
+
+class PortStatsBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cycles = [cycle(i) for i in range(1, 4)]
+
+    def _time(self):
+        def run():
+            poller = PortStatsPoller(None)
+            for i, stats in enumerate(self.cycles):
+                poller.update(stats, now=float(i + 1))
+            poller.top(10, "bps")
+        return min(timeit.repeat(run, number=1, repeat=3)) / len(self.cycles)
+
+    def test_update(self):
+        ports = DATAPATHS * PORTS
+        vectorized = self._time() if portstats.numpy is not None else None
+        saved = portstats.numpy
+        portstats.numpy = None
+        try:
+            python = self._time()
+        finally:
+            portstats.numpy = saved
+        print("\n{0} ports per cycle: python {1:.1f}ms".format(
+            ports, python * 1000))
+        if vectorized is not None:
+            print("{0} ports per cycle: numpy {1:.1f}ms".format(
+                ports, vectorized * 1000))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+
+""" Benchmarks for replaying recorded responses. Run with
+tox -e benchmark """
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import timeit
+import unittest
+
+import requests
+
+from hpsdnclient.api import Api
+import hpsdnclient.replay as replay
+from hpsdnclient.tests.benchmark.test_datatypes import raw_flow
+
+DPID = "00:00:00:00:00:00:00:01"
+URL = "https://10.10.10.10:8443/sdn/v2.0/of/datapaths/{0}/flows"
+FLOWS = 10000
+CALLS = 1000
+
+
+class ReplayBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.dir, "flows.rec")
+        recorder = replay.Recorder(cls.path)
+        for count in (FLOWS, 1):
+            r = requests.Response()
+            r.status_code = 200
+            r.reason = "OK"
+            r.headers["Content-Type"] = "application/json"
+            r._content = json.dumps(
+                {"flows": [raw_flow(i) for i in range(count)]}).encode()
+            r.elapsed = datetime.timedelta(seconds=0.002)
+            dpid = DPID if count == FLOWS else DPID[:-1] + "2"
+            recorder.record("get", URL.format(dpid), None, r)
+        recorder.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir)
+
+    def test_replay_large_table(self):
+        api = Api("10.10.10.10", None, replay=self.path)
+        elapsed = min(timeit.repeat(lambda: api.get_flows(DPID), number=1,
+                                    repeat=5))
+        print("\nreplay get_flows of {0} flows: {1:.3f}s, {2:.0f} flows/s"
+              .format(FLOWS, elapsed, FLOWS / elapsed))
+
+    def test_replay_overhead(self):
+        dpid = DPID[:-1] + "2"
+        for latency in (None, replay.RECORDED):
+            api = Api("10.10.10.10", None, replay=self.path, latency=latency)
+            elapsed = min(timeit.repeat(lambda: api.get_flows(dpid),
+                                        number=CALLS, repeat=3))
+            print("\nreplay {0} calls, latency {1}: {2:.1f}us per call"
+                  .format(CALLS, latency, elapsed / CALLS * 1e6))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Benchmarks for snapshot files. Run with tox -e benchmark """
+
+import os
+import shutil
+import tempfile
+import timeit
+import unittest
+
+import hpsdnclient.codec as codec
+import hpsdnclient.snapshot as snapshot
+from hpsdnclient.datatypes import JsonObjectFactory
+from hpsdnclient.tests.benchmark.test_datatypes import raw_flow
+
+DATAPATHS = 100
+FLOWS_PER_DATAPATH = 1000
+
+
+class SnapshotBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.mkdtemp()
+        cls.flows = {}
+        for d in range(DATAPATHS):
+            dpid = "00:00:00:00:00:00:{0:02x}:{1:02x}".format(d >> 8,
+                                                             d & 255)
+            cls.flows[dpid] = [JsonObjectFactory.create('Flow', raw_flow(i))
+                               for i in range(FLOWS_PER_DATAPATH)]
+        cls.snap_path = os.path.join(cls.dir, "fabric.snap")
+        cls.json_path = os.path.join(cls.dir, "fabric.json")
+        snapshot.write(cls.snap_path, {"flows": cls.flows})
+        # The dump this replaces, one to_json_string per flow
+        with open(cls.json_path, "w") as f:
+            f.write("[" + ",".join(
+                '{{"dpid": "{0}", "flow": {1}}}'.format(dpid,
+                                                        flow.to_json_string())
+                for dpid, flows in cls.flows.items() for flow in flows) + "]")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir)
+
+    def test_size(self):
+        snap = os.path.getsize(self.snap_path)
+        dump = os.path.getsize(self.json_path)
+        print("\n{0} flows: JSON {1:.1f}MB, snapshot {2:.1f}MB "
+              "({3:.1f}x smaller)".format(DATAPATHS * FLOWS_PER_DATAPATH,
+                                          dump / 2.0 ** 20,
+                                          snap / 2.0 ** 20, dump /
+                                          float(snap)))
+        self.assertTrue(snap < dump)
+
+    def test_load(self):
+        def load_json():
+            with open(self.json_path) as f:
+                data = codec.loads(f.read())
+            flows = {}
+            for item in data:
+                # The pretty JSON of a flow is not the controller format,
+                # rebuild it as the old tooling did
+                flow = item["flow"]
+                flows.setdefault(item["dpid"], []).append(
+                    JsonObjectFactory.create('Flow', flow))
+            return flows
+
+        def open_snapshot():
+            with snapshot.Snapshot(self.snap_path) as snap:
+                return len(snap.tables)
+
+        def load_snapshot():
+            with snapshot.Snapshot(self.snap_path) as snap:
+                return snap.load("flows")
+
+        def column():
+            with snapshot.Snapshot(self.snap_path) as snap:
+                priorities = snap.column("flows", "priority")
+                total = sum(priorities)
+                priorities.release()
+                return total
+
+        timings = [min(timeit.repeat(fn, number=1, repeat=3))
+                   for fn in (load_json, open_snapshot, load_snapshot,
+                              column)]
+        print("\nreload {0} flows: JSON {1:.2f}s, open snapshot "
+              "{2:.4f}s, load snapshot {3:.2f}s, sum a column "
+              "{4:.4f}s".format(DATAPATHS * FLOWS_PER_DATAPATH, *timings))
+        self.assertEqual(sum(len(f) for f in load_snapshot().values()),
+                         DATAPATHS * FLOWS_PER_DATAPATH)
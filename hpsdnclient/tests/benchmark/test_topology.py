@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Benchmarks for the local topology model. Run with tox -e benchmark """
+
+import random
+import timeit
+import unittest
+
+from hpsdnclient.datatypes import Link
+from hpsdnclient.topology import Topology
+
+# A leaf-spine fabric
+SPINES = 16
+LEAVES = 512
+QUERIES = 10000
+
+
+def fabric():
+    links = []
+    for s in range(SPINES):
+        for l in range(LEAVES):
+            spine = "s{0}".format(s)
+            leaf = "l{0}".format(l)
+            links.append(Link(src_dpid=spine, src_port=l, dst_dpid=leaf,
+                              dst_port=s))
+            links.append(Link(src_dpid=leaf, src_port=s, dst_dpid=spine,
+                              dst_port=l))
+    return links
+
+
+class TopologyBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.links = fabric()
+        cls.topology = Topology(cls.links)
+        rand = random.Random(0)
+        cls.pairs = [("l{0}".format(rand.randrange(LEAVES)),
+                      "l{0}".format(rand.randrange(LEAVES)))
+                     for i in range(QUERIES)]
+
+    def test_build(self):
+        elapsed = min(timeit.repeat(lambda: Topology(self.links), number=1,
+                                    repeat=3))
+        print("\nbuild from {0} links: {1:.3f}s".format(len(self.links),
+                                                       elapsed))
+
+    def test_shortest_path(self):
+        def run():
+            for src, dst in self.pairs:
+                self.topology.shortest_path(src, dst)
+        elapsed = min(timeit.repeat(run, number=1, repeat=3))
+        print("\nshortest_path over {0} links: {1:.1f}us per "
+              "query".format(len(self.links), elapsed / QUERIES * 1e6))
+        self.assertEqual(self.topology.shortest_path("l1", "l2").cost, 2)
+
+    def test_k_shortest_paths(self):
+        def run():
+            for src, dst in self.pairs[:100]:
+                self.topology.k_shortest_paths(src, dst, 4)
+        elapsed = min(timeit.repeat(run, number=1, repeat=3))
+        print("\nk_shortest_paths(k=4): {0:.0f}us per query".format(
+            elapsed / 100 * 1e6))
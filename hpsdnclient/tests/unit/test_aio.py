@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import sys
+import unittest
+
+if sys.version_info < (3, 7):
+    raise unittest.SkipTest("hpsdnclient.aio needs Python 3.7")
+
+import asyncio
+import datetime
+import inspect
+import threading
+import time
+
+from hpsdnclient.aio import AsyncApi, AsyncXAuthToken
+from hpsdnclient.core import CoreMixin
+from hpsdnclient.net import NetMixin
+from hpsdnclient.of import OfMixin
+
+
+def run(*coroutines):
+    """ Run coroutines concurrently on a new event loop, their results """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(asyncio.gather(*coroutines))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class AsyncApiTests(unittest.TestCase):
+    def setUp(self):
+        self.auth = AsyncXAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.auth.token = 'test_token'
+        self.auth.token_expiration = (datetime.datetime.now() +
+                                      datetime.timedelta(days=1))
+
+    def test_mirrors_mixins(self):
+        for mixin in (CoreMixin, OfMixin, NetMixin):
+            for name in vars(mixin):
+                if name.startswith('_'):
+                    continue
+                self.assertTrue(
+                    inspect.iscoroutinefunction(getattr(AsyncApi, name)),
+                    name)
+
+    def test_pool_sized_for_concurrency(self):
+        api = AsyncApi('10.10.10.10', self.auth, max_concurrency=64)
+        self.assertEqual(api.api.restclient.pool_maxsize, 64)
+
+    def test_call_returns_result(self):
+        api = AsyncApi('10.10.10.10', self.auth)
+        api.api.get_flows = lambda dpid, table_id=None: [dpid, table_id]
+
+        result = run(api.get_flows('00:01', table_id=1))
+
+        self.assertEqual(result, [['00:01', 1]])
+
+    def test_several_event_loops(self):
+        api = AsyncApi('10.10.10.10', self.auth, max_concurrency=2)
+        api.api.get_ports = lambda dpid: dpid
+
+        self.assertEqual(run(api.get_ports('1'), api.get_ports('2')),
+                         ['1', '2'])
+        self.assertEqual(run(api.get_ports('3'), api.get_ports('4')),
+                         ['3', '4'])
+
+    def test_stream_is_read_off_the_loop(self):
+        api = AsyncApi('10.10.10.10', self.auth)
+        threads = []
+
+        def get_flows(dpid, stream=False):
+            for i in range(600):
+                threads.append(threading.current_thread())
+                yield i
+
+        api.api.get_flows = get_flows
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        flows = loop.run_until_complete(
+            api.get_flows('00:01', stream=True))
+        items = []
+        while True:
+            try:
+                items.append(loop.run_until_complete(flows.__anext__()))
+            except StopAsyncIteration:
+                break
+
+        self.assertEqual(items, list(range(600)))
+        self.assertFalse(threading.current_thread() in threads)
+
+    def test_bounded_concurrency(self):
+        api = AsyncApi('10.10.10.10', self.auth, max_concurrency=3)
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def get_ports(dpid):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return dpid
+
+        api.api.get_ports = get_ports
+
+        result = run(*[api.get_ports(str(i)) for i in range(20)])
+
+        self.assertEqual(result, [str(i) for i in range(20)])
+        self.assertTrue(state["peak"] <= 3)
+
+
+class AsyncXAuthTokenTests(unittest.TestCase):
+    def test_refresh_once(self):
+        auth = AsyncXAuthToken('10.10.10.10', 'sdn', 'skyline')
+        calls = []
+
+        def get_auth():
+            calls.append(1)
+            time.sleep(0.01)
+            auth.token = 'test_token'
+            auth.token_expiration = (datetime.datetime.now() +
+                                     datetime.timedelta(days=1))
+
+        auth.get_auth = get_auth
+
+        run(*[auth.refresh() for i in range(10)])
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(auth.token, 'test_token')
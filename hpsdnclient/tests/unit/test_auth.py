@@ -15,12 +15,18 @@
 #   limitations under the License.
 
 import datetime
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
 import unittest
 #Python 3.3 compatability
 try:
-    from unittest.mock import MagicMock
+    from unittest.mock import MagicMock, patch
 except ImportError:
-    from mock import MagicMock
+    from mock import MagicMock, patch
 
 import httpretty
 import requests
@@ -103,3 +109,201 @@ class AuthTestCase(unittest.TestCase):
         self.assertEqual(self.xauthtoken.token, None)
         self.assertEqual(self.xauthtoken.token_expiration, None)
 
+
+    def test_call_refreshes_once_across_threads(self):
+        calls = []
+
+        def get_auth():
+            calls.append(1)
+            time.sleep(0.05)
+            self.xauthtoken.token = 'test_token'
+            self.xauthtoken.token_expiration = (datetime.datetime.now() +
+                                                datetime.timedelta(days=1))
+
+        self.xauthtoken.get_auth = get_auth
+        threads = [threading.Thread(target=self.xauthtoken,
+                                    args=(requests.Request(),))
+                   for i in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_call_within_refresh_margin(self):
+        xauthtoken = auth.XAuthToken(self.server, self.user, self.password,
+                                     refresh_margin=60)
+        xauthtoken.get_auth = MagicMock(name='get_auth')
+        xauthtoken.token = 'test_token'
+        xauthtoken.token_expiration = (datetime.datetime.now() +
+                                       datetime.timedelta(seconds=30))
+
+        xauthtoken.__call__(requests.Request())
+
+        xauthtoken.get_auth.assert_called_with()
+
+    @httpretty.activate
+    def test_retry_on_401(self):
+        httpretty.register_uri(httpretty.POST,
+                               'https://10.10.10.10:8443/sdn/v2.0/auth',
+                               body=AUTH,
+                               status=201)
+        httpretty.register_uri(httpretty.GET,
+                               'http://foo.bar',
+                               responses=[
+                                   httpretty.Response(body='', status=401),
+                                   httpretty.Response(body='ok', status=200)
+                               ])
+        self.xauthtoken.token = 'stale_token'
+        self.xauthtoken.token_expiration = (datetime.datetime.now() +
+                                            datetime.timedelta(days=1))
+
+        r = requests.get('http://foo.bar', auth=self.xauthtoken)
+
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.history[0].status_code, 401)
+        self.assertEqual(r.request.headers['X-Auth-Token'],
+                         '6dea10bebf074ec3bc2b641535e04f04')
+
+    @httpretty.activate
+    def test_retry_on_401_only_once(self):
+        httpretty.register_uri(httpretty.POST,
+                               'https://10.10.10.10:8443/sdn/v2.0/auth',
+                               body=AUTH,
+                               status=201)
+        httpretty.register_uri(httpretty.GET,
+                               'http://foo.bar',
+                               status=401)
+        self.xauthtoken.token = 'stale_token'
+        self.xauthtoken.token_expiration = (datetime.datetime.now() +
+                                            datetime.timedelta(days=1))
+
+        r = requests.get('http://foo.bar', auth=self.xauthtoken)
+
+        self.assertEqual(r.status_code, 401)
+        self.assertEqual(len(r.history), 1)
+
+    def test_background_renewal(self):
+        xauthtoken = auth.XAuthToken(self.server, self.user, self.password,
+                                     refresh_margin=60, background=True)
+        xauthtoken.token_expiration = (datetime.datetime.now() +
+                                       datetime.timedelta(seconds=3600))
+
+        xauthtoken._schedule_renewal()
+        self.addCleanup(xauthtoken.stop_renewal)
+
+        self.assertTrue(xauthtoken._timer.daemon)
+        self.assertTrue(3500 < xauthtoken._timer.interval <= 3540)
+        xauthtoken.stop_renewal()
+        self.assertEqual(xauthtoken._timer, None)
+
+    def test_token_without_expiration_is_refreshed(self):
+        self.xauthtoken.token = 'token'
+        self.xauthtoken.get_auth = MagicMock(name='get_auth')
+
+        self.xauthtoken(requests.Request())
+
+        self.xauthtoken.get_auth.assert_called_with()
+
+    def test_background_renewal_survives_errors(self):
+        xauthtoken = auth.XAuthToken(self.server, self.user, self.password,
+                                     background=True)
+        xauthtoken.get_auth = MagicMock(side_effect=ValueError('bad json'))
+        self.addCleanup(xauthtoken.stop_renewal)
+
+        xauthtoken._renew()
+
+        self.assertEqual(xauthtoken._timer.interval, auth.RENEWAL_RETRY)
+
+
+class TokenCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'cache', 'tokens.json')
+        self.cache = auth.TokenCache(self.path)
+        self.expiration = time.time() + 3600
+
+    def test_store_and_load(self):
+        with self.cache.locked():
+            self.cache.store('10.10.10.10', 'sdn', 'test_token',
+                             self.expiration)
+            token, expiry = self.cache.load('10.10.10.10', 'sdn')
+
+        self.assertEqual(token, 'test_token')
+        self.assertEqual(expiry,
+                         datetime.datetime.fromtimestamp(self.expiration))
+        self.assertEqual(self.cache.load('10.10.10.10', 'admin'), None)
+
+    def test_file_permissions(self):
+        with self.cache.locked():
+            self.cache.store('10.10.10.10', 'sdn', 'test_token',
+                             self.expiration)
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        self.assertEqual(
+            stat.S_IMODE(os.stat(os.path.dirname(self.path)).st_mode), 0o700)
+
+    def test_store_replaces_file_without_os_replace(self):
+        rename = os.rename
+
+        def windows_rename(src, dst):
+            if os.path.exists(dst):
+                raise OSError("file exists")
+            rename(src, dst)
+
+        with patch.object(auth, '_replace', auth._replace_file), \
+                patch.object(os, 'rename', windows_rename):
+            self.cache.store('10.10.10.10', 'sdn', 'first', self.expiration)
+            self.cache.store('10.10.10.10', 'sdn', 'second', self.expiration)
+
+        self.assertEqual(self.cache.load('10.10.10.10', 'sdn')[0], 'second')
+
+    def test_expired_token_not_loaded(self):
+        self.cache.store('10.10.10.10', 'sdn', 'test_token',
+                         time.time() - 1)
+
+        self.assertEqual(self.cache.load('10.10.10.10', 'sdn'), None)
+
+    def test_discard_only_matching_token(self):
+        self.cache.store('10.10.10.10', 'sdn', 'test_token', self.expiration)
+
+        self.cache.discard('10.10.10.10', 'sdn', 'other_token')
+        self.assertNotEqual(self.cache.load('10.10.10.10', 'sdn'), None)
+        self.cache.discard('10.10.10.10', 'sdn', 'test_token')
+        self.assertEqual(self.cache.load('10.10.10.10', 'sdn'), None)
+
+    @httpretty.activate
+    def test_get_auth_shares_cached_token(self):
+        httpretty.register_uri(httpretty.POST,
+                               'https://10.10.10.10:8443/sdn/v2.0/auth',
+                               body=AUTH,
+                               status=201)
+        self.cache.store('10.10.10.10', 'sdn', 'cached_token',
+                         self.expiration)
+        xauthtoken = auth.XAuthToken('10.10.10.10', 'sdn', 'skyline',
+                                     cache=self.cache)
+
+        xauthtoken.get_auth()
+
+        self.assertEqual(xauthtoken.token, 'cached_token')
+        self.assertEqual(len(httpretty.latest_requests()), 0)
+
+    @httpretty.activate
+    def test_get_auth_stores_new_token(self):
+        httpretty.register_uri(httpretty.POST,
+                               'https://10.10.10.10:8443/sdn/v2.0/auth',
+                               body=AUTH,
+                               status=201)
+        xauthtoken = auth.XAuthToken('10.10.10.10', 'sdn', 'skyline',
+                                     cache=self.cache)
+        # The token in AUTH expired long ago, so don't check its expiry
+        self.cache.load = MagicMock(return_value=None)
+        self.cache.store = MagicMock()
+
+        xauthtoken.get_auth()
+
+        self.cache.store.assert_called_with('10.10.10.10', 'sdn',
+                                            '6dea10bebf074ec3bc2b641535e04f04',
+                                            1385824487000 / 1000)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import threading
+import time
+import unittest
+try:
+    from unittest.mock import MagicMock, patch
+except ImportError:
+    from mock import MagicMock, patch
+
+import requests
+
+import hpsdnclient.bulk as bulk
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import Action, DEFAULT_PRIORITY, Flow, Match
+from hpsdnclient.error import IllegalArgument, OpenflowProtocolError
+
+DPID = '00:00:00:00:00:00:00:01'
+
+
+def make_flows(count):
+    return [Flow(priority=i, match=Match(tcp_dst=i),
+                 actions=Action(output=1)) for i in range(count)]
+
+
+class BulkMixinTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.api = Api('10.10.10.10', auth)
+        self.flows = make_flows(10)
+        patcher = patch.object(bulk, 'RETRY_DELAY', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_add_flows_bulk_chunks(self):
+        self.api.add_flows = MagicMock()
+
+        result = self.api.add_flows_bulk(DPID, self.flows, chunk_size=4)
+
+        self.assertEqual(result.chunks, 3)
+        self.assertEqual(self.api.add_flows.call_count, 3)
+        sizes = sorted(len(c[0][1]) for c in self.api.add_flows.call_args_list)
+        self.assertEqual(sizes, [2, 4, 4])
+        self.assertTrue(result.ok)
+        self.assertEqual(sorted(f.priority for f in result.succeeded),
+                         list(range(10)))
+        self.assertEqual(result.retries, 0)
+
+    def test_chunks_are_pipelined(self):
+        arrived = threading.Condition()
+        state = {'in_flight': 0, 'peak': 0}
+
+        def add_flows(dpid, flows):
+            # Hold each chunk until three are in flight at the same time
+            with arrived:
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+                arrived.notify_all()
+                deadline = time.time() + 5
+                while state['peak'] < 3 and time.time() < deadline:
+                    arrived.wait(deadline - time.time())
+                state['in_flight'] -= 1
+
+        self.api.add_flows = add_flows
+
+        result = self.api.add_flows_bulk(DPID, make_flows(9), chunk_size=3,
+                                         max_workers=3)
+
+        self.assertTrue(result.ok)
+        self.assertEqual(state['peak'], 3)
+
+    def test_transient_failure_is_retried(self):
+        calls = []
+
+        def add_flows(dpid, flows):
+            calls.append(flows)
+            if len(calls) == 1:
+                raise requests.ConnectionError("reset")
+
+        self.api.add_flows = add_flows
+
+        result = self.api.add_flows_bulk(DPID, self.flows, chunk_size=10)
+
+        self.assertTrue(result.ok)
+        self.assertEqual(result.retries, 1)
+        self.assertEqual(len(calls), 2)
+
+    def test_bad_flow_is_isolated(self):
+        def add_flows(dpid, flows):
+            if any(f.priority == 6 for f in flows):
+                raise IllegalArgument({"error": "", "message": "bad"})
+
+        self.api.add_flows = add_flows
+
+        result = self.api.add_flows_bulk(DPID, self.flows, chunk_size=10)
+
+        self.assertFalse(result.ok)
+        self.assertEqual(len(result.succeeded), 9)
+        self.assertEqual(len(result.failed), 1)
+        flow, error = result.failed[0]
+        self.assertEqual(flow.priority, 6)
+        self.assertTrue(isinstance(error, IllegalArgument))
+        self.assertEqual(result.retries, 0)
+
+    def test_retries_are_bounded(self):
+        response = requests.Response()
+        response.status_code = 503
+        self.api.delete_flows = MagicMock(
+            side_effect=requests.HTTPError(response=response))
+
+        result = self.api.delete_flows_bulk(DPID, self.flows[:1],
+                                            retries=2)
+
+        self.assertEqual(self.api.delete_flows.call_count, 3)
+        self.assertEqual(result.retries, 2)
+        self.assertEqual(len(result.failed), 1)
+
+    def test_protocol_error_is_isolated(self):
+        def add_flows(dpid, flows):
+            if any(f.priority == 42 for f in flows):
+                raise OpenflowProtocolError()
+
+        self.api.add_flows = add_flows
+
+        result = self.api.add_flows_bulk(DPID, make_flows(100),
+                                         chunk_size=50)
+
+        self.assertEqual(len(result.succeeded), 99)
+        self.assertEqual([f.priority for f, e in result.failed], [42])
+        self.assertEqual(result.retries, 0)
+
+    def test_unreachable_controller_is_not_bisected(self):
+        self.api.add_flows = MagicMock(
+            side_effect=requests.ConnectionError("unreachable"))
+
+        result = self.api.add_flows_bulk(DPID, make_flows(500),
+                                         chunk_size=100, retries=2)
+
+        # One attempt and two retries per chunk
+        self.assertEqual(self.api.add_flows.call_count, 15)
+        self.assertEqual(result.retries, 10)
+        self.assertEqual(len(result.failed), 500)
+        self.assertTrue(isinstance(result.failed[0][1],
+                                   requests.ConnectionError))
+
+    def test_update_flows_bulk(self):
+        self.api.update_flows = MagicMock()
+
+        result = self.api.update_flows_bulk(DPID, self.flows)
+
+        self.api.update_flows.assert_called_once_with(DPID, self.flows)
+        self.assertEqual(len(result.succeeded), 10)
+
+    def test_empty(self):
+        self.api.add_flows = MagicMock()
+
+        result = self.api.add_flows_bulk(DPID, [])
+
+        self.assertEqual(result.chunks, 0)
+        self.assertFalse(self.api.add_flows.called)
+        self.assertEqual(result.flows_per_sec, 0.0)
+
+
+def installed(flow, **counters):
+    """ A flow as get_flows returns it, with counters """
+    data = flow.to_dict()
+    data.setdefault('table_id', 0)
+    data.update(counters)
+    return Flow.factory(data)
+
+
+class SyncFlowsTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.api = Api('10.10.10.10', auth)
+        self.api.add_flows = MagicMock()
+        self.api.update_flows = MagicMock()
+        self.api.delete_flows = MagicMock()
+
+    def sent(self, method):
+        return [f for c in method.call_args_list for f in c[0][1]]
+
+    def test_diff_flows(self):
+        flows = make_flows(4)
+        current = [installed(f, packet_count=10, duration_sec=5)
+                   for f in flows[:3]]
+        changed = Flow(priority=1, match=Match(tcp_dst=1),
+                       actions=Action(output=2))
+
+        changes = bulk.diff_flows(current, [flows[0], changed, flows[3]])
+
+        self.assertEqual(changes.add, [flows[3]])
+        self.assertEqual(changes.modify, [changed])
+        self.assertEqual([f.priority for f in changes.delete], [2])
+
+    def test_flow_key_defaults(self):
+        flow = Flow(match=Match(eth_type='ipv4'))
+        self.assertEqual(bulk.flow_key(flow),
+                         (0, DEFAULT_PRIORITY, (('eth_type', 0x800),)))
+        self.assertEqual(bulk.flow_key(installed(flow)),
+                         bulk.flow_key(flow))
+
+    def test_sync_flows_writes_only_the_difference(self):
+        flows = make_flows(6)
+        self.api.get_flows = MagicMock(
+            return_value=[installed(f) for f in flows[:5]])
+        desired = flows[1:5] + [Flow(priority=5, match=Match(tcp_dst=5),
+                                     actions=Action(output=1))]
+        desired[0] = Flow(priority=1, match=Match(tcp_dst=1),
+                          actions=Action(output=3))
+
+        result = self.api.sync_flows(DPID, desired)
+
+        self.api.get_flows.assert_called_once_with(DPID, None)
+        self.assertEqual(self.sent(self.api.add_flows), [desired[-1]])
+        self.assertEqual(self.sent(self.api.update_flows), [desired[0]])
+        self.assertEqual([f.priority for f in
+                          self.sent(self.api.delete_flows)], [0])
+        self.assertTrue(result.ok)
+        self.assertEqual(len(result.added.succeeded), 1)
+
+    def test_sync_flows_converged(self):
+        flows = make_flows(3)
+        self.api.get_flows = MagicMock(
+            return_value=[installed(f, byte_count=100) for f in flows])
+
+        result = self.api.sync_flows(DPID, flows)
+
+        self.assertFalse(self.api.add_flows.called)
+        self.assertFalse(self.api.update_flows.called)
+        self.assertFalse(self.api.delete_flows.called)
+        self.assertEqual(result.deleted.chunks, 0)
+
+    def test_sync_flows_without_prune(self):
+        flows = make_flows(3)
+        self.api.get_flows = MagicMock(
+            return_value=[installed(f) for f in flows])
+
+        self.api.sync_flows(DPID, flows[:1], prune=False)
+
+        self.assertFalse(self.api.delete_flows.called)
+
+    def test_sync_flows_one_table(self):
+        other = Flow(table_id=1, priority=7, match=Match(in_port=3))
+        self.api.get_flows = MagicMock(
+            return_value=[installed(other)])
+
+        self.api.sync_flows(DPID, [], table_id=0)
+
+        # get_flows returns every table for table 0
+        self.assertFalse(self.api.delete_flows.called)
+
+    def test_sync_flows_isolates_a_rejected_flow(self):
+        flows = make_flows(20)
+        self.api.get_flows = MagicMock(return_value=[])
+
+        def add_flows(dpid, flows):
+            if any(f.priority == 10 for f in flows):
+                raise OpenflowProtocolError()
+
+        self.api.add_flows = add_flows
+
+        result = self.api.sync_flows(DPID, flows, chunk_size=20)
+
+        self.assertFalse(result.ok)
+        self.assertEqual(len(result.added.succeeded), 19)
+        self.assertEqual([f.priority for f, e in result.added.failed], [10])
+
+
+class BulkResultTests(unittest.TestCase):
+    def test_flows_per_sec(self):
+        result = bulk.BulkResult()
+        result.succeeded = make_flows(50)
+        result.elapsed = 2.0
+        self.assertEqual(result.flows_per_sec, 25.0)
+
+    def test_is_transient(self):
+        response = requests.Response()
+        response.status_code = 503
+        self.assertTrue(bulk.is_transient(
+            requests.HTTPError(response=response)))
+        response = requests.Response()
+        response.status_code = 403
+        self.assertFalse(bulk.is_transient(
+            requests.HTTPError(response=response)))
+        response = requests.Response()
+        response.status_code = 500
+        self.assertFalse(bulk.is_transient(
+            requests.HTTPError(response=response)))
+        self.assertTrue(bulk.is_transient(requests.Timeout()))
+        self.assertFalse(bulk.is_transient(OpenflowProtocolError()))
+        self.assertFalse(bulk.is_transient(ValueError()))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.cache import TopologyCache
+from hpsdnclient.datatypes import Link
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TopologyCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = TopologyCache(ttls={"links": 10}, maxsize=3,
+                                   clock=self.clock)
+        self.fetch = MagicMock(side_effect=lambda: object())
+
+    def test_hit_and_miss(self):
+        first = self.cache.lookup("links", (None,), self.fetch)
+        second = self.cache.lookup("links", (None,), self.fetch)
+
+        self.assertTrue(first is second)
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(self.cache.stats(),
+                         {"links": {"hits": 1, "misses": 1}})
+
+    def test_expiry(self):
+        self.cache.lookup("links", (None,), self.fetch)
+        self.clock.now += 10
+        self.cache.lookup("links", (None,), self.fetch)
+
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_per_endpoint_ttl(self):
+        self.cache.lookup("links", (None,), self.fetch)
+        self.cache.lookup("clusters", (), self.fetch)
+        self.clock.now += 30
+        self.cache.lookup("links", (None,), self.fetch)
+        self.cache.lookup("clusters", (), self.fetch)
+
+        self.assertEqual(self.cache.stats()["clusters"]["hits"], 1)
+        self.assertEqual(self.cache.stats()["links"]["hits"], 0)
+
+    def test_no_ttl_never_expires(self):
+        cache = TopologyCache(ttls={"links": None}, clock=self.clock)
+        cache.lookup("links", (None,), self.fetch)
+        self.clock.now += 10 ** 6
+        cache.lookup("links", (None,), self.fetch)
+
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_uncached_endpoint(self):
+        self.cache.lookup("ports", (), self.fetch)
+        self.cache.lookup("ports", (), self.fetch)
+
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru_eviction(self):
+        for dpid in ("a", "b", "c"):
+            self.cache.lookup("links", (dpid,), self.fetch)
+        # Use "a" so that "b" is the least recently used
+        self.cache.lookup("links", ("a",), self.fetch)
+        self.cache.lookup("links", ("d",), self.fetch)
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.evictions, 1)
+        self.cache.lookup("links", ("a",), self.fetch)
+        self.assertEqual(self.fetch.call_count, 4)
+        self.cache.lookup("links", ("b",), self.fetch)
+        self.assertEqual(self.fetch.call_count, 5)
+
+    def test_invalidate(self):
+        self.cache.lookup("links", ("a",), self.fetch)
+        self.cache.lookup("links", ("b",), self.fetch)
+        self.cache.lookup("nodes", (), self.fetch)
+
+        self.cache.invalidate("links", ("a",))
+        self.assertEqual(len(self.cache), 2)
+        self.cache.invalidate("links")
+        self.assertEqual(len(self.cache), 1)
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_fetch_across_invalidation_is_not_stored(self):
+        def fetch():
+            # The links change while the controller answers
+            self.cache.link_changed()
+            return "stale"
+
+        value = self.cache.lookup("links", (None,), fetch)
+
+        self.assertEqual(value, "stale")
+        self.assertFalse(self.cache.contains("links", (None,)))
+        self.assertNotEqual(self.cache.lookup("links", (None,), self.fetch),
+                            "stale")
+        self.assertEqual(self.fetch.call_count, 1)
+
+
+class ApiTopologyCacheTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.api = Api('10.10.10.10', auth, topology_cache=True)
+        self.api.restclient.get = MagicMock(return_value=[])
+
+    def test_disabled_by_default(self):
+        api = Api('10.10.10.10', XAuthToken('10.10.10.10', 'sdn', 'skyline'))
+        self.assertEqual(api.topology_cache, None)
+
+    def test_topology_queries_cached(self):
+        for i in range(3):
+            self.api.get_clusters()
+            self.api.get_links()
+            self.api.get_nodes(dpid='00:00:00:00:00:00:00:01')
+            self.api.get_devices()
+            self.api.get_forward_path('00:00:00:00:00:00:00:01',
+                                      '00:00:00:00:00:00:00:02')
+
+        self.assertEqual(self.api.restclient.get.call_count, 5)
+        for counters in self.api.topology_cache.stats().values():
+            self.assertEqual(counters, {"hits": 2, "misses": 1})
+
+    def test_arguments_are_part_of_the_key(self):
+        self.api.get_links('00:00:00:00:00:00:00:01')
+        self.api.get_links('00:00:00:00:00:00:00:02')
+
+        self.assertEqual(self.api.restclient.get.call_count, 2)
+
+    def test_stream_bypasses_cache(self):
+        self.api.get_links(stream=True)
+        self.api.get_links(stream=True)
+
+        self.assertEqual(self.api.restclient.get.call_count, 2)
+        self.assertEqual(len(self.api.topology_cache), 0)
+
+
+class LinkChangeTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.api = Api('10.10.10.10', auth, topology_cache=True)
+        self.links = [Link(src_dpid='00:01', src_port=1,
+                           dst_dpid='00:02', dst_port=2)]
+
+        def get(url):
+            if 'links' in url:
+                return list(self.links)
+            return object()
+        self.api.restclient.get = MagicMock(side_effect=get)
+        self.cache = self.api.topology_cache
+
+    def test_unchanged_links_keep_paths(self):
+        path = self.api.get_forward_path('00:01', '00:02')
+        self.api.get_links()
+        self.cache.invalidate('links')
+        self.api.get_links()
+
+        self.assertTrue(self.api.get_forward_path('00:01', '00:02') is path)
+
+    def test_changed_links_drop_paths(self):
+        self.api.get_links()
+        path = self.api.get_forward_path('00:01', '00:02')
+        self.links.append(Link(src_dpid='00:02', src_port=3,
+                               dst_dpid='00:03', dst_port=1))
+        self.cache.invalidate('links')
+        self.api.get_links()
+
+        self.assertFalse(self.cache.contains('forward_path',
+                                             ('00:01', '00:02')))
+        self.assertFalse(self.api.get_forward_path('00:01', '00:02') is path)
+
+    def test_notify_link_change(self):
+        self.api.get_links()
+        self.api.get_forward_path('00:01', '00:02')
+
+        self.api.notify_link_change()
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_notify_without_cache(self):
+        api = Api('10.10.10.10', XAuthToken('10.10.10.10', 'sdn', 'skyline'))
+        api.notify_link_change()
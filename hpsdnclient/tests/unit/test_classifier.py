@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from hpsdnclient.classifier import (Classifier, Simulator, output_ports,
+                                    packet_fields)
+from hpsdnclient.datatypes import (Action, Ethernet, Flow, Instruction, Ip,
+                                   Link, Match, Packet, Tcp)
+from hpsdnclient.error import NotFound
+from hpsdnclient.topology import Topology
+
+S1 = '00:00:00:00:00:00:00:01'
+S2 = '00:00:00:00:00:00:00:02'
+S3 = '00:00:00:00:00:00:00:03'
+
+
+def flow(priority, output, table_id=None, **match):
+    return Flow(table_id=table_id, priority=priority, match=Match(**match),
+                actions=Action(output=output))
+
+
+def web_packet(dst='10.0.1.5'):
+    return Packet(eth=Ethernet(eth_src='00:00:00:00:00:0a',
+                               eth_dst='00:00:00:00:00:0b',
+                               eth_type='ipv4'),
+                  ip=Ip(ipv4_src='10.0.0.1', ipv4_dst=dst, ip_proto='tcp'),
+                  tcp=Tcp(tcp_src=40000, tcp_dst=80))
+
+
+class PacketFieldsTests(unittest.TestCase):
+    def test_packet(self):
+        fields = packet_fields(web_packet(), in_port=3)
+
+        self.assertEqual(fields['in_port'], 3)
+        self.assertEqual(fields['eth_type'], 0x800)
+        self.assertEqual(fields['ip_proto'], 6)
+        self.assertEqual(fields['ipv4_dst'], 0x0a000105)
+        self.assertEqual(fields['tcp_dst'], 80)
+        self.assertEqual(fields['eth_dst'], 0x0b)
+
+    def test_dict_implies_prerequisites(self):
+        fields = packet_fields({'tcp_dst': '22', 'ipv4_dst': '10.0.0.1'})
+
+        self.assertEqual(fields['ip_proto'], 6)
+        self.assertEqual(fields['eth_type'], 0x800)
+
+    def test_idempotent(self):
+        fields = packet_fields(web_packet(), 1)
+        self.assertEqual(packet_fields(fields), fields)
+
+
+class ClassifierTests(unittest.TestCase):
+    def test_priority(self):
+        table = Classifier([flow(100, 1, ipv4_dst='10.0.0.0/8'),
+                            flow(200, 2, ipv4_dst='10.0.1.0/24'),
+                            flow(300, 3, ipv4_dst='10.0.1.5', tcp_dst=22),
+                            flow(0, 4)])
+
+        def out(dst, port=80):
+            f = table.lookup(packet_fields({'ipv4_dst': dst,
+                                            'tcp_dst': port}))
+            return f.actions.output
+
+        self.assertEqual(out('10.0.1.5'), 2)
+        self.assertEqual(out('10.0.1.5', 22), 3)
+        self.assertEqual(out('10.2.0.1'), 1)
+        self.assertEqual(out('192.168.0.1'), 4)
+        self.assertEqual(len(table), 4)
+
+    def test_miss(self):
+        table = Classifier([flow(100, 1, in_port=1)])
+        self.assertTrue(table.lookup(packet_fields({}, 2)) is None)
+        # A packet without the field does not match a flow that needs it
+        self.assertTrue(table.lookup(packet_fields({})) is None)
+
+    def test_same_match_highest_priority(self):
+        table = Classifier([flow(100, 1, in_port=1),
+                            flow(200, 2, in_port=1),
+                            flow(150, 3, in_port=1)])
+        self.assertEqual(table.lookup({'in_port': 1}).priority, 200)
+
+    def test_add_after_lookup(self):
+        table = Classifier([flow(100, 1, in_port=1)])
+        table.lookup({'in_port': 1})
+        table.add(flow(200, 2))
+        self.assertEqual(table.lookup({'in_port': 1}).priority, 200)
+
+    def test_output_ports(self):
+        self.assertEqual(output_ports(flow(1, [1, '2'])), [1, 2])
+        instructions = Flow(instructions=[Instruction(
+            apply_actions=[{'set_queue': 1}, {'output': 5}])])
+        self.assertEqual(output_ports(instructions), [5])
+        self.assertEqual(output_ports(Flow()), [])
+
+
+class SimulatorTests(unittest.TestCase):
+    def setUp(self):
+        # S1 port 2 <-> S2 port 1, S2 port 2 <-> S3 port 1
+        links = [Link(src_dpid=S1, src_port=2, dst_dpid=S2, dst_port=1),
+                 Link(src_dpid=S2, src_port=1, dst_dpid=S1, dst_port=2),
+                 Link(src_dpid=S2, src_port=2, dst_dpid=S3, dst_port=1),
+                 Link(src_dpid=S3, src_port=1, dst_dpid=S2, dst_port=2)]
+        self.flows = {
+            S1: [flow(100, 2, ipv4_dst='10.0.1.0/24'),
+                 flow(100, 9, table_id=1, ipv4_dst='10.0.1.0/24')],
+            S2: [flow(100, 2, in_port=1, eth_type='ipv4'),
+                 flow(50, 'CONTROLLER')],
+            S3: [flow(100, 5, tcp_dst=80)],
+        }
+        self.simulator = Simulator(self.flows, Topology(links))
+
+    def test_classify(self):
+        self.assertEqual(self.simulator.classify(S1, web_packet()),
+                         self.flows[S1][0])
+        self.assertEqual(self.simulator.classify(S2, web_packet(), 2),
+                         self.flows[S2][1])
+        self.assertTrue(self.simulator.classify('unknown',
+                                                web_packet()) is None)
+
+    def test_next_hop(self):
+        hop = self.simulator.next_hop(S1, web_packet(), in_port=1)
+
+        self.assertEqual(hop.out_ports, [2])
+        self.assertEqual(hop.next, [(S2, 1)])
+
+    def test_trace(self):
+        hops = self.simulator.trace(S1, web_packet(), in_port=1)
+
+        self.assertEqual([(h.dpid, h.in_port) for h in hops],
+                         [(S1, 1), (S2, 1), (S3, 1)])
+        self.assertEqual(hops[-1].out_ports, [5])
+        self.assertEqual(hops[-1].next, [])
+
+    def test_trace_table_miss(self):
+        hops = self.simulator.trace(S1, web_packet('192.168.0.1'), 1)
+
+        self.assertEqual(len(hops), 1)
+        self.assertTrue(hops[0].flow is None)
+
+    def test_trace_loop(self):
+        flows = {S1: [flow(1, 2)], S2: [flow(1, 1)]}
+        links = [Link(src_dpid=S1, src_port=2, dst_dpid=S2, dst_port=1),
+                 Link(src_dpid=S2, src_port=1, dst_dpid=S1, dst_port=2)]
+        hops = Simulator(flows, Topology(links)).trace(S1, {}, 2)
+
+        self.assertEqual([(h.dpid, h.in_port) for h in hops],
+                         [(S1, 2), (S2, 1)])
+
+    def test_from_api(self):
+        api = MagicMock()
+        api.get_flows_all.return_value = {S1: self.flows[S1],
+                                          S2: NotFound(S2)}
+
+        simulator = Simulator.from_api(api, topology=Topology())
+
+        api.get_flows_all.assert_called_once_with(None)
+        self.assertEqual(simulator.classify(S1, web_packet()),
+                         self.flows[S1][0])
+        self.assertTrue(simulator.classify(S2, web_packet()) is None)
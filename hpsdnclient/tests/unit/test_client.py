@@ -20,6 +20,7 @@ from hpsdnclient.api import Api
 from hpsdnclient.auth import XAuthToken
 from hpsdnclient.apibase import ApiBase
 from hpsdnclient.core import CoreMixin
+from hpsdnclient.fanout import FanoutMixin
 from hpsdnclient.net import NetMixin
 from hpsdnclient.of import OfMixin
 
@@ -37,5 +38,6 @@ class ApiTestCase(unittest.TestCase):
         self.assertTrue(isinstance(api, CoreMixin))
         self.assertTrue(isinstance(api, NetMixin))
         self.assertTrue(isinstance(api, OfMixin))
+        self.assertTrue(isinstance(api, FanoutMixin))
         self.assertEqual(api.restclient.auth, self.auth)
         self.assertEqual(api.controller, '10.10.10.10')
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import unittest
+
+import hpsdnclient.codec as codec
+import hpsdnclient.datatypes as datatypes
+
+
+class CodecTests(unittest.TestCase):
+    """ Tests every installed JSON backend """
+
+    def setUp(self):
+        self.backend = codec.backend()
+        self.data = {"flow": {"priority": 30000,
+                              "match": [{"ipv4_src": "10.0.0.1"}],
+                              "actions": [{"output": 2}],
+                              "name": u"caf\u00e9"}}
+
+    def tearDown(self):
+        codec.set_backend(self.backend)
+
+    def test_default_is_fastest(self):
+        self.assertEqual(codec.get_backend().name,
+                         codec.available_backends()[0])
+        self.assertIn("json", codec.available_backends())
+
+    def test_round_trip(self):
+        for name in codec.available_backends():
+            c = codec.get_backend(name)
+            text = c.dumps(self.data)
+            self.assertEqual(json.loads(text), self.data, name)
+            self.assertEqual(c.loads(text), self.data, name)
+            self.assertEqual(c.loads(text.encode('utf-8')), self.data, name)
+
+    def test_compact(self):
+        for name in codec.available_backends():
+            text = codec.get_backend(name).dumps(self.data)
+            self.assertNotIn('\n', text, name)
+            self.assertNotIn(': ', text, name)
+
+    def test_pretty(self):
+        self.assertEqual(codec.dumps_pretty({"b": 1, "a": 2}),
+                         '{\n    "a": 2,\n    "b": 1\n}')
+
+    def test_set_backend(self):
+        codec.set_backend("json")
+        self.assertEqual(codec.backend(), "json")
+        self.assertEqual(codec.dumps({"a": [1, 2]}), '{"a":[1,2]}')
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, codec.set_backend, "simplejson")
+        self.assertEqual(codec.backend(), self.backend)
+
+    def test_to_json_string_unchanged(self):
+        node = datatypes.Node(ip='10.0.0.1', mac='00:00:00:00:00:01')
+        self.assertEqual(node.to_json_string(),
+                         json.dumps(node.to_dict(), sort_keys=True, indent=4,
+                                    separators=(',', ': ')))
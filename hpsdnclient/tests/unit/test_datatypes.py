@@ -70,6 +70,77 @@ class JsonObjectTests(unittest.TestCase):
                     }
         self.assertEquals(result, expected)
 
+    def test_bare_json_object_is_a_json_object(self):
+        self.assertTrue(isinstance(self.json_object, datatypes.JsonObject))
+
+
+class SlotsTests(unittest.TestCase):
+    """ Tests the slotted representation of the datatypes """
+
+    def test_no_instance_dict(self):
+        for cls in datatypes.JsonObject.__subclasses__():
+            if cls._fields is None:
+                continue
+            self.assertFalse(hasattr(cls(), '__dict__'), cls.__name__)
+
+    def test_fields_are_slots(self):
+        self.assertEqual(datatypes.Node._fields,
+                         ('dpid', 'ip', 'mac', 'port', 'vid'))
+        self.assertEqual(datatypes.Node.__slots__, datatypes.Node._fields)
+
+    def test_kwargs_constructor(self):
+        node = datatypes.Node(ip='10.0.0.1', unknown='ignored')
+        self.assertEqual(node.ip, '10.0.0.1')
+        self.assertEqual(node.mac, None)
+        self.assertRaises(AttributeError, setattr, node, 'unknown', 1)
+
+    def test_eq(self):
+        self.assertEqual(datatypes.Node(**test_data.NODE),
+                         datatypes.Node(**test_data.NODE))
+        self.assertNotEqual(datatypes.Node(**test_data.NODE),
+                            datatypes.Node(ip='10.0.0.1'))
+
+
+class LazyTests(unittest.TestCase):
+    """ Tests lazy conversion of nested datatypes """
+
+    def _flow(self):
+        return {"table_id": 0,
+                "priority": 30000,
+                "match": [{"eth_type": "ipv4"}, {"ipv4_dst": "10.0.0.1"}],
+                "actions": [{"set_queue": 1},
+                            {"output": 2},
+                            {"output": 3}]}
+
+    def test_lazy_defers_nested(self):
+        flow = datatypes.JsonObjectFactory.create('Flow', self._flow(),
+                                                  lazy=True)
+        raw = datatypes.Flow._lazy_match.__get__(flow)
+        self.assertTrue(isinstance(raw, datatypes._Deferred))
+
+        self.assertTrue(isinstance(flow.match, datatypes.Match))
+        self.assertTrue(flow.match is flow.match)
+        self.assertEqual(flow.match.ipv4_dst, '10.0.0.1')
+
+    def test_lazy_matches_eager(self):
+        eager = datatypes.JsonObjectFactory.create('Flow', self._flow())
+        lazy = datatypes.JsonObjectFactory.create('Flow', self._flow(),
+                                                  lazy=True)
+        self.assertEqual(lazy, eager)
+        self.assertEqual(lazy.to_dict(), eager.to_dict())
+
+    def test_repeated_actions(self):
+        flow = datatypes.JsonObjectFactory.create('Flow', self._flow())
+        self.assertEqual(flow.actions.set_queue, 1)
+        self.assertEqual(flow.actions.output, [2, 3])
+
+    def test_set_replaces_deferred(self):
+        flow = datatypes.JsonObjectFactory.create('Flow', self._flow(),
+                                                  lazy=True)
+        match = datatypes.Match(in_port=1)
+        flow.match = match
+        self.assertTrue(flow.match is match)
+
 # Omitted test case for test_factory....
 #factory method is tested by the child classes in the suite below
 
@@ -114,6 +185,22 @@ class FactoryTests(unittest.TestCase):
         self.assertEquals(datatypes.JsonObjectFactory.factories['Datapath'],
                           datatypes.Datapath)
 
+    def test_registry_populated_at_import(self):
+        factories = datatypes.JsonObjectFactory.factories
+        self.assertTrue(factories['Flow'] is datatypes.Flow)
+        self.assertTrue(factories['Packet'] is datatypes.Packet)
+        self.assertNotIn('_FreeformJsonObject', factories)
+
+    def test_reserved_word_renames(self):
+        obj = datatypes.JsonObjectFactory.create('System',
+                                                 {'self': True, 'ip': '1'})
+        self.assertEqual(obj.self_, True)
+
+    def test_undeclared_reserved_word_is_ignored(self):
+        obj = datatypes.JsonObjectFactory.create(
+            'Datapath', {'dpid': '00:00:00:00:00:00:00:01', 'self': True})
+        self.assertEqual(obj.dpid, '00:00:00:00:00:00:00:01')
+
     def test_factory_create(self):
         obj = self._test_type(test_data.SYSTEM, datatypes.System)
         self.assertIn('self_', dir(obj))
@@ -223,3 +310,90 @@ class FactoryTests(unittest.TestCase):
 
     def test_create_next_hop(self):
         self._test_type(test_data.NEXT_HOP, datatypes.NextHop)
+
+
+class FlowKeyTests(unittest.TestCase):
+    """ Tests the canonical keys of Flow, Match and Action """
+
+    def test_match_spellings_are_equal(self):
+        a = datatypes.Match(eth_src='00-1A-2B-3C-4D-5E', eth_type='ipv4',
+                            ip_proto='tcp', ipv4_dst='10.0.0.1/32',
+                            ipv6_src='2001:DB8:0:0::1', tcp_dst='80')
+        b = datatypes.Match(eth_src='001a.2b3c.4d5e', eth_type='0x800',
+                            ip_proto=6, ipv4_dst='10.0.0.1',
+                            ipv6_src='2001:db8::1', tcp_dst=80)
+
+        self.assertEqual(a.key(), b.key())
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(len(set([a, b])), 1)
+
+    def test_match_prefixes(self):
+        a = datatypes.Match(ipv4_src='10.0.0.5/255.255.255.0')
+        b = datatypes.Match(ipv4_src='10.0.0.0/24')
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, datatypes.Match(ipv4_src='10.0.0.0/16'))
+
+    def test_match_key_skips_unset_fields(self):
+        match = datatypes.Match(in_port=3)
+        self.assertEqual(match.key(), (('in_port', 3),))
+
+    def test_match_key_keeps_zero_values(self):
+        untagged = datatypes.Match(in_port=3, vlan_vid=0)
+        self.assertEqual(untagged.key(), (('in_port', 3), ('vlan_vid', 0)))
+        self.assertNotEqual(untagged, datatypes.Match(in_port=3))
+        self.assertNotEqual(
+            datatypes.Flow(priority=1, match=untagged).key(),
+            datatypes.Flow(priority=1, match=datatypes.Match(in_port=3)).key())
+
+    def test_action_key_keeps_output_order(self):
+        a = datatypes.Action(output=[1, 2])
+        b = datatypes.Action(output=[2, 1])
+        self.assertNotEqual(a, b)
+        self.assertEqual(datatypes.Action(
+            set_field={'eth_dst': '00:00:00:00:00:0A'}),
+            datatypes.Action(set_field={'eth_dst': '00-00-00-00-00-0a'}))
+
+    def test_keys_follow_changes(self):
+        a = datatypes.Match(ipv4_src='10.0.0.1')
+        b = datatypes.Match(ipv4_src='10.0.0.1')
+        self.assertEqual(a, b)
+        a.ipv4_src = '10.9.9.9'
+        self.assertNotEqual(a, b)
+        self.assertEqual(a.key(), (('ipv4_src', '10.9.9.9'),))
+
+        action = datatypes.Action(output=1)
+        action.key()
+        action.output = 2
+        self.assertEqual(action, datatypes.Action(output=2))
+
+        flow = datatypes.Flow(priority=1, match=b)
+        flow.key()
+        flow.priority = 5
+        b.tcp_dst = 80
+        self.assertEqual(flow.key(), (0, 5, (('ipv4_src', '10.0.0.1'),
+                                             ('tcp_dst', 80)), 0))
+
+    def test_flow_key(self):
+        flow = datatypes.JsonObjectFactory.create('Flow', {
+            'table_id': 0, 'priority': 32768, 'cookie': '0x10',
+            'packet_count': 5,
+            'match': [{'eth_type': 'ipv4'}, {'ipv4_src': '10.0.0.1'}],
+            'actions': [{'output': 1}]})
+        built = datatypes.Flow(cookie=16,
+                               match=datatypes.Match(ipv4_src='10.0.0.1',
+                                                     eth_type='ipv4'))
+
+        self.assertEqual(flow.key(), built.key())
+        self.assertEqual(flow.key(), (0, 32768, (('eth_type', 0x800),
+                                                 ('ipv4_src', '10.0.0.1')),
+                                      16))
+        self.assertEqual(hash(flow), hash(built))
+
+    def test_flow_set_difference(self):
+        def flows(ports):
+            return set(datatypes.Flow(priority=p,
+                                      match=datatypes.Match(tcp_dst=p))
+                       for p in ports)
+
+        self.assertEqual(len(flows(range(10)) - flows(range(5, 15))), 5)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import Datapath, Flow
+from hpsdnclient.error import NotFound
+from hpsdnclient.fanout import DatapathResults
+
+
+class FanoutMixinTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.api = Api('10.10.10.10', auth)
+        self.dpids = ['00:00:00:00:00:00:00:0{0}'.format(i)
+                      for i in range(1, 8)]
+
+    def test_map_datapaths_preserves_order(self):
+        results = self.api.map_datapaths(lambda dpid: dpid[-1],
+                                         self.dpids, max_workers=4)
+
+        self.assertTrue(isinstance(results, DatapathResults))
+        self.assertEqual(list(results), self.dpids)
+        self.assertEqual(list(results.values()),
+                         [d[-1] for d in self.dpids])
+
+    def test_map_datapaths_partial_failure(self):
+        def fn(dpid):
+            if dpid.endswith('3'):
+                raise NotFound(dpid)
+            return dpid
+
+        results = self.api.map_datapaths(fn, self.dpids)
+
+        self.assertEqual(list(results.failed), [self.dpids[2]])
+        self.assertTrue(isinstance(results[self.dpids[2]], NotFound))
+        self.assertEqual(len(results.succeeded), len(self.dpids) - 1)
+
+    def test_map_datapaths_defaults_to_all_datapaths(self):
+        self.api.get_datapaths = MagicMock(
+            return_value=[Datapath(dpid=d) for d in self.dpids])
+
+        results = self.api.map_datapaths(lambda dpid: True)
+
+        self.assertEqual(list(results), self.dpids)
+
+    def test_get_flows_all(self):
+        self.api.get_flows = MagicMock(return_value=[])
+
+        results = self.api.get_flows_all(self.dpids[:2], table_id=1)
+
+        self.assertEqual(list(results.values()), [[], []])
+        self.api.get_flows.assert_any_call(self.dpids[0], 1)
+        self.api.get_flows.assert_any_call(self.dpids[1], 1)
+
+    def test_get_forward_paths(self):
+        self.api.get_forward_path = MagicMock(
+            side_effect=lambda src, dst: src + '-' + dst)
+        pairs = [('a', 'b'), ('b', 'c'), ('a', 'b')]
+
+        results = self.api.get_forward_paths(pairs)
+
+        self.assertEqual(list(results.items()),
+                         [(('a', 'b'), 'a-b'), (('b', 'c'), 'b-c')])
+        self.assertEqual(self.api.get_forward_path.call_count, 2)
+
+    def test_get_forward_paths_cached(self):
+        api = Api('10.10.10.10', XAuthToken('10.10.10.10', 'sdn', 'skyline'),
+                  topology_cache=True)
+        api.restclient.get = MagicMock(return_value='path')
+        api.get_forward_path('a', 'b')
+        api.map_datapaths = MagicMock(return_value={('b', 'c'): 'path'})
+
+        results = api.get_forward_paths([('a', 'b'), ('b', 'c')])
+
+        self.assertEqual(list(results.values()), ['path', 'path'])
+        api.map_datapaths.assert_called_once()
+        self.assertEqual(api.map_datapaths.call_args[0][1], [('b', 'c')])
+
+    def test_add_flows_all(self):
+        self.api.add_flows = MagicMock(return_value=None)
+        flow = Flow(priority=30000)
+
+        results = self.api.add_flows_all(flow, self.dpids)
+
+        self.assertEqual(len(results.succeeded), len(self.dpids))
+        self.assertEqual(self.api.add_flows.call_count, len(self.dpids))
+        self.api.add_flows.assert_any_call(self.dpids[0], flow)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import copy
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from hpsdnclient.datatypes import Node
+from hpsdnclient.nodeindex import NodeIndex
+from hpsdnclient.sync import ADD, DELETE, MOVE
+
+
+class NodeIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.nodes = [
+            Node(ip='10.0.0.1', mac='00:00:00:00:00:01', vid=1,
+                 dpid='00:00:00:00:00:00:00:01', port=1),
+            Node(ip='10.0.0.2', mac='00:00:00:00:00:02', vid=1,
+                 dpid='00:00:00:00:00:00:00:01', port=2),
+            Node(ip='10.0.0.1', mac='00:00:00:00:00:03', vid=2,
+                 dpid='00:00:00:00:00:00:00:02', port=1),
+            Node(ip='10.0.0.4', mac='00:00:00:00:00:04', vid=2,
+                 dpid='00:00:00:00:00:00:00:02', port=1)]
+        self.index = NodeIndex(self.nodes)
+
+    def test_lookups(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.by_mac('00:00:00:00:00:02'),
+                         [self.nodes[1]])
+        self.assertEqual(len(self.index.by_ip('10.0.0.1')), 2)
+        self.assertEqual(len(self.index.at('00:00:00:00:00:00:00:02', 1)),
+                         2)
+        self.assertEqual(len(self.index.in_vlan(1)), 2)
+        self.assertEqual(self.index.by_ip('10.9.9.9'), [])
+
+    def test_locate(self):
+        self.assertEqual(self.index.locate(ip='10.0.0.1', vid=2),
+                         self.nodes[2])
+        self.assertEqual(self.index.locate(mac='00:00:00:00:00:04'),
+                         self.nodes[3])
+        self.assertEqual(self.index.locate(ip='10.0.0.2', vid=2), None)
+
+    def test_update_move_and_delete(self):
+        moved = Node(ip='10.0.0.2', mac='00:00:00:00:00:02', vid=1,
+                     dpid='00:00:00:00:00:00:00:03', port=9)
+        nodes = [self.nodes[0], moved, self.nodes[2]]
+
+        deltas = self.index.update(nodes)
+
+        self.assertEqual(sorted(d.operation for d in deltas),
+                         [DELETE, MOVE])
+        self.assertEqual(self.index.at('00:00:00:00:00:00:00:01', 2), [])
+        self.assertEqual(self.index.at('00:00:00:00:00:00:00:03', 9),
+                         [moved])
+        self.assertEqual(self.index.at('00:00:00:00:00:00:00:02', 1),
+                         [self.nodes[2]])
+        self.assertEqual(self.index.by_mac('00:00:00:00:00:04'), [])
+        self.assertEqual(len(self.index), 3)
+
+    def test_shared_dpid_strings(self):
+        # Equal DPIDs decoded from JSON are separate string objects
+        nodes = [Node(ip='10.0.1.%d' % i, mac='00:00:00:00:01:%02d' % i,
+                      vid=1, dpid=''.join(['00:00:00:00:00:00:00:', '09']),
+                      port=i) for i in range(2)]
+        index = NodeIndex(nodes)
+
+        first, second = [k[0] for k in index._by_location]
+        self.assertTrue(first is second)
+
+    def test_nodes_are_not_modified(self):
+        dpid = ''.join(['00:00:00:00:00:00:00:', '05'])
+        node = Node(ip='10.0.0.5', mac='00:00:00:00:00:05', vid=1,
+                    dpid=dpid, port=5)
+
+        self.index.update(self.nodes + [node])
+
+        self.assertTrue(node.dpid is dpid)
+        self.assertEqual(self.index.at('00:00:00:00:00:00:00:05', 5),
+                         [node])
+
+    def test_refresh_without_churn(self):
+        api = MagicMock()
+        api.get_nodes.return_value = copy.deepcopy(self.nodes)
+
+        deltas = self.index.refresh(api)
+
+        self.assertEqual(deltas, [])
+        # The indexed nodes are the ones from the first dump
+        self.assertTrue(self.index.locate(mac='00:00:00:00:00:01') is
+                        self.nodes[0])
+
+    def test_refresh(self):
+        api = MagicMock()
+        api.get_nodes.return_value = self.nodes + [
+            Node(ip='10.0.0.5', mac='00:00:00:00:00:05', vid=1,
+                 dpid='00:00:00:00:00:00:00:01', port=5)]
+
+        deltas = self.index.refresh(api)
+
+        self.assertEqual([d.operation for d in deltas], [ADD])
+        self.assertEqual(self.index.locate(ip='10.0.0.5').port, 5)
+        self.assertEqual(NodeIndex.from_api(api).locate(ip='10.0.0.5').port,
+                         5)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from hpsdnclient.datatypes import Action, Flow, Match
+from hpsdnclient.overlap import (AMBIGUOUS, FULL, OVERLAP, REDUNDANT,
+                                 SHADOWED, FlowAnalyzer, PrefixTrie,
+                                 _classify, constraint)
+
+
+def flow(priority, output=1, table_id=None, **match):
+    return Flow(table_id=table_id, priority=priority, match=Match(**match),
+                actions=Action(output=output))
+
+
+class ConstraintTests(unittest.TestCase):
+    def test_prefix(self):
+        self.assertEqual(constraint('ipv4_dst', '10.0.0.0/24'),
+                         (0x0a000000, 0xffffff00))
+        self.assertEqual(constraint('ipv4_dst', '10.0.0.1'),
+                         (0x0a000001, FULL))
+        self.assertEqual(constraint('ipv6_src', '2001:db8::/32')[1],
+                         ((1 << 32) - 1) << 96)
+
+    def test_masked_mac(self):
+        self.assertEqual(constraint('eth_dst', '01:00:00:00:00:00/'
+                                               '01:00:00:00:00:00'),
+                         (1 << 40, 1 << 40))
+
+    def test_symbols(self):
+        self.assertEqual(constraint('mode', 'exact'),
+                         constraint('mode', 'exact'))
+        self.assertNotEqual(constraint('mode', 'exact'),
+                            constraint('mode', 'present'))
+
+
+class PrefixTrieTests(unittest.TestCase):
+    def test_collect(self):
+        trie = PrefixTrie(8)
+        trie.insert(0b10000000, 1, 'a')
+        trie.insert(0b10100000, 3, 'b')
+        trie.insert(0b10101010, 8, 'c')
+        trie.insert(0b01000000, 2, 'd')
+
+        path, node = trie.walk(0b10100000, 3)
+        self.assertEqual(sorted(PrefixTrie.collect(path, node)),
+                         ['a', 'b', 'c'])
+        self.assertEqual(PrefixTrie.estimate(path, node), 3)
+        path, node = trie.walk(0b10110000, 4)
+        self.assertEqual(sorted(PrefixTrie.collect(path, node)), ['a', 'b'])
+        path, node = trie.walk(0b00000000, 1)
+        self.assertEqual(PrefixTrie.collect(path, node), ['d'])
+
+
+class FlowAnalyzerTests(unittest.TestCase):
+    def test_shadowed(self):
+        broad = flow(200, output=2, ipv4_dst='10.0.0.0/8')
+        narrow = flow(100, output=3, eth_type='ipv4', ip_proto='tcp',
+                      ipv4_dst='10.1.2.3', tcp_dst=22)
+
+        conflicts = FlowAnalyzer([narrow, broad]).conflicts()
+
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(conflicts[0].kind, SHADOWED)
+        self.assertTrue(conflicts[0].flow is narrow)
+        self.assertTrue(conflicts[0].other is broad)
+
+    def test_redundant(self):
+        conflicts = FlowAnalyzer([
+            flow(200, ipv4_src='192.168.0.0/16'),
+            flow(100, ipv4_src='192.168.1.0/24')]).conflicts()
+
+        self.assertEqual([c.kind for c in conflicts], [REDUNDANT])
+
+    def test_partial_overlap(self):
+        exception = flow(200, output=2, in_port=1, tcp_dst=22)
+        general = flow(100, output=3, ipv4_dst='10.0.0.0/8')
+
+        conflicts = FlowAnalyzer([general, exception]).conflicts()
+
+        self.assertEqual([(c.kind, c.flow, c.other) for c in conflicts],
+                         [(OVERLAP, general, exception)])
+
+    def test_ambiguous(self):
+        conflicts = FlowAnalyzer([flow(100, output=1, in_port=1),
+                                  flow(100, output=2, vlan_vid=10)]
+                                 ).conflicts()
+
+        self.assertEqual([c.kind for c in conflicts], [AMBIGUOUS])
+
+    def test_disjoint(self):
+        analyzer = FlowAnalyzer([
+            flow(100, output=1, in_port=1, ipv4_dst='10.0.0.0/24'),
+            flow(200, output=2, in_port=1, ipv4_dst='10.0.1.0/24'),
+            flow(300, output=3, in_port=1, ipv6_dst='2001:db8::/32'),
+            flow(400, output=4, in_port=2, tcp_dst=80),
+            flow(500, output=5, in_port=3),
+            flow(600, output=6, tcp_dst=80, table_id=1)])
+
+        self.assertEqual(analyzer.conflicts(), [])
+        self.assertEqual(len(analyzer), 6)
+
+    def test_prerequisites(self):
+        # An IPv4 match and a UDP match can not both match a TCP packet
+        conflicts = FlowAnalyzer([flow(100, output=1, tcp_dst=80),
+                                  flow(200, output=2, udp_dst=80)]
+                                 ).conflicts()
+        self.assertEqual(conflicts, [])
+
+    def test_kinds(self):
+        analyzer = FlowAnalyzer([flow(300, output=1, in_port=1),
+                                 flow(200, output=2, in_port=1),
+                                 flow(100, output=1, in_port=1)])
+
+        kinds = sorted(c.kind for c in analyzer.conflicts())
+        self.assertEqual(kinds, [REDUNDANT, SHADOWED, SHADOWED])
+        self.assertEqual(len(analyzer.conflicts(kinds=(REDUNDANT,))), 1)
+
+    def test_check(self):
+        existing = flow(100, output=1, ipv4_dst='10.0.0.0/24')
+        analyzer = FlowAnalyzer([existing])
+
+        shadowed = analyzer.check(flow(50, output=2, ipv4_dst='10.0.0.7'))
+        self.assertEqual([c.kind for c in shadowed], [SHADOWED])
+        self.assertTrue(shadowed[0].other is existing)
+
+        new = flow(150, output=2, ipv4_dst='10.0.0.0/16')
+        shadows = analyzer.check(new)
+        self.assertEqual([(c.kind, c.flow, c.other) for c in shadows],
+                         [(SHADOWED, existing, new)])
+
+        self.assertEqual(analyzer.check(flow(50, table_id=3, in_port=1)),
+                         [])
+        self.assertEqual(len(analyzer), 1)
+
+    def test_from_api(self):
+        api = MagicMock()
+        api.get_flows.return_value = [flow(100, in_port=1)]
+
+        analyzer = FlowAnalyzer.from_api(api, '00:00:00:00:00:00:00:01', 0)
+
+        api.get_flows.assert_called_once_with('00:00:00:00:00:00:00:01', 0)
+        self.assertEqual(len(analyzer), 1)
+
+    def test_index_finds_conflicts_pairwise_does(self):
+        flows = []
+        for i in range(200):
+            flows.append(flow(1000 + i % 7, output=i % 3, in_port=i % 5,
+                              ipv4_dst='10.0.{0}.0/{1}'.format(
+                                  i % 4, 24 - i % 3 * 4)))
+        flows.append(flow(5, output=9))
+        analyzer = FlowAnalyzer(flows)
+
+        found = set((c.kind, id(c.flow), id(c.other))
+                    for c in analyzer.conflicts())
+        rules = [r for t in analyzer._tables.values() for r in t.rules]
+        expected = set()
+        for low in rules:
+            for high in rules:
+                if high is low or high.priority < low.priority or (
+                        high.priority == low.priority and high.id < low.id):
+                    continue
+                kind = _classify(low, high)
+                if kind:
+                    expected.add((kind, id(low.flow), id(high.flow)))
+        self.assertEqual(found, expected)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import math
+import unittest
+try:
+    from unittest.mock import MagicMock, patch
+except ImportError:
+    from mock import MagicMock, patch
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import PortStats, Stats
+from hpsdnclient.error import DatatypeError
+from hpsdnclient.fanout import DatapathResults
+import hpsdnclient.portstats as portstats
+from hpsdnclient.portstats import PortStatsPoller
+
+DPID = '00:00:00:00:00:00:00:01'
+
+
+def sample(port_id, rx_bytes, tx_bytes=0, duration_sec=100, **kwargs):
+    return PortStats(port_id=port_id, rx_bytes=rx_bytes, tx_bytes=tx_bytes,
+                     duration_sec=duration_sec, **kwargs)
+
+
+class PortStatsPollerTests(unittest.TestCase):
+    def setUp(self):
+        self.poller = PortStatsPoller(MagicMock())
+
+    def test_first_sample_has_no_rate(self):
+        self.poller.update({DPID: [sample(1, 1000)]}, now=10.0)
+        self.assertTrue(math.isnan(self.poller.rates(DPID, 1)['rx_bps']))
+
+    def test_rates(self):
+        self.poller.update({DPID: [sample(1, 1000, rx_packets=10,
+                                          rx_errors=0)]}, now=10.0)
+        self.poller.update({DPID: [sample(1, 3000, rx_packets=30,
+                                          rx_errors=4, duration_sec=102)]},
+                           now=12.0)
+
+        rates = self.poller.rates(DPID, 1)
+        self.assertEqual(rates['rx_bps'], 8000.0)
+        self.assertEqual(rates['rx_pps'], 10.0)
+        self.assertEqual(rates['rx_errors_ps'], 2.0)
+        self.assertEqual(rates['tx_bps'], 0.0)
+
+    def test_counter_wrap(self):
+        poller = PortStatsPoller(MagicMock(), counter_bits=32)
+        poller.update({DPID: [sample(1, 2 ** 32 - 100)]}, now=1.0)
+        poller.update({DPID: [sample(1, 100, duration_sec=101)]}, now=2.0)
+
+        self.assertEqual(poller.rates(DPID, 1)['rx_bps'], 200 * 8.0)
+
+    def test_counter_reset(self):
+        self.poller.update({DPID: [sample(1, 10 ** 9)]}, now=1.0)
+        self.poller.update({DPID: [sample(1, 500, duration_sec=1)]}, now=2.0)
+
+        self.assertEqual(self.poller.rates(DPID, 1)['rx_bps'], 500 * 8.0)
+
+    def test_stats_results_and_failures(self):
+        stats = Stats(dpid=DPID, port_stats=[sample(1, 0), sample(2, 0)])
+        self.poller.update({DPID: [stats], 'bad': Exception()}, now=1.0)
+
+        self.assertEqual(sorted(self.poller.ports()), [(DPID, 1), (DPID, 2)])
+
+    def test_top(self):
+        self.poller.update({DPID: [sample(p, 0) for p in range(1, 6)]},
+                           now=1.0)
+        self.poller.update({DPID: [sample(p, p * 1000, tx_bytes=1000,
+                                          duration_sec=101)
+                                   for p in range(1, 5)]}, now=2.0)
+
+        top = self.poller.top(2, 'rx_bps')
+        self.assertEqual(top, [((DPID, 4), 32000.0), ((DPID, 3), 24000.0)])
+        self.assertEqual(self.poller.top(1, 'bps'), [((DPID, 4), 40000.0)])
+        # Port 5 has only been seen once
+        self.assertEqual(len(self.poller.top(10)), 4)
+
+    def test_without_numpy(self):
+        saved = portstats.numpy
+        portstats.numpy = None
+        try:
+            self.test_rates()
+            self.test_counter_wrap()
+            self.test_counter_reset()
+            self.poller = PortStatsPoller(MagicMock())
+            self.test_top()
+        finally:
+            portstats.numpy = saved
+
+    def test_poll(self):
+        api = MagicMock()
+        api.get_port_stats_all.return_value = DatapathResults(
+            [(DPID, [sample(1, 0)]), ('bad', Exception('down'))])
+        poller = PortStatsPoller(api, dpids=[DPID, 'bad'], max_workers=2)
+
+        failed = poller.poll()
+
+        api.get_port_stats_all.assert_called_once_with([DPID, 'bad'], 2)
+        self.assertEqual(list(failed), ['bad'])
+        self.assertEqual(poller.samples, 1)
+
+    def test_background_failures_are_logged(self):
+        api = MagicMock()
+        api.get_port_stats_all.side_effect = [
+            DatapathResults([('bad', Exception('down'))]),
+            ValueError('bug')]
+        poller = PortStatsPoller(api)
+        stop = MagicMock()
+        stop.is_set.side_effect = [False, False, True]
+
+        with patch.object(portstats, 'LOG') as log:
+            poller._run(1, stop)
+
+        self.assertEqual(log.warning.call_args[0][1], 'bad')
+        self.assertTrue(log.exception.called)
+
+
+class GetPortStatsTests(unittest.TestCase):
+    def setUp(self):
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.api = Api('10.10.10.10', auth)
+        self.api.restclient.get = MagicMock(return_value=[])
+
+    def test_port_id(self):
+        self.api.get_port_stats(DPID, 3)
+        self.assertTrue(self.api.restclient.get.call_args[0][0].endswith(
+            '&port_id=3'))
+
+    def test_invalid_port_id(self):
+        self.assertRaises(DatatypeError, self.api.get_port_stats, DPID,
+                          'eth0')
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+
+import copy
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+import requests
+
+from hpsdnclient.api import Api
+from hpsdnclient.auth import XAuthToken
+from hpsdnclient.datatypes import Flow
+from hpsdnclient.error import NotRecorded
+import hpsdnclient.replay as replay
+import hpsdnclient.tests.data as test_data
+
+DPID = '00:00:00:00:00:00:00:01'
+# Other tests convert the shared test data in place
+DATAPATH = copy.deepcopy(test_data.DATAPATH)
+FLOW = copy.deepcopy(test_data.FLOW)
+
+
+def response(status, data, elapsed=0.25):
+    r = requests.Response()
+    r.status_code = status
+    r.reason = 'OK' if status < 400 else 'Not Found'
+    r.headers['Content-Type'] = 'application/json'
+    r.headers['Content-Encoding'] = 'gzip'
+    r._content = json.dumps(data).encode('utf-8')
+    r.elapsed = datetime.timedelta(seconds=elapsed)
+    return r
+
+
+class ReplayTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'session.rec')
+        auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
+        self.api = Api('10.10.10.10', auth, record=self.path)
+        self.session = MagicMock()
+        self.api.restclient.session = self.session
+
+    def record(self, *responses):
+        self.session.request.side_effect = list(responses)
+
+    def replayer(self, **kwargs):
+        self.api.restclient.close()
+        return Api('192.168.0.1', None, replay=self.path, **kwargs)
+
+    def test_round_trip(self):
+        self.record(response(200, {'datapaths': [DATAPATH]}))
+        recorded = self.api.get_datapaths()
+
+        replayed = self.replayer().get_datapaths()
+
+        self.assertEqual(replayed[0].dpid, recorded[0].dpid)
+        self.assertEqual(replayed[0].to_dict(), recorded[0].to_dict())
+
+    def test_recording(self):
+        self.record(response(200, {'datapaths': [DATAPATH]}))
+        self.api.get_datapaths()
+        self.api.restclient.close()
+
+        entries = replay.load(self.path)
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['method'], 'GET')
+        self.assertEqual(entries[0]['path'], '/sdn/v2.0/of/datapaths')
+        self.assertEqual(entries[0]['status'], 200)
+        self.assertEqual(entries[0]['elapsed'], 0.25)
+        self.assertFalse('Content-Encoding' in entries[0]['headers'])
+
+    def test_credentials_are_not_recorded(self):
+        token = json.loads(test_data.AUTH)['record']['token']
+        login = response(200, json.loads(test_data.AUTH))
+        login.headers['X-Auth-Token'] = token
+        self.record(login)
+        self.api.login('sdn', 'skyline')
+        self.api.restclient.close()
+
+        with open(self.path) as f:
+            recording = f.read()
+
+        self.assertFalse(token in recording)
+        self.assertFalse('skyline' in recording)
+        self.assertFalse('"user"' in recording)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        # The login can still be replayed, with any credentials
+        api = Api('192.168.0.1', None, replay=self.path)
+        self.assertEqual(api.login('admin', 'secret')['token'],
+                         replay.REDACTED)
+
+    def test_responses_are_served_in_order(self):
+        self.record(response(200, {'datapaths': []}),
+                    response(200, {'datapaths': [DATAPATH]}))
+        self.api.get_datapaths()
+        self.api.get_datapaths()
+
+        api = self.replayer()
+
+        self.assertEqual(api.get_datapaths(), [])
+        self.assertEqual(len(api.get_datapaths()), 1)
+        # The last response is repeated
+        self.assertEqual(len(api.get_datapaths()), 1)
+        api.restclient.player.rewind()
+        self.assertEqual(api.get_datapaths(), [])
+
+    def test_requests_are_matched_on_body(self):
+        self.record(response(200, {}), response(500, {'error': 'x'}))
+        client = self.api.restclient
+        url = self.api._of_base_url + 'datapaths/{0}/flows'.format(DPID)
+        body1 = Flow(priority=1).to_json_string()
+        body2 = Flow(priority=2).to_json_string()
+        client.request('post', url, data=body1)
+        client.request('post', url, data=body2)
+
+        client = self.replayer().restclient
+
+        self.assertEqual(client.request('post', url, data=body2).status_code,
+                         500)
+        self.assertEqual(client.request('post', url, data=body1).status_code,
+                         200)
+
+    def test_errors_are_replayed(self):
+        self.record(response(404, {'error': 'NotFoundException',
+                                   'message': 'No such datapath'}))
+        url = self.api._of_base_url + 'datapaths/{0}'.format(DPID)
+        self.api.restclient.request('get', url)
+
+        r = self.replayer().restclient.request('get', url)
+
+        self.assertEqual(r.status_code, 404)
+        self.assertEqual(r.reason, 'Not Found')
+        self.assertEqual(r.json()['error'], 'NotFoundException')
+        self.assertEqual(r.request.url, url)
+        self.assertRaises(requests.HTTPError, r.raise_for_status)
+
+    def test_not_recorded(self):
+        self.record(response(200, {'datapaths': []}))
+        self.api.get_datapaths()
+
+        api = self.replayer()
+
+        self.assertRaises(NotRecorded, api.get_datapath_detail, DPID)
+
+    def test_stream(self):
+        self.record(response(200, {'flows': [FLOW, FLOW]}))
+        recorded = list(self.api.get_flows(DPID, stream=True))
+
+        replayed = list(self.replayer().get_flows(DPID, stream=True))
+
+        self.assertEqual(len(replayed), 2)
+        self.assertEqual(replayed[0].to_dict(), recorded[0].to_dict())
+
+    def test_latency(self):
+        self.record(response(200, {'datapaths': []}, elapsed=0.05))
+        self.api.get_datapaths()
+
+        for latency in (0.05, replay.RECORDED):
+            api = self.replayer(latency=latency)
+            start = time.time()
+            api.get_datapaths()
+            self.assertTrue(time.time() - start >= 0.05)
@@ -14,6 +14,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import datetime
 import json
 import os
 import re
@@ -25,6 +26,14 @@ try:
 except ImportError:
     from mock import MagicMock
 
+import threading
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
 import httpretty
 import requests
 
@@ -35,6 +44,38 @@ from hpsdnclient.rest import RestClient, UA
 from hpsdnclient.tests.data import AUTH, DATAPATH
 
 
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write('ok'.encode("UTF-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def _serve_keepalive(testcase):
+    """ Start a local HTTP/1.1 server for the duration of the test """
+    testcase.auth.token = 'test_token'
+    testcase.auth.token_expiration = (datetime.datetime.now() +
+                                      datetime.timedelta(days=1))
+    server = _ThreadingServer(('127.0.0.1', 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    testcase.addCleanup(server.server_close)
+    testcase.addCleanup(server.shutdown)
+    return 'http://127.0.0.1:{0}/'.format(server.server_address[1])
+
+
 class RestClientTests(unittest.TestCase):
     def setUp(self):
         self.auth = XAuthToken('10.10.10.10', 'sdn', 'skyline')
@@ -49,6 +90,40 @@ class RestClientTests(unittest.TestCase):
         self.assertEqual(self.client.args["verify"], False)
         self.assertEqual(self.client.args['timeout'], 30)
 
+    def test_restclient_pool_configuration(self):
+        client = RestClient(self.auth, pool_connections=2, pool_maxsize=20,
+                            pool_block=True)
+        adapter = client.session.get_adapter('https://10.10.10.10:8443')
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertEqual(adapter._pool_block, True)
+
+    def test_connection_reuse(self):
+        url = _serve_keepalive(self)
+
+        self.client._get(url)
+        self.client._get(url)
+
+        stats = self.client.pool_stats()
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['new_connections'], 1)
+        self.assertEqual(stats['reused_connections'], 1)
+
+    def test_idle_eviction(self):
+        url = _serve_keepalive(self)
+        client = RestClient(self.auth, idle_timeout=60)
+        client._get(url)
+        session = client.session
+
+        client._last_used -= 120
+        client._get(url)
+
+        self.assertFalse(client.session is session)
+        stats = client.pool_stats()
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['new_connections'], 2)
+        self.assertEqual(stats['reused_connections'], 0)
+
     def test_user_agent_string(self):
         exp = ("^(hpsdnclient/[0-9]\\.[0-9]\\.[0-9] " +
                "python-requests/[0-9]\\.[0-9]\\.[0-9])$")
@@ -254,6 +329,41 @@ class RestClientTests(unittest.TestCase):
         for item in r:
             self.assertTrue(isinstance(item, Datapath))
 
+    @httpretty.activate
+    def test_get_stream(self):
+        httpretty.register_uri(httpretty.GET,
+                               'http://foo.bar',
+                               body=json.dumps({"version": "1.0.0",
+                                                "datapaths": [DATAPATH,
+                                                              DATAPATH]}),
+                               content_type='application/json',
+                               status=200)
+        self.auth.token = 'test_token'
+        self.auth.token_expiration = (datetime.datetime.now() +
+                                      datetime.timedelta(days=1))
+
+        r = self.client.get('http://foo.bar', stream=True)
+
+        self.assertFalse(isinstance(r, list))
+        items = list(r)
+        self.assertEqual(len(items), 2)
+        for item in items:
+            self.assertTrue(isinstance(item, Datapath))
+
+    @httpretty.activate
+    def test_get_stream_raises_errors(self):
+        httpretty.register_uri(httpretty.GET,
+                               'http://foo.bar',
+                               body='{}',
+                               content_type='application/json',
+                               status=403)
+        self.auth.token = 'test_token'
+        self.auth.token_expiration = (datetime.datetime.now() +
+                                      datetime.timedelta(days=1))
+
+        self.assertRaises(requests.HTTPError, self.client.get,
+                          'http://foo.bar', stream=True)
+
     def test_get_json_invalid_datatype(self):
         data = json.dumps({"version": "1.0.0", "datapathz": DATAPATH})
         response = requests.Response()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+import hpsdnclient.snapshot as snapshot
+import hpsdnclient.tests.data as test_data
+from hpsdnclient.datatypes import JsonObjectFactory
+
+S1 = '00:00:00:00:00:00:00:01'
+S2 = '00:00:00:00:00:00:00:02'
+
+# Other tests convert the shared test data in place, keep a pristine copy
+DATA = copy.deepcopy(dict((k, v) for k, v in vars(test_data).items()
+                          if k.isupper()))
+
+
+def create(name, data):
+    return JsonObjectFactory.create(name, copy.deepcopy(DATA[data]))
+
+
+def state():
+    return {
+        'datapaths': [create('Datapath', 'DATAPATH')],
+        'links': [create('Link', 'LINK')],
+        'nodes': [create('Node', 'NODE')],
+        'ports': {S1: [create('Port', 'PORT')]},
+        'flows': {S1: [create('Flow', 'FLOW'),
+                       create('Flow', 'FLOW_MA')],
+                  S2: [create('Flow', 'FLOW')]},
+        'groups': {S1: [create('Group', 'GROUP')]},
+        'meters': {},
+    }
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'fabric.snap')
+        self.state = state()
+
+    def test_round_trip(self):
+        snapshot.write(self.path, self.state, created=1.5)
+
+        with snapshot.Snapshot(self.path) as snap:
+            self.assertEqual(snap.created, 1.5)
+            self.assertEqual(sorted(snap.tables), sorted(self.state))
+            for name, items in self.state.items():
+                loaded = snap.load(name)
+                if isinstance(items, dict):
+                    self.assertEqual(sorted(loaded), sorted(items))
+                    for dpid in items:
+                        self.assertEqual(
+                            [i.to_dict() for i in loaded[dpid]],
+                            [i.to_dict() for i in items[dpid]])
+                else:
+                    self.assertEqual([i.to_dict() for i in loaded],
+                                     [i.to_dict() for i in items])
+
+    def test_same_datatypes(self):
+        snapshot.write(self.path, self.state)
+
+        with snapshot.Snapshot(self.path) as snap:
+            flow = snap.load('flows')[S1][1]
+        original = self.state['flows'][S1][1]
+        self.assertEqual(type(flow), type(original))
+        self.assertEqual(type(flow.match), type(original.match))
+        self.assertEqual(flow.actions.output, original.actions.output)
+        self.assertEqual(flow.key(), original.key())
+
+    def test_columns(self):
+        snapshot.write(self.path, self.state)
+
+        with snapshot.Snapshot(self.path) as snap:
+            priorities = snap.column('flows', 'priority')
+            self.assertEqual(list(priorities),
+                             [f.priority for f in self.state['flows'][S1] +
+                              self.state['flows'][S2]])
+            if isinstance(priorities, memoryview):
+                self.assertEqual(priorities.format,
+                                 snapshot.INT64_TYPECODE)
+                priorities.release()
+            self.assertEqual(snap.values('flows', '_dpid'), [S1, S1, S2])
+            self.assertEqual(snap.values('flows', 'match.ipv4_dst'),
+                             [f.match.ipv4_dst
+                              for f in self.state['flows'][S1] +
+                              self.state['flows'][S2]])
+            self.assertRaises(KeyError, snap.column, 'flows', 'nope')
+
+    def test_strings_are_interned(self):
+        flows = [create('Flow', 'FLOW') for i in range(100)]
+        snapshot.write(self.path, {'flows': {S1: flows}})
+
+        with snapshot.Snapshot(self.path) as snap:
+            self.assertTrue(snap._string_count < 20)
+            dpids = snap.values('flows', '_dpid')
+            self.assertTrue(dpids[0] is dpids[99])
+
+    def test_nulls(self):
+        links = [create('Link', 'LINK'),
+                 create('Link', 'LINK')]
+        links[1].src_port = None
+        snapshot.write(self.path, {'links': links})
+
+        with snapshot.Snapshot(self.path) as snap:
+            loaded = snap.load('links')
+        self.assertEqual(loaded[1].src_port, None)
+        self.assertEqual(loaded[0].src_port, links[0].src_port)
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'{"flows": []}')
+        self.assertRaises(ValueError, snapshot.Snapshot, self.path)
+
+    def test_save(self):
+        api = MagicMock()
+        datapaths = self.state['datapaths']
+        api.get_datapaths.return_value = datapaths
+        api.get_links.return_value = self.state['links']
+        api.get_nodes.return_value = self.state['nodes']
+        api.get_ports_all.return_value.succeeded = self.state['ports']
+        api.get_flows_all.return_value.succeeded = self.state['flows']
+        api.map_datapaths.return_value.succeeded = {}
+
+        snapshot.save(api, self.path)
+
+        api.get_ports_all.assert_called_once_with(
+            [d.dpid for d in datapaths], None)
+        with snapshot.Snapshot(self.path) as snap:
+            self.assertEqual(len(snap.load('flows')[S2]), 1)
+            self.assertEqual(snap.load('meters'), {})
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import copy
+import json
+import unittest
+
+from hpsdnclient.stream import iter_items
+from hpsdnclient.tests.data import DATAPATH, LINK, NODE
+
+
+def chunked(data, size):
+    data = data.encode("UTF-8")
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterItemsTests(unittest.TestCase):
+    def setUp(self):
+        datapath = copy.deepcopy(DATAPATH)
+        self.datapaths = [datapath, dict(datapath, num_tables=1),
+                          dict(datapath, num_buffers=256)]
+        self.body = json.dumps({"version": "1.3.0",
+                                "datapaths": self.datapaths},
+                               indent=2)
+
+    def test_every_chunk_size(self):
+        for size in range(1, 64):
+            items = list(iter_items(chunked(self.body, size),
+                                    ["datapaths"]))
+            self.assertEqual(items,
+                             [("datapaths", d) for d in self.datapaths])
+
+    def test_skips_other_members(self):
+        node = copy.deepcopy(NODE)
+        body = json.dumps({"version": "1.3.0",
+                           "count": 12345,
+                           "links": [copy.deepcopy(LINK)],
+                           "nodes": [node, node]})
+
+        items = list(iter_items(chunked(body, 7), ["nodes"]))
+
+        self.assertEqual(items, [("nodes", node), ("nodes", node)])
+
+    def test_empty(self):
+        self.assertEqual(list(iter_items([b'{}'], ["flows"])), [])
+        self.assertEqual(
+            list(iter_items([b'{"flows": [ ]}'], ["flows"])), [])
+
+    def test_unicode_split_across_chunks(self):
+        body = json.dumps({"nodes": [{"ip": u"caf\u00e9"}]},
+                          ensure_ascii=False)
+        for size in range(1, 8):
+            items = list(iter_items(chunked(body, size), ["nodes"]))
+            self.assertEqual(items, [("nodes", {"ip": u"caf\u00e9"})])
+
+    def test_truncated(self):
+        body = self.body[:len(self.body) // 2]
+        self.assertRaises(ValueError, list,
+                          iter_items(chunked(body, 16), ["datapaths"]))
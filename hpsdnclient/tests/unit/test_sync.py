@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import copy
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from hpsdnclient.datatypes import (Cluster, ClusterSync, Link, LinkSync,
+                                   Node, NodeSync)
+from hpsdnclient.sync import (ADD, CHANGE, DELETE, MOVE, CLUSTER, LINK, NODE,
+                              TopologySync, diff)
+from hpsdnclient.topology import Topology
+
+
+def link(src, dst, port=1):
+    return Link(src_dpid=src, src_port=port, dst_dpid=dst, dst_port=port)
+
+
+def ops(deltas):
+    return sorted((d.operation, d.kind) for d in deltas)
+
+
+class TopologySyncTests(unittest.TestCase):
+    def setUp(self):
+        self.links = [link('a', 'b'), link('b', 'a')]
+        self.nodes = [Node(ip='10.0.0.1', mac='00:00:00:00:00:01', vid=1,
+                           dpid='a', port=5)]
+        self.clusters = [Cluster(uid='1', links=[{'src_dpid': 'a',
+                                                  'dst_dpid': 'b'}])]
+        self.api = MagicMock()
+        # Every poll decodes fresh objects, as the controller's JSON would
+        self.api.get_links.side_effect = lambda: copy.deepcopy(self.links)
+        self.api.get_nodes.side_effect = lambda: copy.deepcopy(self.nodes)
+        self.api.get_clusters.side_effect = \
+            lambda: copy.deepcopy(self.clusters)
+        self.sync = TopologySync(self.api)
+
+    def test_first_poll_adds_everything(self):
+        self.assertEqual(ops(self.sync.poll()),
+                         [(ADD, CLUSTER), (ADD, LINK), (ADD, LINK),
+                          (ADD, NODE)])
+
+    def test_no_churn_no_deltas(self):
+        self.sync.poll()
+        self.assertEqual(self.sync.poll(), [])
+
+    def test_link_add_delete_change(self):
+        self.sync.poll()
+        self.links.pop()
+        self.links.append(link('a', 'c'))
+        self.links[0] = Link(src_dpid='a', src_port=1, dst_dpid='b',
+                             dst_port=1, info=[{'m_time': 1}])
+
+        deltas = self.sync.poll()
+
+        self.assertEqual(ops(deltas), [(ADD, LINK), (CHANGE, LINK),
+                                       (DELETE, LINK)])
+        delete = [d for d in deltas if d.operation == DELETE][0]
+        self.assertEqual(delete.key, ('b', 1, 'a', 1))
+        self.assertEqual(delete.new, None)
+
+    def test_node_move(self):
+        self.sync.poll()
+        self.nodes[0] = Node(ip='10.0.0.1', mac='00:00:00:00:00:01', vid=1,
+                             dpid='b', port=7)
+
+        deltas = self.sync.poll()
+
+        self.assertEqual(ops(deltas), [(MOVE, NODE)])
+        self.assertEqual(deltas[0].old.dpid, 'a')
+        self.assertEqual(deltas[0].new.dpid, 'b')
+
+    def test_node_change(self):
+        self.sync.poll()
+        self.nodes[0] = Node(ip='10.0.0.9', mac='00:00:00:00:00:01', vid=1,
+                             dpid='a', port=5)
+
+        self.assertEqual(ops(self.sync.poll()), [(CHANGE, NODE)])
+
+    def test_cluster_change(self):
+        self.sync.poll()
+        self.clusters[0] = Cluster(uid='1', links=[])
+
+        self.assertEqual(ops(self.sync.poll()), [(CHANGE, CLUSTER)])
+
+    def test_clusters_optional(self):
+        sync = TopologySync(self.api, clusters=False)
+        sync.poll()
+        self.assertFalse(self.api.get_clusters.called)
+
+    def test_to_sync(self):
+        deltas = self.sync.poll()
+        syncs = dict((d.kind, d.to_sync()) for d in deltas)
+
+        self.assertTrue(isinstance(syncs[LINK], LinkSync))
+        self.assertTrue(isinstance(syncs[NODE], NodeSync))
+        self.assertEqual(syncs[NODE].dpid, 'a')
+        self.assertTrue(isinstance(syncs[CLUSTER], ClusterSync))
+        self.assertEqual(syncs[CLUSTER].nodes, ['a', 'b'])
+
+    def test_keeps_topology_up_to_date(self):
+        topology = Topology()
+        sync = TopologySync(self.api, topology)
+        sync.poll()
+        self.assertEqual(topology.shortest_path('a', 'b').cost, 1)
+        self.assertEqual(len(topology.nodes), 1)
+
+        self.links[:] = [link('b', 'a')]
+        sync.poll()
+
+        self.assertEqual(topology.shortest_path('a', 'b'), None)
+        self.assertEqual(topology.shortest_path('b', 'a').cost, 1)
+
+    def test_diff(self):
+        self.assertEqual(diff({}, {}, LINK), [])
+        deltas = diff({1: 'x'}, {2: 'y'}, LINK)
+        self.assertEqual(ops(deltas), [(ADD, LINK), (DELETE, LINK)])
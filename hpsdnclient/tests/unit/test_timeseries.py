@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+# The csv module writes bytes on Python 2
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from hpsdnclient.datatypes import (ControllerStats, Counter, GroupStats,
+                                   PortStats, Stats)
+import hpsdnclient.timeseries as timeseries
+from hpsdnclient.timeseries import RingBuffer, Series, StatsStore, downsample
+
+DPID = '00:00:00:00:00:00:00:01'
+
+
+class RingBufferTests(unittest.TestCase):
+    def test_wraps_at_capacity(self):
+        ring = RingBuffer(3)
+        for i in range(5):
+            ring.append(float(i), i * 10)
+
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring.window(), [(2.0, 20), (3.0, 30), (4.0, 40)])
+        self.assertEqual(ring.first(), 2.0)
+        self.assertEqual(ring.last(), (4.0, 40))
+
+    def test_window(self):
+        ring = RingBuffer(10)
+        for i in range(12):
+            ring.append(float(i), i)
+
+        self.assertEqual([t for t, v in ring.window(4, 7)], [4.0, 5.0, 6.0])
+        self.assertEqual(len(ring.window(start=9)), 3)
+        self.assertEqual(ring.window(20), [])
+        self.assertEqual(RingBuffer(2).window(), [])
+
+    def test_bounded_memory(self):
+        ring = RingBuffer(100)
+        self.assertEqual(ring.nbytes(), 0)
+        for i in range(100):
+            ring.append(float(i), i)
+        size = ring.values.buffer_info()
+        for i in range(1000):
+            ring.append(float(i), i)
+        self.assertEqual(ring.values.buffer_info(), size)
+        self.assertEqual(ring.nbytes(), 100 * 16)
+
+    def test_columns_share_timestamps(self):
+        ring = RingBuffer(2, columns=2)
+        for i in range(3):
+            ring.append(float(i), i, i * 10)
+
+        self.assertEqual(ring.window(column=1), [(1.0, 10), (2.0, 20)])
+        self.assertEqual(ring.last(1), (2.0, 20))
+        self.assertEqual(ring.nbytes(), 2 * 3 * 8)
+
+
+class SeriesTests(unittest.TestCase):
+    def setUp(self):
+        self.series = Series(capacity=10, rollups=((60, 100),))
+        for i in range(0, 600, 10):
+            self.series.append(float(i), i)
+
+    def test_rollup_keeps_last_of_interval(self):
+        self.assertEqual(self.series.rollups[0][1].window()[:2],
+                         [(50.0, 50), (110.0, 110)])
+
+    def test_window_falls_back_to_rollup(self):
+        # The raw ring only goes back to 500
+        self.assertEqual(len(self.series.window(start=500)), 10)
+        self.assertEqual(self.series.window(start=0)[0], (50.0, 50))
+
+    def test_resolution(self):
+        samples = self.series.window(start=500, resolution=30)
+        self.assertEqual(samples, [(500.0, 500), (530.0, 530), (560.0, 560),
+                                   (590.0, 590)])
+        self.assertEqual(len(self.series.window(resolution=60)), 10)
+
+    def test_downsample(self):
+        self.assertEqual(downsample([(0, 1), (5, 2), (10, 3)], 10),
+                         [(5, 2), (10, 3)])
+
+
+class StatsStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.store = StatsStore(capacity=5, rollups=())
+        for i in range(3):
+            self.store.record(
+                [Stats(dpid=DPID,
+                       port_stats=[PortStats(port_id=1, rx_bytes=i * 100,
+                                             tx_bytes=i * 50)],
+                       group_stats=[GroupStats(id=7, packet_count=i,
+                                               byte_count=i * 64)])],
+                now=float(i))
+
+    def test_keys(self):
+        self.assertIn((DPID, 'port', 1, 'rx_bytes'), self.store.keys())
+        self.assertEqual(self.store.keys(kind='group'),
+                         [(DPID, 'group', 7, 'byte_count'),
+                          (DPID, 'group', 7, 'packet_count')])
+        self.assertEqual(self.store.keys(dpid='other'), [])
+
+    def test_window(self):
+        self.assertEqual(self.store.window((DPID, 'port', 1, 'rx_bytes'),
+                                           start=1),
+                         [(1.0, 100), (2.0, 200)])
+        self.assertEqual(self.store.window(('x', 'port', 1, 'rx_bytes')), [])
+
+    def test_record_port_stats_with_dpid(self):
+        self.store.record(PortStats(port_id=2, tx_packets=5), dpid=DPID,
+                          now=10.0)
+        self.assertEqual(self.store.window((DPID, 'port', 2, 'tx_packets')),
+                         [(10.0, 5)])
+
+    def test_record_all(self):
+        self.store.record_all({'00:02': [PortStats(port_id=1, rx_bytes=1)],
+                               '00:03': Exception()}, now=1.0)
+        self.assertEqual(len(self.store.keys(dpid='00:02')), 1)
+
+    def test_controller_stats(self):
+        self.store.record([ControllerStats(uid='c1',
+                                           packet_in=Counter(packets=5,
+                                                             bytes=500))],
+                          now=1.0)
+        self.assertEqual(
+            self.store.window(('c1', 'controller', None, 'packet_in_bytes')),
+            [(1.0, 500)])
+
+    def test_memory(self):
+        # The port and the group each keep one timestamp per sample,
+        # and a value per sample for each of their 8 and 2 counters
+        self.assertEqual(self.store.memory(), 3 * (1 + 8 + 1 + 2) * 8)
+        for i in range(3, 10):
+            self.store.record(PortStats(port_id=1, rx_bytes=i), dpid=DPID,
+                              now=float(i))
+        self.assertEqual(self.store.memory(), (5 * 9 + 3 * 3) * 8)
+
+    def test_missing_counter_keeps_last_value(self):
+        self.store.record(PortStats(port_id=1, rx_bytes=300), dpid=DPID,
+                          now=3.0)
+        self.assertEqual(self.store.window((DPID, 'port', 1, 'tx_bytes'),
+                                           start=2),
+                         [(2.0, 100), (3.0, 100)])
+        self.assertEqual(self.store.window((DPID, 'port', 1, 'rx_packets')),
+                         [])
+        self.assertEqual(len(self.store), 4)
+
+    def test_to_csv(self):
+        out = StringIO()
+        self.store.to_csv(out, keys=[(DPID, 'port', 1, 'rx_bytes')])
+        lines = out.getvalue().splitlines()
+
+        self.assertEqual(lines[0], 'dpid,kind,id,counter,timestamp,value')
+        self.assertEqual(lines[-1], '{0},port,1,rx_bytes,2.0,200'.format(DPID))
+        self.assertEqual(len(lines), 4)
+
+    def test_to_numpy(self):
+        if timeseries.numpy is None:
+            self.assertRaises(ImportError, self.store.to_numpy,
+                              (DPID, 'port', 1, 'rx_bytes'))
+            return
+        times, values = self.store.to_numpy((DPID, 'port', 1, 'rx_bytes'))
+        self.assertEqual(list(times), [0.0, 1.0, 2.0])
+        self.assertEqual(list(values), [0, 100, 200])
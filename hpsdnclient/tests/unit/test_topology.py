@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from hpsdnclient.datatypes import Datapath, Link, Node, Path
+from hpsdnclient.topology import Topology, link_key
+
+
+def bidirectional(a, b, a_port, b_port):
+    return [Link(src_dpid=a, src_port=a_port, dst_dpid=b, dst_port=b_port),
+            Link(src_dpid=b, src_port=b_port, dst_dpid=a, dst_port=a_port)]
+
+
+def dpids(path):
+    return [path.links[0].src_dpid] + [l.dst_dpid for l in path.links]
+
+
+class TopologyTests(unittest.TestCase):
+    """ A ring a-b-c-d-a with a shortcut a-c and an island e-f """
+
+    def setUp(self):
+        self.links = (bidirectional('a', 'b', 1, 1) +
+                      bidirectional('b', 'c', 2, 1) +
+                      bidirectional('c', 'd', 2, 1) +
+                      bidirectional('d', 'a', 2, 2) +
+                      bidirectional('a', 'c', 3, 3) +
+                      bidirectional('e', 'f', 1, 1))
+        self.nodes = [Node(ip='10.0.0.1', dpid='a', port=10),
+                      Node(ip='10.0.0.2', dpid='d', port=10)]
+        self.topology = Topology(self.links, self.nodes,
+                                 [Datapath(dpid=d) for d in 'abcdefg'])
+
+    def test_index(self):
+        self.assertEqual(sorted(self.topology.neighbours('a')),
+                         ['b', 'c', 'd'])
+        self.assertEqual(len(self.topology.links_between('a', 'b')), 1)
+        self.assertEqual(self.topology.nodes_at('a'), [self.nodes[0]])
+        self.assertEqual(self.topology.dpids(), set('abcdefg'))
+
+    def test_shortest_path(self):
+        path = self.topology.shortest_path('b', 'd')
+        self.assertTrue(isinstance(path, Path))
+        self.assertEqual(path.cost, 2)
+        self.assertEqual(len(path.links), 2)
+        self.assertEqual(self.topology.shortest_path('a', 'a').links, [])
+        self.assertEqual(self.topology.shortest_path('a', 'e'), None)
+
+    def test_weighted_shortest_path(self):
+        # Make the shortcut expensive
+        def weight(link):
+            return 10 if set([link.src_dpid, link.dst_dpid]) == \
+                set(['a', 'c']) else 1
+        path = self.topology.shortest_path('a', 'c', weight)
+        self.assertEqual(path.cost, 2)
+        self.assertEqual(self.topology.shortest_path('a', 'c').cost, 1)
+
+    def test_k_shortest_paths(self):
+        paths = self.topology.k_shortest_paths('a', 'c', 5)
+
+        self.assertEqual([dpids(p) for p in paths],
+                         [['a', 'c'], ['a', 'b', 'c'], ['a', 'd', 'c']])
+        self.assertEqual([p.cost for p in paths], [1, 2, 2])
+        self.assertEqual(len(self.topology.k_shortest_paths('a', 'c', 2)),
+                         2)
+        self.assertEqual(self.topology.k_shortest_paths('a', 'e', 2), [])
+
+    def test_reachability(self):
+        self.assertEqual(self.topology.reachable('a'), set('abcd'))
+        self.assertTrue(self.topology.is_reachable('d', 'b'))
+        self.assertFalse(self.topology.is_reachable('a', 'f'))
+        self.assertFalse(self.topology.is_reachable('g', 'a'))
+
+    def test_broadcast_tree(self):
+        tree = self.topology.broadcast_tree('a')
+
+        self.assertEqual(len(tree), 3)
+        self.assertEqual(set(l.dst_dpid for l in tree), set('bcd'))
+        self.assertEqual(set(l.src_dpid for l in tree), set('a'))
+
+    def test_parallel_links(self):
+        topology = Topology(bidirectional('a', 'b', 1, 1) +
+                            bidirectional('a', 'b', 2, 2))
+        self.assertEqual(len(topology.links_between('a', 'b')), 2)
+        path = topology.shortest_path('a', 'b', weight=lambda l: l.src_port)
+        self.assertEqual(path.links[0].src_port, 1)
+
+    def test_update_is_incremental(self):
+        links = [l for l in self.links
+                 if set([l.src_dpid, l.dst_dpid]) != set(['a', 'c'])]
+        links += bidirectional('d', 'e', 3, 2)
+
+        added, removed = self.topology.update(links)
+
+        self.assertEqual(len(added), 2)
+        self.assertEqual(len(removed), 2)
+        self.assertEqual(self.topology.shortest_path('a', 'c').cost, 2)
+        self.assertEqual(self.topology.shortest_path('a', 'f').cost, 3)
+        self.assertEqual(self.topology.update(links), ([], []))
+
+    def test_remove_link(self):
+        key = link_key(self.links[0])
+        self.assertTrue(self.topology.remove_link(key) is self.links[0])
+        self.assertNotIn('b', self.topology.neighbours('a'))
+
+    def test_refresh(self):
+        api = MagicMock()
+        api.get_links.return_value = self.links[:2]
+        api.get_nodes.return_value = []
+        api.get_datapaths.return_value = []
+
+        added, removed = self.topology.refresh(api)
+
+        self.assertEqual(added, [])
+        self.assertEqual(len(removed), len(self.links) - 2)
+        self.assertEqual(self.topology.nodes, [])
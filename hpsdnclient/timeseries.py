@@ -0,0 +1,407 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Bounded-memory history of polled statistics """
+
+from array import array
+import csv
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from hpsdnclient.datatypes import (ControllerStats, GroupStats, MeterStats,
+                                   PortStats, Stats)
+from hpsdnclient.portstats import COUNTERS as PORT_COUNTERS, UINT64
+
+ENTRY_COUNTERS = ("packet_count", "byte_count")
+CONTROLLER_COUNTERS = tuple(name + "_" + suffix
+                            for name in ("lost", "packet_in", "packet_out")
+                            for suffix in ("packets", "bytes"))
+
+# Samples kept at full resolution, then one sample per 5 minutes for a
+# day and one per hour for 90 days. Once full, about 25KB per counter
+CAPACITY = 360
+ROLLUPS = ((300, 288), (3600, 2160))
+
+
+class RingBuffer(object):
+    """ A bounded series of samples, each a timestamp and one value per
+    column
+
+    Memory grows with the samples up to capacity, then each new sample
+    overwrites the oldest. Samples must be appended in time order.
+
+    :param int capacity: The number of samples to keep
+    :param str typecode: The array typecode of the values, UINT64 for
+        unsigned counters or "d" for floats (Optional)
+    :param int columns: The number of values in each sample (Optional)
+
+    """
+    def __init__(self, capacity, typecode=UINT64, columns=1):
+        self.capacity = capacity
+        self.times = array('d')
+        self.columns = [array(typecode) for i in range(columns)]
+        self.start = 0
+        self.count = 0
+
+    @property
+    def values(self):
+        """ The values of the first column """
+        return self.columns[0]
+
+    def append(self, timestamp, *values):
+        if self.count < self.capacity:
+            self.times.append(timestamp)
+            for column, value in zip(self.columns, values):
+                column.append(value)
+            self.count += 1
+            return
+        i = self.start
+        self.times[i] = timestamp
+        for column, value in zip(self.columns, values):
+            column[i] = value
+        self.start = (i + 1) % self.capacity
+
+    def replace_last(self, timestamp, *values):
+        """ Overwrite the newest sample """
+        i = (self.start + self.count - 1) % self.capacity
+        self.times[i] = timestamp
+        for column, value in zip(self.columns, values):
+            column[i] = value
+
+    def _time(self, i):
+        return self.times[(self.start + i) % self.capacity]
+
+    def _bisect(self, timestamp):
+        """ The index of the first sample at or after timestamp """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._time(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, start=None, end=None, column=0):
+        """ The samples with start <= timestamp < end
+
+        :param int column: The column of the values (Optional)
+        :return: (timestamp, value) tuples, oldest first
+        :rtype: list
+
+        """
+        first = 0 if start is None else self._bisect(start)
+        last = self.count if end is None else self._bisect(end)
+        values = self.columns[column]
+        return [(self.times[(self.start + i) % self.capacity],
+                 values[(self.start + i) % self.capacity])
+                for i in range(first, last)]
+
+    def first(self):
+        """ The timestamp of the oldest sample, None when empty """
+        return self._time(0) if self.count else None
+
+    def last(self, column=0):
+        """ The newest (timestamp, value), None when empty """
+        if not self.count:
+            return None
+        i = (self.start + self.count - 1) % self.capacity
+        return self.times[i], self.columns[column][i]
+
+    def nbytes(self):
+        """ The memory held by the samples """
+        return sum(a.itemsize * len(a) for a in [self.times] + self.columns)
+
+    def __len__(self):
+        return self.count
+
+
+class Series(object):
+    """ Counters sampled together, stored at full resolution and at
+    coarser rollups. The counters share the timestamps of each ring
+
+    Each rollup keeps the last sample seen in every interval. For
+    cumulative counters this loses no information over the interval,
+    rates can still be computed between any two of its samples.
+
+    """
+    def __init__(self, capacity=CAPACITY, rollups=ROLLUPS, typecode=UINT64,
+                 columns=1):
+        self.raw = RingBuffer(capacity, typecode, columns)
+        self.rollups = [(interval, RingBuffer(size, typecode, columns))
+                        for interval, size in rollups]
+
+    def append(self, timestamp, *values):
+        self.raw.append(timestamp, *values)
+        for interval, ring in self.rollups:
+            last = ring.last()
+            if last is not None and \
+                    last[0] // interval == timestamp // interval:
+                ring.replace_last(timestamp, *values)
+            else:
+                ring.append(timestamp, *values)
+
+    def nbytes(self):
+        """ The memory held by the samples """
+        return self.raw.nbytes() + sum(r.nbytes() for i, r in self.rollups)
+
+    def window(self, start=None, end=None, resolution=None, column=0):
+        """ The samples between start and end
+
+        Uses the finest samples that reach back to start, the full
+        resolution ones if they do, otherwise the finest rollup.
+
+        :param float start: The earliest timestamp (Optional)
+        :param float end: The timestamp to stop before (Optional)
+        :param int resolution: Keep the last sample of every interval of
+            this many seconds (Optional)
+        :param int column: The counter (Optional)
+        :rtype: list
+
+        """
+        rings = [(0, self.raw)] + self.rollups
+        if resolution is not None:
+            # Skip rollups finer than needed, the coarsest one that is
+            # still fine enough holds the most history
+            finer = [r for r in rings if r[0] <= resolution]
+            rings = finer[-1:] + [r for r in rings if r[0] > resolution]
+        for interval, ring in rings:
+            oldest = ring.first()
+            if start is None or (oldest is not None and oldest <= start):
+                break
+        samples = ring.window(start, end, column)
+        if resolution and interval < resolution:
+            samples = downsample(samples, resolution)
+        return samples
+
+
+def downsample(samples, interval):
+    """ Keep the last sample of every interval
+
+    :param list samples: (timestamp, value) tuples, oldest first
+    :param float interval: The interval in seconds
+    :rtype: list
+
+    """
+    result = []
+    for sample in samples:
+        if result and result[-1][0] // interval == sample[0] // interval:
+            result[-1] = sample
+        else:
+            result.append(sample)
+    return result
+
+
+class _Sampled(object):
+    """ The counters of one port, group, meter or controller """
+
+    __slots__ = ("counters", "series", "first")
+
+    def __init__(self, counters, capacity, rollups):
+        self.counters = counters
+        self.series = Series(capacity, rollups, columns=len(counters))
+        # The time each counter was first seen
+        self.first = {}
+
+    def append(self, timestamp, values):
+        """ Append a sample, a value or None for each counter """
+        raw = self.series.raw
+        sample = []
+        for column, value in enumerate(values):
+            if value is None:
+                # A counter missing from a sample keeps its last value
+                last = raw.last(column)
+                value = last[1] if last is not None else 0
+            elif column not in self.first:
+                self.first[column] = timestamp
+            sample.append(value)
+        self.series.append(timestamp, *sample)
+
+    def window(self, counter, start, end, resolution):
+        column = self.counters.index(counter)
+        first = self.first.get(column)
+        if first is None:
+            return []
+        if start is None or start < first:
+            start = first
+        return self.series.window(start, end, resolution, column)
+
+
+class StatsStore(object):
+    """ The history of polled statistics
+
+    Series are keyed by (dpid, kind, id, counter), where kind is "port",
+    "group", "meter" or "controller" and id is the port, group or meter
+    ID. Controller statistics are keyed by the controller uid in place
+    of the DPID. The counters of a port, group, meter or controller are
+    polled together and share their timestamps. Memory grows with the
+    samples of each series up to a fixed size.
+
+    :param int capacity: Samples kept at full resolution (Optional)
+    :param rollups: (interval seconds, samples) of each rollup (Optional)
+    :param clock: A function returning the current time in seconds
+        (Optional)
+
+    """
+    def __init__(self, capacity=CAPACITY, rollups=ROLLUPS, clock=time.time):
+        self.capacity = capacity
+        self.rollups = tuple(rollups)
+        self.clock = clock
+        # (dpid, kind, id) -> _Sampled
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, result, dpid=None, now=None):
+        """ Store the result of get_stats, get_port_stats,
+        get_group_stats or get_meter_stats
+
+        :param result: A datatype or list of datatypes
+        :param str dpid: The DPID, for results that do not carry one
+            (Optional)
+        :param float now: The time of the sample (Optional)
+
+        """
+        if now is None:
+            now = self.clock()
+        items = result if isinstance(result, list) else [result]
+        with self._lock:
+            for item in items:
+                self._record(item, dpid, now)
+
+    def record_all(self, results, now=None):
+        """ Store the result of a fan-out call, e.g. get_port_stats_all.
+        Failed datapaths are skipped """
+        if now is None:
+            now = self.clock()
+        for dpid, result in results.items():
+            if not isinstance(result, Exception):
+                self.record(result, dpid, now)
+
+    def _record(self, item, dpid, now):
+        if isinstance(item, Stats):
+            dpid = item.dpid or dpid
+            for entries in (item.port_stats, item.group_stats,
+                            item.meter_stats):
+                for entry in entries or ():
+                    self._record(entry, dpid, now)
+        elif isinstance(item, PortStats):
+            self._add((dpid, "port", item.port_id), PORT_COUNTERS,
+                      [getattr(item, c) for c in PORT_COUNTERS], now)
+        elif isinstance(item, GroupStats):
+            self._add((dpid, "group", item.id), ENTRY_COUNTERS,
+                      [getattr(item, c) for c in ENTRY_COUNTERS], now)
+        elif isinstance(item, MeterStats):
+            self._add((dpid, "meter", item.id), ENTRY_COUNTERS,
+                      [getattr(item, c) for c in ENTRY_COUNTERS], now)
+        elif isinstance(item, ControllerStats):
+            values = []
+            for name in CONTROLLER_COUNTERS:
+                attr, suffix = name.rsplit("_", 1)
+                counter = getattr(item, attr)
+                if isinstance(counter, dict):
+                    counter = counter.get(suffix)
+                elif counter is not None:
+                    counter = getattr(counter, suffix)
+                values.append(counter)
+            self._add((item.uid, "controller", None), CONTROLLER_COUNTERS,
+                      values, now)
+
+    def _add(self, key, counters, values, now):
+        if all(v is None for v in values):
+            return
+        sampled = self._series.get(key)
+        if sampled is None:
+            sampled = self._series[key] = _Sampled(counters, self.capacity,
+                                                   self.rollups)
+        sampled.append(now, values)
+
+    def keys(self, dpid=None, kind=None):
+        """ The keys of the stored series
+
+        :param str dpid: Only keys of this DPID (Optional)
+        :param str kind: Only keys of this kind (Optional)
+        :rtype: list
+
+        """
+        with self._lock:
+            keys = [k + (s.counters[c],)
+                    for k, s in self._series.items()
+                    if (dpid is None or k[0] == dpid) and
+                    (kind is None or k[1] == kind)
+                    for c in s.first]
+        return sorted(keys, key=lambda k: tuple(str(p) for p in k))
+
+    def window(self, key, start=None, end=None, resolution=None):
+        """ The samples of one series between start and end
+
+        :param tuple key: (dpid, kind, id, counter)
+        :param float start: The earliest timestamp (Optional)
+        :param float end: The timestamp to stop before (Optional)
+        :param int resolution: Seconds between samples (Optional)
+        :return: (timestamp, value) tuples, oldest first
+        :rtype: list
+
+        """
+        with self._lock:
+            sampled = self._series.get(tuple(key[:3]))
+            if sampled is None or key[3] not in sampled.counters:
+                return []
+            return sampled.window(key[3], start, end, resolution)
+
+    def to_csv(self, fileobj, keys=None, start=None, end=None,
+               resolution=None):
+        """ Write series as CSV rows of dpid, kind, id, counter,
+        timestamp and value
+
+        :param fileobj: A file opened for writing text
+        :param list keys: The series to export. Defaults to all (Optional)
+
+        """
+        writer = csv.writer(fileobj)
+        writer.writerow(["dpid", "kind", "id", "counter",
+                         "timestamp", "value"])
+        for key in keys if keys is not None else self.keys():
+            for timestamp, value in self.window(key, start, end, resolution):
+                writer.writerow(list(key) + [timestamp, value])
+
+    def to_numpy(self, key, start=None, end=None, resolution=None):
+        """ The samples of one series as NumPy arrays
+
+        :return: The timestamps and the values
+        :rtype: tuple of numpy.ndarray
+        :raises: ImportError if NumPy is not installed
+
+        """
+        if numpy is None:
+            raise ImportError("NumPy is required to export to NumPy arrays")
+        samples = self.window(key, start, end, resolution)
+        times = numpy.array([s[0] for s in samples], dtype=numpy.float64)
+        values = numpy.array([s[1] for s in samples], dtype=numpy.uint64)
+        return times, values
+
+    def memory(self):
+        """ The memory held by the samples of every series, in bytes """
+        with self._lock:
+            return sum(s.series.nbytes() for s in self._series.values())
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(s.first) for s in self._series.values())
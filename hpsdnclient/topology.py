@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+#
+#   Copyright 2014 Hewlett-Packard Development Company, L.P.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" A local model of the controller's view of the network """
+
+from collections import deque
+import heapq
+import itertools
+
+from hpsdnclient.datatypes import Path
+
+
+def link_key(link):
+    """ The identity of a link, (src_dpid, src_port, dst_dpid, dst_port) """
+    return (link.src_dpid, link.src_port, link.dst_dpid, link.dst_port)
+
+
+class Topology(object):
+    """ A graph of datapaths and the links between them
+
+    Links are directed, as the controller reports each direction of a
+    physical link separately. Paths are computed locally from an
+    adjacency index, so no request is sent to the controller per query.
+
+    :param list links: hpsdnclient.datatypes.Link objects
+    :param list nodes: hpsdnclient.datatypes.Node objects (Optional)
+    :param list datapaths: hpsdnclient.datatypes.Datapath objects
+        (Optional)
+
+    """
+    def __init__(self, links=(), nodes=(), datapaths=()):
+        self.datapaths = {}
+        self.links = {}
+        self.nodes = []
+        # dpid -> {neighbour dpid -> {link key -> Link}}
+        self._adjacency = {}
+        self.update(links, nodes, datapaths)
+
+    @classmethod
+    def from_api(cls, api):
+        """ Build a topology from the controller
+
+        :param hpsdnclient.Api api: The Api to query
+        :rtype: hpsdnclient.topology.Topology
+
+        """
+        return cls(api.get_links(), api.get_nodes(), api.get_datapaths())
+
+    def refresh(self, api):
+        """ Bring the topology up to date with the controller, applying
+        only what changed
+
+        :param hpsdnclient.Api api: The Api to query
+        :return: The links added and the links removed
+        :rtype: tuple
+
+        """
+        return self.update(api.get_links(), api.get_nodes(),
+                           api.get_datapaths())
+
+    def update(self, links=None, nodes=None, datapaths=None):
+        """ Replace the links, nodes or datapaths, applying only the
+        differences to the adjacency index
+
+        :param list links: The current links (Optional)
+        :param list nodes: The current nodes (Optional)
+        :param list datapaths: The current datapaths (Optional)
+        :return: The links added and the links removed
+        :rtype: tuple
+
+        """
+        added = []
+        removed = []
+        if datapaths is not None:
+            self.datapaths = dict((d.dpid, d) for d in datapaths)
+        if links is not None:
+            current = dict((link_key(l), l) for l in links)
+            for key in [k for k in self.links if k not in current]:
+                removed.append(self.remove_link(key))
+            for key, link in current.items():
+                if key not in self.links:
+                    self.add_link(link)
+                    added.append(link)
+        if nodes is not None:
+            self.nodes = list(nodes)
+        return added, removed
+
+    def add_link(self, link):
+        """ Add a link
+
+        :param hpsdnclient.datatypes.Link link: The link to add
+
+        """
+        key = link_key(link)
+        self.links[key] = link
+        self._adjacency.setdefault(link.src_dpid, {}).setdefault(
+            link.dst_dpid, {})[key] = link
+        self._adjacency.setdefault(link.dst_dpid, {})
+
+    def remove_link(self, link):
+        """ Remove a link
+
+        :param link: The link, or its link_key, to remove
+        :return: The removed link
+        :rtype: hpsdnclient.datatypes.Link
+
+        """
+        key = link if isinstance(link, tuple) else link_key(link)
+        link = self.links.pop(key)
+        neighbours = self._adjacency[link.src_dpid]
+        del neighbours[link.dst_dpid][key]
+        if not neighbours[link.dst_dpid]:
+            del neighbours[link.dst_dpid]
+        return link
+
+    def dpids(self):
+        """ The DPIDs of every known datapath and link endpoint """
+        return set(self.datapaths).union(self._adjacency)
+
+    def neighbours(self, dpid):
+        """ The DPIDs reachable from dpid over one link """
+        return list(self._adjacency.get(dpid, ()))
+
+    def links_between(self, src_dpid, dst_dpid):
+        """ The links from src_dpid to dst_dpid """
+        return list(self._adjacency.get(src_dpid, {}).get(dst_dpid,
+                                                          {}).values())
+
+    def nodes_at(self, dpid):
+        """ The nodes attached to a datapath """
+        return [n for n in self.nodes if n.dpid == dpid]
+
+    def shortest_path(self, src_dpid, dst_dpid, weight=None):
+        """ Compute the shortest path between two datapaths
+
+        :param str src_dpid: The source DPID
+        :param str dst_dpid: The destination DPID
+        :param weight: A function returning the cost of a link. Defaults
+            to a cost of 1 per link (Optional)
+        :return: The path, or None if dst_dpid cannot be reached
+        :rtype: hpsdnclient.datatypes.Path
+
+        """
+        result = self._search(src_dpid, dst_dpid, weight)
+        if result is None:
+            return None
+        cost, links = result
+        return Path(cost=cost, links=links)
+
+    def k_shortest_paths(self, src_dpid, dst_dpid, k, weight=None):
+        """ Compute up to k loop-free paths between two datapaths, in
+        order of cost (Yen's algorithm)
+
+        :param str src_dpid: The source DPID
+        :param str dst_dpid: The destination DPID
+        :param int k: The number of paths
+        :param weight: A function returning the cost of a link (Optional)
+        :return: A list of paths
+        :rtype: list
+
+        """
+        first = self._search(src_dpid, dst_dpid, weight)
+        if first is None:
+            return []
+        found = [first]
+        candidates = []
+        counter = itertools.count()
+        seen = set([tuple(link_key(l) for l in first[1])])
+        while len(found) < k:
+            cost, links = found[-1]
+            for i in range(len(links)):
+                root = links[:i]
+                spur = links[i].src_dpid
+                banned_links = set()
+                for c, p in found:
+                    if len(p) > i and [link_key(l) for l in p[:i]] == \
+                            [link_key(l) for l in root]:
+                        banned_links.add(link_key(p[i]))
+                banned_nodes = set(l.src_dpid for l in root)
+                result = self._search(spur, dst_dpid, weight,
+                                      banned_links, banned_nodes)
+                if result is None:
+                    continue
+                path = root + result[1]
+                keys = tuple(link_key(l) for l in path)
+                if keys in seen:
+                    continue
+                seen.add(keys)
+                total = self._cost(root, weight) + result[0]
+                heapq.heappush(candidates, (total, next(counter), path))
+            if not candidates:
+                break
+            total, _, path = heapq.heappop(candidates)
+            found.append((total, path))
+        return [Path(cost=c, links=p) for c, p in found]
+
+    def reachable(self, src_dpid):
+        """ The DPIDs that can be reached from src_dpid, itself included
+
+        :rtype: set
+
+        """
+        seen = set([src_dpid])
+        queue = deque([src_dpid])
+        while queue:
+            for dpid in self._adjacency.get(queue.popleft(), ()):
+                if dpid not in seen:
+                    seen.add(dpid)
+                    queue.append(dpid)
+        return seen
+
+    def is_reachable(self, src_dpid, dst_dpid):
+        """ Whether any path leads from src_dpid to dst_dpid """
+        return self._search(src_dpid, dst_dpid) is not None
+
+    def broadcast_tree(self, root=None):
+        """ Compute a shortest-path spanning tree of the datapaths that
+        can be reached from root
+
+        :param str root: The root DPID. Defaults to the lowest DPID
+            (Optional)
+        :return: The links of the tree
+        :rtype: list
+
+        """
+        if root is None:
+            dpids = self.dpids()
+            if not dpids:
+                return []
+            root = min(dpids)
+        tree = []
+        seen = set([root])
+        queue = deque([root])
+        while queue:
+            dpid = queue.popleft()
+            neighbours = self._adjacency.get(dpid, {})
+            for neighbour in sorted(neighbours):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+                    tree.append(min(neighbours[neighbour].values(),
+                                    key=link_key))
+        return tree
+
+    def _cost(self, links, weight):
+        if weight is None:
+            return len(links)
+        return sum(weight(l) for l in links)
+
+    def _search(self, src, dst, weight=None, banned_links=(),
+                banned_nodes=()):
+        """ Breadth first search, or Dijkstra's algorithm when a weight
+        function is given. Returns (cost, links) or None """
+        if src == dst:
+            return 0, []
+        if src not in self._adjacency or src in banned_nodes:
+            return None
+        previous = {src: None}
+        if weight is None:
+            queue = deque([src])
+            while queue:
+                dpid = queue.popleft()
+                for neighbour, links in self._adjacency[dpid].items():
+                    if neighbour in previous or neighbour in banned_nodes:
+                        continue
+                    link = self._pick(links, banned_links)
+                    if link is None:
+                        continue
+                    previous[neighbour] = link
+                    if neighbour == dst:
+                        return self._walk(previous, dst, weight)
+                    queue.append(neighbour)
+            return None
+        costs = {src: 0}
+        heap = [(0, src)]
+        done = set()
+        while heap:
+            cost, dpid = heapq.heappop(heap)
+            if dpid in done:
+                continue
+            if dpid == dst:
+                return self._walk(previous, dst, weight)
+            done.add(dpid)
+            for neighbour, links in self._adjacency[dpid].items():
+                if neighbour in done or neighbour in banned_nodes:
+                    continue
+                link = self._pick(links, banned_links, weight)
+                if link is None:
+                    continue
+                new_cost = cost + weight(link)
+                if neighbour not in costs or new_cost < costs[neighbour]:
+                    costs[neighbour] = new_cost
+                    previous[neighbour] = link
+                    heapq.heappush(heap, (new_cost, neighbour))
+        return None
+
+    @staticmethod
+    def _pick(links, banned_links, weight=None):
+        """ The cheapest of the parallel links that is not banned """
+        best = None
+        for key, link in links.items():
+            if key in banned_links:
+                continue
+            if best is None or (weight is not None and
+                                weight(link) < weight(best)):
+                best = link
+        return best
+
+    def _walk(self, previous, dst, weight):
+        links = []
+        link = previous[dst]
+        while link is not None:
+            links.append(link)
+            link = previous[link.src_dpid]
+        links.reverse()
+        return self._cost(links, weight), links
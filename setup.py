@@ -52,8 +52,16 @@ setup(
     include_package_data=True,
     install_requires=[
         "distribute",
-        "requests"
+        "requests",
+        # The concurrent.futures backport, for the fan-out and bulk helpers
+        'futures; python_version < "3"',
+        # Normalizes IP addresses in flow keys
+        'ipaddress; python_version < "3.3"'
     ],
+    extras_require={
+        "fast": ["orjson"],
+        "stats": ["numpy"]
+    },
     test_suite='nose.collector',
     tests_require=[
         "tox",